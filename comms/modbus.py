@@ -130,7 +130,7 @@
 # -*- coding: utf-8 -*-
 """Modbus TCP 最小客户端 + 新协议类型编解码与高级 API。"""
 from __future__ import annotations
-import socket, struct, time
+import logging, socket, struct, time
 from typing import Iterable, Tuple, List
 
 from core.utils import float_to_regs_be, regs_to_float_be
@@ -169,6 +169,21 @@ OFF_DIS       = 13         # 占2
 OFF_HEART     = 15
 TOTAL_REGS    = 16
 
+def _with_backoff(fn, retries: int, backoff_s: float, backoff_max_s: float):
+    """调用 ``fn``，OSError 时按指数退避重试；全部失败抛出最后一次异常。``retries`` 至少为 1。"""
+    if retries < 1:
+        raise ValueError(f"retries 须 ≥ 1：{retries}")
+    delay = backoff_s
+    for i in range(retries):
+        try:
+            return fn()
+        except OSError as e:
+            if i == retries - 1:
+                raise
+            logging.warning("Modbus 连接失败（%d/%d）：%s，%.1fs 后重试", i + 1, retries, e, delay)
+            time.sleep(delay)
+            delay = min(delay * 2, backoff_max_s)
+
 class ModbusClient:
     """仅支持 FC03（读保持寄存器）与 FC16（写多个保持寄存器）。"""
     def __init__(self, host: str, port: int = 502, unit_id: int = 1, timeout: float = 2.0):
@@ -186,6 +201,13 @@ class ModbusClient:
         s.connect((self.host, self.port))
         self.sock = s
 
+    @classmethod
+    def connect_with_backoff(cls, host: str, port: int = 502, unit_id: int = 1, timeout: float = 2.0,
+                             retries: int = 10, backoff_s: float = 0.5,
+                             backoff_max_s: float = 8.0) -> "ModbusClient":
+        """建立连接（指数退避重试），用于断线后续跑。"""
+        return _with_backoff(lambda: cls(host, port, unit_id, timeout), retries, backoff_s, backoff_max_s)
+
     def _send_pdu(self, pdu: bytes) -> bytes:
         assert self.sock is not None
         self.txn = (self.txn + 1) & 0xFFFF or 1
@@ -277,6 +299,23 @@ class ModbusClient:
         self.write_dint(reg_base, OFF_N, n)
         self.write_float(reg_base, OFF_DIS, dis)
 
+    @classmethod
+    def pack_segment_params(cls, h0: float, dh: float, n: int, dis: float) -> List[int]:
+        """H0/DH/N/DIS 预编码为连续 8 个寄存器（OFF_H0..OFF_DIS+1），供一次 FC16 写入。"""
+        return [*float_to_regs_be(h0), *float_to_regs_be(dh), *cls._dint_to_regs(int(n)), *float_to_regs_be(dis)]
+
+    def write_segment_block(self, reg_base: int, regs: List[int]):
+        """一次 FC16 写入预编码的段参数块。"""
+        self.write_regs(reg_base + OFF_H0, regs)
+
+    def read_segment_block(self, reg_base: int) -> List[int]:
+        """读回 PLC 当前的段参数块（H0..DIS 共 8 个寄存器）。"""
+        return self.read_regs(reg_base + OFF_H0, OFF_DIS + 2 - OFF_H0)
+
+    def read_status(self, reg_base: int) -> int:
+        """仅读 STATUS（单寄存器，一次往返）。"""
+        return self.read_int(reg_base, OFF_STATUS)
+
     def read_status_and_z(self, reg_base: int) -> tuple[int, float]:
         st = self.read_int(reg_base, OFF_STATUS)
         z  = self.read_float(reg_base, OFF_Z)
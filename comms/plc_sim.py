@@ -126,7 +126,7 @@
 # -*- coding: utf-8 -*-
 """最小可用的 Modbus TCP 服务器（仅 FC03/FC16），匹配新协议语义。"""
 from __future__ import annotations
-import socket, struct, threading, time
+import logging, random, socket, struct, threading, time
 
 from core.utils import float_to_regs_be, regs_to_float_be
 from comms.modbus import (
@@ -141,9 +141,16 @@ REG_BASE = 0
 Z_MAX_MM = 2500.0
 ASCEND_V_MM_S = 80.0
 EXEC_SEG_TIME_S = 0.6
+EXEC_SEG_JITTER_S = 0.0     # 段耗时随机附加 [0, JITTER]，模拟清洗时间不与主机轮询周期对齐
 
 REGS = [0] * (REG_BASE + TOTAL_REGS)
 
+# 段间空闲统计：段完成回到 WAIT_SEG 到收到下一条 START_SEG 的间隔
+IDLE_S: list = []
+# 已执行段的参数 (h0, dh, n, dis)，按收到 START_SEG 的顺序
+SEGS: list = []
+_t_wait_seg = None
+
 def write_int(off: int, val: int):
     REGS[REG_BASE + off] = val & 0xFFFF
 
@@ -194,6 +201,7 @@ def logic_tick(dt: float):
             write_int(OFF_STATUS, ST_AT_TOP)
 
 def handle_command():
+    global _t_wait_seg
     cmd = read_int(OFF_CMD)
     if cmd == CMD_SAMPLE_UP:
         # 主机已递增Z_SIGNAL；进入采样中
@@ -208,16 +216,26 @@ def handle_command():
         dh  = read_float(OFF_DH)
         n   = read_dint(OFF_N)
         dis = read_float(OFF_DIS)
+        SEGS.append((h0, dh, n, dis))
         # 进入清洗，短暂后回到等待分段
         write_int(OFF_STATUS, ST_CLEANING)
+        if _t_wait_seg is not None:
+            IDLE_S.append(time.perf_counter() - _t_wait_seg)
+            _t_wait_seg = None
         def do_seg():
-            time.sleep(EXEC_SEG_TIME_S)
+            global _t_wait_seg
+            time.sleep(EXEC_SEG_TIME_S + random.uniform(0.0, EXEC_SEG_JITTER_S))
+            _t_wait_seg = time.perf_counter()
             write_int(OFF_STATUS, ST_WAIT_SEG)
         threading.Thread(target=do_seg, daemon=True).start()
         write_int(OFF_CMD, 0)
     elif cmd == CMD_FINISH_ALL:
         write_int(OFF_STATUS, ST_DONE)
         write_int(OFF_CMD, 0)
+        _t_wait_seg = None
+        if IDLE_S:
+            logging.info("[PLC_SIM] 段间空闲 %d 次：平均 %.1f ms，最大 %.1f ms",
+                         len(IDLE_S), 1e3 * sum(IDLE_S) / len(IDLE_S), 1e3 * max(IDLE_S))
 
 def serve():
     init_regs()
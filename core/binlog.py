@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+二进制采样/段日志：只追加写入，读取端 ``np.memmap`` 直接映射，无需文本解析。
+
+文件布局（全部小端）：
+
+    文件头   magic "INSBLOG1" | version u16 | kind u16 | ncols u16 | pad u16 | created f8 | 保留 8B
+    列描述   ncols × (列名 12B ASCII | dtype 4B，如 "<f8")
+    数据块   "CHNK" | nrows u32 | 各列连续存放（每列按 8 字节对齐）
+    ...
+    块索引   "INDX" | nchunks u32 | nchunks × (偏移 u64 | nrows u32 | pad u32)
+    文件尾   索引偏移 u64 | "BLOGEND!"
+
+- 写入端按块落盘（``chunk_rows`` 行或 ``flush()`` 时），崩溃最多丢失未落盘的一块。
+- 正常关闭写块索引与文件尾；文件尾缺失（进程中断）时读取端顺序扫描数据块重建索引，
+  截断的末块被忽略。
+- ``export_csv`` 导出人工可读的 CSV；``load_samples`` 统一加载 .blog / .csv 采样日志。
+
+用法：
+    python -m core.binlog info logs/sample.blog
+    python -m core.binlog export logs/sample.blog logs/sample_export.csv
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import struct
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MAGIC = b"INSBLOG1"
+VERSION = 1
+END_MAGIC = b"BLOGEND!"
+_HDR = struct.Struct("<8sHHHHd8x")         # 32 字节
+_COL = struct.Struct("<12s4s")             # 16 字节
+_CHUNK = struct.Struct("<4sI")             # 8 字节
+_IDX_ENTRY = struct.Struct("<QI4x")        # 16 字节
+_TRAILER = struct.Struct("<Q8s")           # 16 字节
+
+KIND_SAMPLES = 1
+KIND_SEGMENTS = 2
+SCHEMAS: Dict[int, List[Tuple[str, str]]] = {
+    KIND_SAMPLES: [("flag", "<i1"), ("z", "<f8"), ("dis", "<f8")],
+    KIND_SEGMENTS: [("flag", "<i1"), ("z_start", "<f8"), ("z_end", "<f8"), ("dis", "<f8")],
+}
+
+
+def _pad8(n: int) -> int:
+    return (n + 7) & ~7
+
+
+class BinLogWriter:
+    """只追加的二进制日志写入器。"""
+
+    def __init__(self, path: str, kind: int = KIND_SAMPLES, chunk_rows: int = 256, fsync: bool = False) -> None:
+        self.path = path
+        self.kind = int(kind)
+        self.schema = SCHEMAS[self.kind]
+        self.chunk_rows = max(1, int(chunk_rows))
+        self.fsync = bool(fsync)
+        self._rows: List[tuple] = []
+        self._index: List[Tuple[int, int]] = []
+        self.n_rows = 0
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self._f = open(path, "wb")
+        self._f.write(_HDR.pack(MAGIC, VERSION, self.kind, len(self.schema), 0, time.time()))
+        for name, dt in self.schema:
+            self._f.write(_COL.pack(name.encode("ascii"), dt.encode("ascii")))
+        self._f.flush()
+
+    def append(self, *row) -> None:
+        """追加一行，字段顺序同 schema。"""
+        self._rows.append(row)
+        if len(self._rows) >= self.chunk_rows:
+            self.flush()
+
+    def extend(self, rows: Sequence[Sequence]) -> None:
+        for row in rows:
+            self.append(*row)
+
+    def flush(self) -> None:
+        """将缓冲行写为一个数据块。"""
+        if not self._rows or self._f is None:
+            return
+        n = len(self._rows)
+        cols = list(zip(*self._rows))
+        off = self._f.tell()
+        buf = bytearray(_CHUNK.pack(b"CHNK", n))
+        for (_, dt), col in zip(self.schema, cols):
+            raw = np.asarray(col, dtype=dt).tobytes()
+            buf += raw + b"\0" * (_pad8(len(raw)) - len(raw))
+        self._f.write(buf)
+        self._f.flush()
+        if self.fsync:
+            os.fsync(self._f.fileno())
+        self._index.append((off, n))
+        self.n_rows += n
+        self._rows.clear()
+
+    def close(self) -> None:
+        if self._f is None:
+            return
+        self.flush()
+        idx_off = self._f.tell()
+        self._f.write(struct.pack("<4sI", b"INDX", len(self._index)))
+        for off, n in self._index:
+            self._f.write(_IDX_ENTRY.pack(off, n))
+        self._f.write(_TRAILER.pack(idx_off, END_MAGIC))
+        self._f.close()
+        self._f = None
+
+    def __enter__(self) -> "BinLogWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class BinLogReader:
+    """内存映射读取；单块日志的列为零拷贝视图，多块时按列拼接。"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._mm = np.memmap(path, dtype=np.uint8, mode="r")
+        size = self._mm.size
+        magic, ver, kind, ncols, _, created = _HDR.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"不是二进制日志文件: {path}")
+        if ver != VERSION:
+            raise ValueError(f"不支持的日志版本 {ver}: {path}")
+        self.kind, self.created = kind, created
+        self.schema: List[Tuple[str, str]] = []
+        pos = _HDR.size
+        for _ in range(ncols):
+            name, dt = _COL.unpack_from(self._mm, pos)
+            self.schema.append((name.rstrip(b"\0").decode("ascii"), dt.rstrip(b"\0").decode("ascii")))
+            pos += _COL.size
+        self._data_start = pos
+        self.complete = False
+        self.chunks = self._read_index(size)
+        if self.chunks is None:
+            self.chunks = self._scan_chunks(size)
+        else:
+            self.complete = True
+
+    def _chunk_bytes(self, n: int) -> int:
+        return _CHUNK.size + sum(_pad8(n * np.dtype(dt).itemsize) for _, dt in self.schema)
+
+    def _read_index(self, size: int) -> Optional[List[Tuple[int, int]]]:
+        if size < self._data_start + _TRAILER.size:
+            return None
+        idx_off, end = _TRAILER.unpack_from(self._mm, size - _TRAILER.size)
+        if end != END_MAGIC or idx_off + 8 > size:
+            return None
+        tag, count = struct.unpack_from("<4sI", self._mm, idx_off)
+        if tag != b"INDX":
+            return None
+        return [_IDX_ENTRY.unpack_from(self._mm, idx_off + 8 + i * _IDX_ENTRY.size) for i in range(count)]
+
+    def _scan_chunks(self, size: int) -> List[Tuple[int, int]]:
+        """无索引（写入中断）：顺序扫描完整的数据块。"""
+        chunks = []
+        pos = self._data_start
+        while pos + _CHUNK.size <= size:
+            tag, n = _CHUNK.unpack_from(self._mm, pos)
+            nbytes = self._chunk_bytes(n)
+            if tag != b"CHNK" or pos + nbytes > size:
+                break
+            chunks.append((pos, n))
+            pos += nbytes
+        return chunks
+
+    def __len__(self) -> int:
+        return sum(n for _, n in self.chunks)
+
+    @property
+    def names(self) -> List[str]:
+        return [name for name, _ in self.schema]
+
+    def _chunk_column(self, off: int, n: int, col: int) -> np.ndarray:
+        pos = off + _CHUNK.size
+        for _, dt in self.schema[:col]:
+            pos += _pad8(n * np.dtype(dt).itemsize)
+        dt = np.dtype(self.schema[col][1])
+        return self._mm[pos:pos + n * dt.itemsize].view(dt)
+
+    def column(self, name: str) -> np.ndarray:
+        col = self.names.index(name)
+        parts = [self._chunk_column(off, n, col) for off, n in self.chunks]
+        if not parts:
+            return np.zeros(0, dtype=self.schema[col][1])
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        return {name: self.column(name) for name in self.names}
+
+
+def fill_nan_dis(ds: np.ndarray) -> np.ndarray:
+    """采样日志中未测得的 dis 记为 NaN：先向后填充，尾部再向前填充（与采样器的回填规则一致）。"""
+    d = np.array(ds, dtype=np.float64)
+    ok = ~np.isnan(d)
+    if not ok.any():
+        return d
+    n = d.size
+    # bfill：每个位置取右侧（含自身）最近的有效值索引
+    nxt = np.where(ok, np.arange(n), n)
+    nxt = np.minimum.accumulate(nxt[::-1])[::-1]
+    has_next = nxt < n
+    d[has_next] = d[nxt[has_next]]
+    # 尾部 ffill
+    last = np.flatnonzero(ok)[-1]
+    d[last + 1:] = d[last]
+    return d
+
+
+def load_samples(path: str, fill: bool = True) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    加载采样日志 (flags, zs, ds)：``.blog`` 走内存映射，其余按 CSV（列 flag,z,dis）解析。
+    ``fill`` 为真时按采样器规则回填二进制日志中未测得的 dis。
+    """
+    if not path.endswith(".blog"):
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        flags = np.array([int(float(r["flag"])) for r in rows], dtype=np.int8)
+        zs = np.array([float(r["z"]) for r in rows], dtype=np.float64)
+        ds = np.array([float(r["dis"]) if r.get("dis") not in (None, "") else np.nan for r in rows])
+        return flags, zs, ds
+    r = BinLogReader(path)
+    if r.kind != KIND_SAMPLES:
+        raise ValueError(f"不是采样日志: {path}")
+    ds = r.column("dis")
+    return r.column("flag"), r.column("z"), fill_nan_dis(ds) if fill else ds
+
+
+def export_csv(blog_path: str, csv_path: str) -> int:
+    """二进制日志 → CSV，返回行数。"""
+    r = BinLogReader(blog_path)
+    cols = [r.column(name).tolist() for name in r.names]
+    d = os.path.dirname(csv_path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(r.names)
+        w.writerows(zip(*cols))
+    return len(r)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_info = sub.add_parser("info")
+    p_info.add_argument("path")
+    p_exp = sub.add_parser("export")
+    p_exp.add_argument("path")
+    p_exp.add_argument("csv")
+    a = ap.parse_args()
+
+    if a.cmd == "info":
+        r = BinLogReader(a.path)
+        kind = {KIND_SAMPLES: "采样", KIND_SEGMENTS: "段表"}.get(r.kind, str(r.kind))
+        print(f"{a.path}: {kind}日志，{len(r)} 行，{len(r.chunks)} 块，列 {r.names}，"
+              f"{'完整' if r.complete else '无块索引（写入中断，已扫描恢复）'}，"
+              f"创建于 {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(r.created))}")
+    else:
+        n = export_csv(a.path, a.csv)
+        print(f"已导出 {n} 行 -> {a.csv}")
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+启动耗时审计：在子进程中以 ``python -X importtime`` 导入指定模块，汇总累计耗时最高的依赖。
+
+用法：
+    python -m core.startup_audit main vision.detector pipeline.postprocess --top 15
+"""
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+from typing import List, Tuple
+
+
+def import_times(module: str) -> List[Tuple[str, int, int]]:
+    """返回 [(模块名, 自身耗时us, 累计耗时us), ...]，按累计耗时降序。"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True)
+    rows: List[Tuple[str, int, int]] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.strip(), int(self_us), int(cum_us)))
+    if proc.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败：{proc.stderr.strip().splitlines()[-1]}")
+    rows.sort(key=lambda r: r[2], reverse=True)
+    return rows
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("modules", nargs="+")
+    ap.add_argument("--top", type=int, default=10)
+    a = ap.parse_args()
+    for m in a.modules:
+        try:
+            rows = import_times(m)
+        except RuntimeError as e:
+            print(e)
+            continue
+        total = next((r[2] for r in rows if r[0] == m), rows[0][2] if rows else 0)
+        print(f"== {m}: 累计 {total / 1000.0:.1f} ms ==")
+        for name, self_us, cum_us in rows[:a.top]:
+            print(f"  {cum_us / 1000.0:8.1f} ms  (自身 {self_us / 1000.0:6.1f} ms)  {name}")
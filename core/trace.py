@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+阶段级时间线追踪：单调时钟打点写入定长环形缓冲，结束时导出 Chrome/Perfetto trace-event JSON
+（chrome://tracing 或 ui.perfetto.dev 直接打开），一眼看出节拍时间花在哪个阶段。
+
+- ``span(name, **args)``：上下文管理器，记录一个完整事件（ph="X"）；
+- ``traced(name)``：装饰器，函数每次调用记录一个事件；
+- ``instant(name, **args)``：瞬时事件（ph="i"）。
+
+未启用时 ``span`` 返回共享的空上下文、``traced`` 只多一次布尔判断，可常驻代码中。
+写入为无锁的槽位赋值（序号取自 ``itertools.count``，GIL 下原子），多线程可同时打点；
+缓冲满后覆盖最旧的事件。
+
+用法：
+    from core import trace
+    trace.enable(capacity=65536)
+    with trace.span("sampling", video=path):
+        ...
+    trace.dump("logs/trace.json")
+"""
+from __future__ import annotations
+
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "cat", "args", "t0")
+
+    def __init__(self, tracer: "Tracer", name: str, cat: str, args: Optional[dict]) -> None:
+        self.tracer, self.name, self.cat, self.args = tracer, name, cat, args
+
+    def __enter__(self):
+        self.t0 = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        t1 = time.perf_counter_ns()
+        self.tracer._put(("X", self.name, self.cat, self.t0, t1 - self.t0, threading.get_ident(), self.args))
+        return False
+
+
+class Tracer:
+    """定长环形缓冲的事件记录器。"""
+
+    def __init__(self, capacity: int = 65536, enabled: bool = False) -> None:
+        self.capacity = max(16, int(capacity))
+        self.enabled = bool(enabled)
+        self._buf: List[Optional[tuple]] = [None] * self.capacity
+        self._seq = itertools.count()
+        self._n = 0
+        self.t_origin = time.perf_counter_ns()
+        self.path: Optional[str] = None
+
+    def reset(self, capacity: Optional[int] = None) -> None:
+        if capacity is not None:
+            self.capacity = max(16, int(capacity))
+        self._buf = [None] * self.capacity
+        self._seq = itertools.count()
+        self._n = 0
+        self.t_origin = time.perf_counter_ns()
+
+    def _put(self, ev: tuple) -> None:
+        i = next(self._seq)
+        self._buf[i % self.capacity] = ev
+        self._n = i + 1
+
+    def span(self, name: str, cat: str = "", **args):
+        if not self.enabled:
+            return _NULL
+        return _Span(self, name, cat, args or None)
+
+    def instant(self, name: str, cat: str = "", **args) -> None:
+        if self.enabled:
+            self._put(("i", name, cat, time.perf_counter_ns(), 0, threading.get_ident(), args or None))
+
+    def events(self) -> List[tuple]:
+        """按写入顺序返回缓冲中的事件（满时只含最近 ``capacity`` 个）。"""
+        n = self._n
+        if n <= self.capacity:
+            evs = self._buf[:n]
+        else:
+            k = n % self.capacity
+            evs = self._buf[k:] + self._buf[:k]
+        return [e for e in evs if e is not None]
+
+    @property
+    def dropped(self) -> int:
+        return max(0, self._n - self.capacity)
+
+    def to_chrome(self) -> Dict[str, Any]:
+        """Chrome trace-event 格式（时间单位 us，相对追踪起点）。"""
+        pid = os.getpid()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        out = []
+        tids = set()
+        for ph, name, cat, t0, dur, tid, args in self.events():
+            ev = {"name": name, "cat": cat or "app", "ph": ph, "ts": (t0 - self.t_origin) / 1e3,
+                  "pid": pid, "tid": tid}
+            if ph == "X":
+                ev["dur"] = dur / 1e3
+            else:
+                ev["s"] = "t"
+            if args:
+                ev["args"] = {k: (v if isinstance(v, (int, float, str, bool)) or v is None else str(v))
+                              for k, v in args.items()}
+            out.append(ev)
+            tids.add(tid)
+        for tid in tids:
+            out.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                        "args": {"name": names.get(tid, str(tid))}})
+        return {"traceEvents": out, "displayTimeUnit": "ms",
+                "otherData": {"dropped_events": self.dropped}}
+
+    def dump(self, path: str) -> str:
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome(), f)
+        return path
+
+
+TRACER = Tracer()
+
+
+def enable(capacity: int = 65536, path: Optional[str] = None) -> Tracer:
+    """清空缓冲并开始记录；``path`` 为 ``dump()`` 缺省输出路径。"""
+    TRACER.reset(capacity)
+    TRACER.path = path
+    TRACER.enabled = True
+    return TRACER
+
+
+def disable() -> None:
+    TRACER.enabled = False
+
+
+def span(name: str, cat: str = "", **args):
+    return TRACER.span(name, cat, **args)
+
+
+def instant(name: str, cat: str = "", **args) -> None:
+    TRACER.instant(name, cat, **args)
+
+
+def traced(name: Optional[str] = None, cat: str = "") -> Callable:
+    """函数装饰器：启用时每次调用记录一个事件，名称缺省为 ``模块.函数``。"""
+    def deco(fn: Callable) -> Callable:
+        label = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*a, **kw):
+            if not TRACER.enabled:
+                return fn(*a, **kw)
+            with _Span(TRACER, label, cat, None):
+                return fn(*a, **kw)
+        return wrapper
+    return deco
+
+
+def dump(path: Optional[str] = None) -> Optional[str]:
+    path = path or TRACER.path
+    return TRACER.dump(path) if path else None
+
+
+__all__ = ["Tracer", "TRACER", "enable", "disable", "span", "instant", "traced", "dump"]
@@ -28,3 +28,30 @@ class Ticker:
             self.t_last = now
             return True
         return False
+
+class FrameTicker:
+    """按帧计数的采样时钟（离线回放）：每 ``round(period * fps)`` 帧触发一次，与处理速度无关。"""
+    def __init__(self, period_s: float, fps: float):
+        self.fps = float(fps) if fps and fps > 0 else 25.0
+        self.count = 0
+        self.period = period_s
+
+    @property
+    def period(self) -> float:
+        return self._period
+
+    @period.setter
+    def period(self, period_s: float):
+        self._period = float(period_s)
+        self.every_n = max(1, int(round(self._period * self.fps)))
+
+    def frames_until_tick(self) -> int:
+        """下一次触发前还需送入的帧数（含触发帧本身）。"""
+        return max(1, self.every_n - self.count)
+
+    def ready(self) -> bool:
+        self.count += 1
+        if self.count >= self.every_n:
+            self.count = 0
+            return True
+        return False
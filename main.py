@@ -12,22 +12,34 @@
 
 
 from __future__ import annotations
-import argparse, logging, os, csv
+import argparse, logging, os, csv, time
+from concurrent.futures import ThreadPoolExecutor
 
 from core.config import Config
 from core.logger import setup_logger
-from vision.detector import Detector
-from pipeline.postprocess import postprocess_sequences, postprocess_sequences_ex
-from pipeline.sampler import run_sampling
-from pipeline.state_machine import negotiate_stop, descend_execute
 from comms.modbus import ModbusClient
+from core import trace
+
+# 说明：视觉/采样/后处理各阶段（numpy、cv2，及可选的 ultralytics/torch）在 main() 内按需导入，
+# 使 --help 与配置错误等路径无需加载重依赖；模型在后台线程加载，与 Modbus 连接并行。
+
+
+@trace.traced("load_model", "phase")
+def _load_detector(weight: str | None, imgsz):
+    from vision.detector import Detector
+    return Detector(weight, imgsz=imgsz)
+
+def _column(x):
+    """采样列：ndarray（SampleStore 视图）一次性转为 Python 标量，列表原样使用。"""
+    return x.tolist() if hasattr(x, "tolist") else x
+
 
 def save_csv(path: str, flags, zs, ds):
     os.makedirs(os.path.dirname(path), exist_ok=True)
     with open(path, "w", newline='', encoding='utf-8') as f:
         w = csv.writer(f);
         w.writerow(["flag", "z", "dis"]);
-        w.writerows([[f, z, d] for f, z, d in zip(flags, zs, ds)])
+        w.writerows(zip(_column(flags), _column(zs), _column(ds)))
 
 
 # 1) 头部已有: import csv, os
@@ -40,6 +52,7 @@ def save_segments_csv(path: str, segments):
             w.writerow([int(fflag), round(float(s), 3), round(float(e), 3), round(float(dis), 3)])
 
 
+@trace.traced("main", "phase")
 def main(cfg_path: str, video_path: str | None):
     cfg = Config.load(cfg_path)
     log_cfg = cfg.section("logging")
@@ -48,14 +61,37 @@ def main(cfg_path: str, video_path: str | None):
     # 视觉配置
     vcfg = cfg.section("vision")
     weight = vcfg.get("weight_path")
+    # 尽早在后台线程加载模型（含 ultralytics/torch 导入），与下方配置解析、Modbus 连接并行
+    loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-load")
+    det_future = loader.submit(_load_detector, weight, vcfg.get("imgsz", 640))
+    loader.shutdown(wait=False)
+
+    from vision.size_filter import SizeFilter
+    from vision.band_classifier import load_band_classifier
+    from pipeline.geometry_map import CameraModel, BoundaryMap
+    from vision.adaptive_res import ResolutionController
+    from vision.kf_vote import HMMFlagFilter
+
     conf_thr = vcfg.get("conf_thr", {})
     center_band_px = int(vcfg.get("center_band_px", 20))
     vote_k = int(vcfg.get("vote_k", 5));
     vote_t = int(vcfg.get("vote_t", 3))
+    smoother = HMMFlagFilter.from_config(vcfg.get("smoother"))
+    frame_size = tuple(vcfg.get("frame_size", [640, 480]))
+    res_ctrl = ResolutionController.from_config(vcfg.get("adaptive_imgsz"), img_height=int(frame_size[1]),
+                                                band_px=center_band_px)
+    size_filter = SizeFilter.from_config(vcfg.get("size_filter"))
+    band_clf = load_band_classifier(vcfg.get("band_classifier"))
+    band_clf_conf = float(vcfg.get("band_classifier", {}).get("conf_min", 0.9))
 
     # 采样配置
     scfg = cfg.section("sampling")
     period_s = float(scfg.get("period_s", 1.0))
+    geo_map = None
+    if scfg.get("mode", "dense") == "sparse":
+        sparse_cfg = scfg.get("sparse", {})
+        geo_map = BoundaryMap(CameraModel.from_config(cfg.get("camera", {}), img_height=int(frame_size[1])),
+                              res_mm=float(sparse_cfg.get("res_mm", 5.0)), conf_thr=vcfg.get("conf_thr", {}))
 
     # 后处理配置
     pcfg = cfg.section("postproc")
@@ -65,6 +101,18 @@ def main(cfg_path: str, video_path: str | None):
     brush_offset_mm = float(pcfg.get("brush_offset_mm", 0))
     merge_gap_mm = float(pcfg.get("merge_gap_mm", 30))
     output_mode = pcfg.get("output_mode", "segments")
+    online_post = None
+    dis_tracker = None
+    if geo_map is None and not pcfg.get("online", False):
+        # 在线后处理只保留未定稿窗口且给出精确段距离，无需流式估计
+        from pipeline.dis_stream import RunDistanceTracker
+        dis_tracker = RunDistanceTracker.from_config(pcfg.get("dis_stream"))
+    if pcfg.get("online", False) and geo_map is None:
+        from pipeline.online_post import OnlinePostprocessor
+        # 采样器返回的 ds 尾部已前向填充，批量版的 ffill_tail 实际总是生效，在线版与之保持一致
+        online_post = OnlinePostprocessor(open_close_win, min_segment_mm, safety_delta_mm,
+                                          brush_offset_mm, merge_gap_mm,
+                                          dis_method="median", dis_trim_ratio=0.1, ffill_tail=True)
 
     # Modbus
     mcfg = cfg.section("modbus")
@@ -85,51 +133,181 @@ def main(cfg_path: str, video_path: str | None):
     min_step_mm = int(cfg.get("cleaning.min_step_mm", 150))
     max_step_mm = int(cfg.get("cleaning.max_step_mm", 180))
 
-    # 初始化
-    det = Detector(weight)
-    mod = ModbusClient(host, port, unit_id, timeout=2.0)
+    # 初始化：Modbus 连接与模型加载并行，连接完成后再等待模型就绪
+    with trace.span("modbus_connect", "plc"):
+        mod = ModbusClient(host, port, unit_id, timeout=2.0)
+    from pipeline.sampler import run_sampling
+    from pipeline.postprocess import postprocess_sequences_ex
+    from pipeline.state_machine import negotiate_stop, descend_execute
+    from pipeline.seg_timing import SegmentTimeModel
+    from pipeline.checkpoint import DescentCheckpoint
+    det = det_future.result()
+
+    # 二进制采样日志：上升过程中逐块落盘（中断时已写入的块仍可读取）
+    binlog = None
+    if log_cfg.get("binlog_path"):
+        from core.binlog import BinLogWriter
+        binlog = BinLogWriter(log_cfg.get("binlog_path"))
+
+    # 流式 CSV：采样中 dis 一经回填即送入写线程，成组落盘，代替结束时一次性写出
+    csv_path = log_cfg.get("csv_path", "logs/sample.csv")
+    csv_stream = log_cfg.get("csv_stream") or {}
+    row_q = csv_writer = None
+    if csv_stream.get("enable", False) and geo_map is None:
+        import queue
+        from runtime.csv_writer import start_csv_writer
+        row_q = queue.Queue()
+        csv_writer, csv_stop, csv_thread = start_csv_writer(
+            row_q, csv_path, header=["flag", "z", "dis"],
+            flush_rows=int(csv_stream.get("flush_rows", 256)),
+            flush_s=float(csv_stream.get("flush_s", 0.5)),
+            fsync_s=float(csv_stream.get("fsync_s", 0.0)),
+            rotate_bytes=int(csv_stream.get("rotate_bytes", 0)),
+            per_run=bool(csv_stream.get("per_run", False)))
+        logging.info("采样 CSV 流式写入 %s", csv_writer.path)
+
+    # 流式段距离启用时不保留逐采样 dis 列；原始采样 CSV 非流式写出时仍需要它
+    keep_dis = dis_tracker is None or row_q is not None
+    if not keep_dis:
+        logging.info("流式段距离统计：不保留逐采样 dis 列")
 
     # Phase-1 上升采样
     flags, zs, ds, stop_reason = run_sampling(mod, reg_base, det, video_path,
                                               period_s, conf_thr, center_band_px, vote_k, vote_t,
-                                              distance_cfg=cfg.get("distance", {}))
+                                              distance_cfg=cfg.get("distance", {}),
+                                              size_filter=size_filter,
+                                              band_clf=band_clf, band_clf_conf=band_clf_conf,
+                                              lookahead_cfg=scfg.get("lookahead"),
+                                              geo_map=geo_map, frame_size=frame_size,
+                                              res_ctrl=res_ctrl, stream=bool(vcfg.get("stream", False)),
+                                              replay_clock=scfg.get("replay_clock", "wall"),
+                                              decode_skip=bool(scfg.get("decode_skip", False)),
+                                              smoother=smoother, online_post=online_post,
+                                              dis_tracker=dis_tracker, binlog=binlog, row_q=row_q,
+                                              keep_dis=keep_dis)
+    if binlog is not None:
+        binlog.close()
 
     # 保存原始采样
-    csv_path = log_cfg.get("csv_path", "logs/sample.csv")
-    save_csv(csv_path, flags, zs, ds)
+    if csv_writer is not None:
+        csv_stop.set()
+        csv_thread.join()
+    else:
+        save_csv(csv_path, flags, zs, ds)
 
     # Phase-2 终止协商
     negotiate_stop(mod, reg_base, reason=stop_reason, timeout=3.0)
 
-    # 后处理（段模式，输出含 dis 的段表）
-    segments_with_dis = postprocess_sequences_ex(
-        flags, zs, ds,
-        open_close_win=open_close_win,
-        min_segment_mm=min_segment_mm,
-        safety_delta_mm=safety_delta_mm,
-        brush_offset_mm=brush_offset_mm,
-        merge_gap_mm=merge_gap_mm,
-        output_mode="segments",
-        dis_method="median", dis_trim_ratio=0.1,
-        interp_gap_max=interp_gap_max,
-        ffill_tail=ffill_tail,
-    )
+    # 后处理（段模式，输出含 dis 的段表）；在线模式下上升过程中已逐段定稿
+    if online_post is not None:
+        segments_with_dis = online_post.finish()
+    else:
+        segments_with_dis = postprocess_sequences_ex(
+            flags, zs, ds,
+            open_close_win=open_close_win,
+            min_segment_mm=min_segment_mm,
+            safety_delta_mm=safety_delta_mm,
+            brush_offset_mm=brush_offset_mm,
+            merge_gap_mm=merge_gap_mm,
+            output_mode="segments",
+            dis_method="median", dis_trim_ratio=0.1,
+            interp_gap_max=interp_gap_max,
+            ffill_tail=ffill_tail,
+            # 流式段距离：以常数内存的逐段估计代替整窗排序统计（此时 ds 为 None）
+            dis_of=None if dis_tracker is None else dis_tracker.segment_dis,
+        )
 
     # 保存后处理结果
     seg_csv_path = log_cfg.get("segments_csv_path", "logs/segments.csv")
     save_segments_csv(seg_csv_path, segments_with_dis)
+    if log_cfg.get("segments_binlog_path"):
+        from core.binlog import BinLogWriter, KIND_SEGMENTS
+        with BinLogWriter(log_cfg.get("segments_binlog_path"), kind=KIND_SEGMENTS) as seg_log:
+            seg_log.extend(segments_with_dis)
     print("后处理结果：", segments_with_dis)
 
     # Phase-3 逐段执行
-    descend_execute(mod, reg_base, segments_with_dis, dis_mm=-1.0, brush_width_mm=brush_width_mm,
-                    min_step_mm=min_step_mm, max_step_mm=max_step_mm, overlap_pct=overlap_pct)
+    ccfg = cfg.section("cleaning")
+    planner_cfg = ccfg.get("planner") or {}
+    dispatch_cfg = ccfg.get("dispatch") or {}
+    planner = None
+    if planner_cfg.get("enable", False):
+        from pipeline.segments import CycleCostModel
+        planner = CycleCostModel.from_config(planner_cfg)
+    checkpoint = DescentCheckpoint.from_config(ccfg.get("checkpoint"))
+    try:
+        descend_execute(mod, reg_base, segments_with_dis, dis_mm=-1.0, brush_width_mm=brush_width_mm,
+                        min_step_mm=min_step_mm, max_step_mm=max_step_mm, overlap_pct=overlap_pct,
+                        planner=planner,
+                        banned_zones=[tuple(z) for z in planner_cfg.get("banned_zones") or []],
+                        pipelined=bool(dispatch_cfg.get("pipelined", False)),
+                        poll_s=dispatch_cfg.get("poll_s"),
+                        prewrite=bool(dispatch_cfg.get("prewrite_params", False)),
+                        timing=SegmentTimeModel.from_config(ccfg.get("timeouts")),
+                        checkpoint=checkpoint)
+    except OSError:
+        if checkpoint is not None:
+            logging.error("下降过程中 Modbus 链路中断，进度已保存到 %s，可用 --resume 续跑", checkpoint.path)
+        raise
 
     logging.info("流程结束。")
 
 
+@trace.traced("resume", "phase")
+def resume(cfg_path: str) -> None:
+    """按下降检查点续跑：退避重连 PLC，从下一段继续，不重新采样与后处理。"""
+    cfg = Config.load(cfg_path)
+    log_cfg = cfg.section("logging")
+    setup_logger(level=log_cfg.get("level", "INFO"), logfile=log_cfg.get("file", None))
+    from pipeline.checkpoint import DescentCheckpoint
+    from pipeline.seg_timing import SegmentTimeModel
+    from pipeline.state_machine import resume_descent
+
+    ccfg = cfg.section("cleaning")
+    ck_cfg = ccfg.get("checkpoint") or {}
+    checkpoint = DescentCheckpoint(ck_cfg.get("path", "logs/descent_ckpt.json"))
+    if not checkpoint.load():
+        logging.error("没有可续跑的下降检查点：%s", checkpoint.path)
+        return
+    logging.info("读取检查点：%d 条命令，已完成 %d 条", len(checkpoint.rows), checkpoint.next_index)
+
+    mcfg = cfg.section("modbus")
+    mod = ModbusClient.connect_with_backoff(mcfg.get("host", "127.0.0.1"), int(mcfg.get("port", 15020)),
+                                            int(mcfg.get("unit_id", 1)), timeout=2.0,
+                                            retries=int(ck_cfg.get("reconnect_retries", 10)),
+                                            backoff_s=float(ck_cfg.get("backoff_s", 0.5)),
+                                            backoff_max_s=float(ck_cfg.get("backoff_max_s", 8.0)))
+    dispatch_cfg = ccfg.get("dispatch") or {}
+    resume_descent(mod, checkpoint,
+                   pipelined=bool(dispatch_cfg.get("pipelined", False)),
+                   poll_s=dispatch_cfg.get("poll_s"),
+                   prewrite=bool(dispatch_cfg.get("prewrite_params", False)),
+                   timing=SegmentTimeModel.from_config(ccfg.get("timeouts")))
+    logging.info("续跑结束。")
+
+
+def _setup_trace(cfg_path: str) -> None:
+    """按 ``logging.trace`` 配置启用阶段时间线追踪（结束时导出 Chrome trace JSON）。"""
+    tcfg = Config.load(cfg_path).section("logging").get("trace") or {}
+    if not tcfg.get("enable", False):
+        return
+    path = str(tcfg.get("path", "logs/trace_{ts}.json")).format(ts=time.strftime("%Y%m%d_%H%M%S"))
+    trace.enable(int(tcfg.get("capacity", 65536)), path)
+
+
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
     ap.add_argument("--config", default="config.yaml")
     ap.add_argument("--video", default="videos/demo1-0.mp4")
+    ap.add_argument("--resume", action="store_true", help="按下降检查点续跑（不重新采样）")
     a = ap.parse_args()
-    main(a.config, a.video)
+    _setup_trace(a.config)
+    try:
+        if a.resume:
+            resume(a.config)
+        else:
+            main(a.config, a.video)
+    finally:
+        out = trace.dump()
+        if out:
+            logging.info("时间线追踪已写入 %s（chrome://tracing 或 ui.perfetto.dev 打开）", out)
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+段间交接基准：在进程内启动 ``comms.plc_sim``，分别以逐段下发与流水线下发执行同一组段，
+以 PLC 侧记录的段间空闲（段完成回到 WAIT_SEG → 收到下一条 START_SEG）对比。
+逐段下发另以与流水线相同的 ``--poll-s`` 运行一次，把轮询频率与流水线（预编码/块写/预写）的收益分开。
+
+用法：
+    python -m pipeline.bench_dispatch --segs 20 --seg-time 0.2 --jitter 0.05 --poll-s 0.002
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import threading
+import time
+
+import comms.plc_sim as plc_sim
+from comms.modbus import ModbusClient
+from pipeline.state_machine import descend_execute
+
+
+def _segments(k: int):
+    segs, z = [], 2400.0
+    for i in range(k):
+        segs.append([1, z - 250.0, z, 800.0 + i])
+        segs.append([0, z - 320.0, z - 255.0, float("nan")])
+        z -= 330.0
+    return segs
+
+
+def _run(mod: ModbusClient, segs, **kw) -> list:
+    plc_sim.IDLE_S.clear()
+    plc_sim.init_regs()
+    t0 = time.perf_counter()
+    descend_execute(mod, plc_sim.REG_BASE, segs, **kw)
+    return list(plc_sim.IDLE_S), time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--segs", type=int, default=20)
+    ap.add_argument("--seg-time", type=float, default=0.2, help="模拟 PLC 每段清洗耗时（秒）")
+    ap.add_argument("--jitter", type=float, default=0.05, help="段耗时随机附加上限（秒）")
+    ap.add_argument("--poll-s", type=float, default=0.002, help="流水线及对照逐段下发的 STATUS 轮询间隔（秒）")
+    ap.add_argument("--port", type=int, default=plc_sim.PORT)
+    a = ap.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    plc_sim.PORT = a.port
+    plc_sim.EXEC_SEG_TIME_S = a.seg_time
+    plc_sim.EXEC_SEG_JITTER_S = a.jitter
+    threading.Thread(target=plc_sim.serve, daemon=True).start()
+    time.sleep(0.3)
+    mod = ModbusClient(plc_sim.HOST, a.port, plc_sim.UNIT_ID, timeout=2.0)
+    segs = _segments(a.segs)
+
+    for name, kw in (("逐段下发", {}),
+                     (f"逐段下发@{a.poll_s * 1e3:g}ms 轮询", {"poll_s": a.poll_s}),
+                     ("流水线", {"pipelined": True, "poll_s": a.poll_s}),
+                     ("流水线+预写参数", {"pipelined": True, "poll_s": a.poll_s, "prewrite": True})):
+        idle, total = _run(mod, segs, **kw)
+        mean = 1e3 * sum(idle) / max(1, len(idle))
+        print(f"{name}: 段间空闲 {len(idle)} 次，平均 {mean:.1f} ms，最大 {1e3 * max(idle, default=0):.1f} ms，"
+              f"总耗时 {total:.2f} s")
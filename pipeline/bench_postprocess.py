@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+后处理形态学基准：游程编码（NumPy）实现与逐样本纯 Python 参考实现对比，并校验输出完全一致。
+
+用法：
+    python -m pipeline.bench_postprocess --n 1000000 --win 15
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from pipeline.postprocess import convert_flags_to_runs, convert_flags_to_segments, morph_open_close
+
+
+# ============ 纯 Python 参考实现（向量化之前的逐样本版本） ============
+def _ref_remove_small_segments(flags: List[int], min_length: int, fill_with: int) -> List[int]:
+    n = len(flags)
+    result = flags.copy()
+    i = 0
+    while i < n:
+        j = i
+        while j < n and flags[j] == flags[i]:
+            j += 1
+        if j - i < min_length:
+            for k in range(i, j):
+                result[k] = fill_with
+        i = j
+    return result
+
+
+def _ref_morph_open_close(flags: List[int], win: int) -> List[int]:
+    eroded = _ref_remove_small_segments(flags, win, fill_with=0)
+    inverted = [1 - f for f in eroded]
+    return [1 - f for f in _ref_remove_small_segments(inverted, win, fill_with=0)]
+
+
+def _ref_convert_flags_to_segments(flags: List[int], zs: List[float]) -> List[Tuple[int, float, float]]:
+    segments = []
+    curr_flag, start_z, prev_z = flags[0], zs[0], zs[0]
+    for flag, z in zip(flags[1:], zs[1:]):
+        if flag != curr_flag:
+            segments.append((curr_flag, start_z, prev_z))
+            curr_flag, start_z = flag, z
+        prev_z = z
+    segments.append((curr_flag, start_z, prev_z))
+    return segments
+
+
+def _ref_convert_flags_to_runs(flags: List[int]) -> List[Tuple[int, int, int]]:
+    runs = []
+    curr_flag, i_start = flags[0], 0
+    for i in range(1, len(flags)):
+        if flags[i] != curr_flag:
+            runs.append((curr_flag, i_start, i - 1))
+            curr_flag, i_start = flags[i], i
+    runs.append((curr_flag, i_start, len(flags) - 1))
+    return runs
+
+
+def make_flags(n: int, seed: int = 0, mean_run: float = 40.0, noise: float = 0.02) -> List[int]:
+    """模拟采样 flag：长段交替 + 随机翻转噪声。"""
+    rng = np.random.default_rng(seed)
+    lengths = rng.geometric(1.0 / mean_run, size=2 * (n // int(mean_run)) + 2)
+    flags = np.repeat(np.arange(lengths.size) % 2, lengths)[:n]
+    flags ^= (rng.random(flags.size) < noise).astype(flags.dtype)
+    return flags.tolist()
+
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=1_000_000)
+    ap.add_argument("--win", type=int, default=15)
+    ap.add_argument("--seed", type=int, default=0)
+    a = ap.parse_args()
+
+    flags = make_flags(a.n, a.seed)
+    zs = (1000.0 + 0.5 * np.arange(len(flags))).tolist()
+    flags_np, zs_np = np.asarray(flags), np.asarray(zs)
+
+    cases = (
+        ("开闭运算", _ref_morph_open_close, morph_open_close, (flags, a.win), (flags_np, a.win)),
+        ("flag→段表", _ref_convert_flags_to_segments, convert_flags_to_segments, (flags, zs), (flags_np, zs_np)),
+        ("flag→索引段", _ref_convert_flags_to_runs, convert_flags_to_runs, (flags,), (flags_np,)),
+    )
+    print(f"样本数 {len(flags)}，窗口 {a.win}")
+    for name, ref_fn, fast_fn, args, args_np in cases:
+        ref, t_ref = _timed(ref_fn, *args)
+        out, t_fast = _timed(fast_fn, *args)
+        out_np, t_np = _timed(fast_fn, *args_np)
+        assert out == ref and out_np == ref, f"{name}：输出与参考实现不一致"
+        # list 输入含一次 list→ndarray 转换；ndarray 输入为游程编码本身的开销
+        print(f"{name}: 纯 Python {t_ref * 1e3:.1f} ms | 游程编码(list) {t_fast * 1e3:.1f} ms "
+              f"| 游程编码(ndarray) {t_np * 1e3:.1f} ms | 输出一致")
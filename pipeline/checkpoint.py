@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+下降进度检查点：每确认一次 ST_WAIT_SEG（段完成）即落盘，Modbus 链路中断后可从下一段继续，
+无需重新上升采样与后处理。
+
+文件为 JSON（临时文件写入 + fsync + ``os.replace`` 原子替换，断电不会留下半截文件）：
+
+    segments  后处理段表 [flag, z_start, z_end, dis]
+    rows      实际下发的命令参数 (h0_top, step, n, dis)，续跑时原样使用，不重新规划
+    next      下一条待执行命令的序号（之前的均已确认完成）
+    reg_base  寄存器基址
+    created / updated  时间戳
+
+全部段完成（FINISH_ALL 之后）删除检查点。
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+
+class DescentCheckpoint:
+    """下降进度检查点文件。"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.data: Dict[str, Any] = {}
+
+    @classmethod
+    def from_config(cls, cfg: Optional[dict]) -> Optional["DescentCheckpoint"]:
+        """由 ``cleaning.checkpoint`` 配置段构造；未启用返回 ``None``。"""
+        cfg = cfg or {}
+        if not cfg.get("enable", False):
+            return None
+        return cls(cfg.get("path", "logs/descent_ckpt.json"))
+
+    def _write(self) -> None:
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self.data["updated"] = time.time()
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def begin(self, segments: List[list], rows: List[tuple], reg_base: int) -> None:
+        """下发第一段之前写入完整计划。"""
+        self.data = {"version": 1, "segments": [list(map(float, s)) for s in segments],
+                     "rows": [[float(h0), float(step), int(n), float(dis)] for h0, step, n, dis in rows],
+                     "next": 0, "reg_base": int(reg_base), "created": time.time()}
+        self._write()
+
+    def mark_done(self, idx: int) -> None:
+        """第 ``idx`` 条命令已确认完成（PLC 回到 WAIT_SEG）。"""
+        if int(idx) + 1 > self.data.get("next", 0):
+            self.data["next"] = int(idx) + 1
+            self._write()
+
+    def load(self) -> bool:
+        """读取检查点；不存在或损坏返回 False。"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.data = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            logging.error("检查点读取失败 %s：%s", self.path, e)
+            return False
+        return True
+
+    def clear(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    @property
+    def rows(self) -> List[tuple]:
+        return [tuple(r) for r in self.data.get("rows", [])]
+
+    @property
+    def next_index(self) -> int:
+        return int(self.data.get("next", 0))
+
+    @property
+    def segments(self) -> List[list]:
+        return self.data.get("segments", [])
+
+
+__all__ = ["DescentCheckpoint"]
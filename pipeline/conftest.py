@@ -0,0 +1,45 @@
+# conftest.py
+# -*- coding: utf-8 -*-
+"""
+pipeline 测试公用夹具：进程内 PLC 模拟器（comms.plc_sim）。
+"""
+
+from __future__ import annotations
+
+import socket
+import threading
+import time
+
+import pytest
+
+import comms.plc_sim as plc_sim
+from comms.modbus import ModbusClient
+
+
+@pytest.fixture(scope="session")
+def plc_port():
+    """在空闲端口启动 plc_sim（守护线程，整个测试会话共用）。"""
+    with socket.socket() as s:
+        s.bind((plc_sim.HOST, 0))
+        plc_sim.PORT = s.getsockname()[1]
+    threading.Thread(target=plc_sim.serve, daemon=True).start()
+    for _ in range(100):
+        try:
+            socket.create_connection((plc_sim.HOST, plc_sim.PORT), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.02)
+    return plc_sim.PORT
+
+
+@pytest.fixture
+def plc(plc_port, monkeypatch):
+    """已连接的 ModbusClient；寄存器复位，段耗时可经 ``plc_sim.EXEC_SEG_TIME_S`` 调整（用例结束恢复）。"""
+    plc_sim.init_regs()
+    plc_sim.SEGS.clear()
+    plc_sim.IDLE_S.clear()
+    monkeypatch.setattr(plc_sim, "EXEC_SEG_TIME_S", 0.05)
+    monkeypatch.setattr(plc_sim, "EXEC_SEG_JITTER_S", 0.0)
+    mod = ModbusClient(plc_sim.HOST, plc_port, plc_sim.UNIT_ID, timeout=2.0)
+    yield mod
+    mod.sock.close()
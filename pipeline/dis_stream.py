@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+流式段距离统计：按 flag 连续段逐点更新，每个未结束的段只占 O(1) 内存，无需保留整窗排序。
+
+- ``P2Quantile``：P² 分位数算法（Jain & Chlamtac, 1985），5 个标记点跟踪中位数；
+  前 5 个样本内给出精确值（偶数个取中间两数均值，与 ``dis_stat_for_range`` 一致）。
+- ``ReservoirTrimmedMean``：容量固定的蓄水池抽样，在样本集上按 ``dis_stat_for_range``
+  的截尾规则求均值；样本数不超过容量时结果精确。
+- ``RunDistanceTracker``：由采样器在 dis 回填时按采样顺序喂入 ``(flag, z, dis)``，
+  flag 变化即封存上一段的统计量；``segment_dis`` 按 Z 重叠的采样数加权合并各段统计量，
+  给出后处理段的代表距离。
+
+精度报告（对比 ``postprocess_sequences_ex`` 的精确统计）：
+    python -m pipeline.dis_stream --csv logs/sample.csv
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import random
+from typing import List, Optional, Tuple
+
+
+class P2Quantile:
+    """P² 流式分位数估计（默认中位数），常数内存。"""
+
+    __slots__ = ("p", "n", "q", "pos", "want", "dwant")
+
+    def __init__(self, p: float = 0.5) -> None:
+        self.p = float(p)
+        self.n = 0
+        self.q: List[float] = []                  # 标记点高度（前 5 个样本时为原始样本）
+        self.pos = [0.0, 1.0, 2.0, 3.0, 4.0]      # 标记点实际位置
+        self.want = [0.0, 2 * self.p, 4 * self.p, 2 + 2 * self.p, 4.0]
+        self.dwant = [0.0, self.p / 2, self.p, (1 + self.p) / 2, 1.0]
+
+    def add(self, x: float) -> None:
+        self.n += 1
+        q = self.q
+        if self.n <= 5:
+            q.append(float(x))
+            q.sort()
+            return
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        pos = self.pos
+        for i in range(k + 1, 5):
+            pos[i] += 1
+        for i in range(5):
+            self.want[i] += self.dwant[i]
+        for i in (1, 2, 3):
+            d = self.want[i] - pos[i]
+            if (d >= 1 and pos[i + 1] - pos[i] > 1) or (d <= -1 and pos[i - 1] - pos[i] < -1):
+                s = 1 if d > 0 else -1
+                # 抛物线插值，越界则退化为线性插值
+                qp = q[i] + s / (pos[i + 1] - pos[i - 1]) * (
+                    (pos[i] - pos[i - 1] + s) * (q[i + 1] - q[i]) / (pos[i + 1] - pos[i])
+                    + (pos[i + 1] - pos[i] - s) * (q[i] - q[i - 1]) / (pos[i] - pos[i - 1]))
+                if not (q[i - 1] < qp < q[i + 1]):
+                    qp = q[i] + s * (q[i + s] - q[i]) / (pos[i + s] - pos[i])
+                q[i] = qp
+                pos[i] += s
+
+    def value(self) -> float:
+        if self.n == 0:
+            return float("nan")
+        if self.n <= 5:
+            m = self.n // 2
+            return self.q[m] if self.n % 2 == 1 else 0.5 * (self.q[m - 1] + self.q[m])
+        return self.q[2]
+
+
+class ReservoirTrimmedMean:
+    """固定容量蓄水池上的截尾均值（截尾规则同 ``dis_stat_for_range``）。"""
+
+    __slots__ = ("capacity", "trim_ratio", "n", "buf", "_rng")
+
+    def __init__(self, capacity: int = 256, trim_ratio: float = 0.1, seed: int = 0) -> None:
+        self.capacity = max(1, int(capacity))
+        self.trim_ratio = float(trim_ratio)
+        self.n = 0
+        self.buf: List[float] = []
+        self._rng = random.Random(seed)
+
+    def add(self, x: float) -> None:
+        self.n += 1
+        if len(self.buf) < self.capacity:
+            self.buf.append(float(x))
+        else:
+            j = self._rng.randrange(self.n)
+            if j < self.capacity:
+                self.buf[j] = float(x)
+
+    def value(self) -> float:
+        if not self.buf:
+            return float("nan")
+        k = max(1, int(len(self.buf) * self.trim_ratio))
+        w = sorted(self.buf)
+        w = w[k: len(w) - k] if len(w) >= 2 * k + 1 else w
+        return float(sum(w) / len(w))
+
+
+class _RunStat:
+    """单个 flag 连续段的流式统计。"""
+
+    __slots__ = ("flag", "z0", "z1", "n", "has_nan", "est")
+
+    def __init__(self, flag: int, z: float, est) -> None:
+        self.flag = flag
+        self.z0 = self.z1 = z
+        self.n = 0
+        self.has_nan = False
+        self.est = est
+
+    def add(self, z: float, dis: float) -> None:
+        self.z1 = z
+        self.n += 1
+        if math.isnan(dis):
+            self.has_nan = True        # 与批量统计一致：窗口含 NaN 则结果为 NaN
+        else:
+            self.est.add(dis)
+
+    def value(self) -> float:
+        return float("nan") if self.has_nan else self.est.value()
+
+
+class RunDistanceTracker:
+    """按 flag 连续段流式统计 dis；已结束的段仅保留 (flag, z0, z1, n, dis) 摘要。"""
+
+    def __init__(self, method: str = "median", trim_ratio: float = 0.1, capacity: int = 256) -> None:
+        self.method = method
+        self.trim_ratio = float(trim_ratio)
+        self.capacity = int(capacity)
+        self._cur: Optional[_RunStat] = None
+        self.runs: List[Tuple[int, float, float, int, float]] = []
+
+    @classmethod
+    def from_config(cls, cfg: Optional[dict]) -> Optional["RunDistanceTracker"]:
+        """由 ``postproc.dis_stream`` 配置段构造；未启用返回 ``None``。"""
+        cfg = cfg or {}
+        if not cfg.get("enable", False):
+            return None
+        return cls(method=cfg.get("method", "median"), trim_ratio=float(cfg.get("trim_ratio", 0.1)),
+                   capacity=int(cfg.get("capacity", 256)))
+
+    def _new_est(self):
+        if self.method == "median":
+            return P2Quantile(0.5)
+        return ReservoirTrimmedMean(self.capacity, self.trim_ratio, seed=len(self.runs))
+
+    def add(self, flag: int, z: float, dis: float) -> None:
+        """按采样顺序喂入已回填的 (flag, z, dis)。"""
+        flag = int(flag)
+        if self._cur is None or self._cur.flag != flag:
+            self._close()
+            self._cur = _RunStat(flag, float(z), self._new_est())
+        self._cur.add(float(z), float(dis))
+
+    def _close(self) -> None:
+        c = self._cur
+        if c is not None:
+            self.runs.append((c.flag, c.z0, c.z1, c.n, c.value()))
+        self._cur = None
+
+    def finish(self) -> List[Tuple[int, float, float, int, float]]:
+        self._close()
+        return self.runs
+
+    def segment_dis(self, z_start: float, z_end: float) -> float:
+        """
+        后处理段 [z_start, z_end] 的代表距离：合并与之 Z 重叠的全部连续段的统计值，
+        权重为各段落在区间内的估计采样数（按 Z 重叠比例折算）。
+        中位数取加权中位数，截尾均值取加权均值；任一参与段含 NaN 则为 NaN（同批量统计）。
+        无任何正重叠时（如零长度段）退回重叠最大的单段。
+        """
+        runs = list(self.runs)
+        if self._cur is not None:
+            c = self._cur
+            runs.append((c.flag, c.z0, c.z1, c.n, c.value()))
+        vals: List[Tuple[float, float]] = []
+        best, best_ovl = float("nan"), -math.inf
+        for _, z0, z1, n, v in runs:
+            ovl = min(z1, z_end) - max(z0, z_start)
+            if ovl > best_ovl:
+                best, best_ovl = v, ovl
+            if ovl < 0 or n == 0:
+                continue
+            w = n * (ovl / (z1 - z0) if z1 > z0 else 1.0)
+            if w > 0:
+                vals.append((v, w))
+        if not vals:
+            return best
+        if any(math.isnan(v) for v, _ in vals):
+            return float("nan")
+        if self.method != "median":
+            return sum(v * w for v, w in vals) / sum(w for _, w in vals)
+        vals.sort()
+        half = 0.5 * sum(w for _, w in vals)
+        acc = 0.0
+        for v, w in vals:
+            acc += w
+            if acc >= half:
+                return v
+        return vals[-1][0]
+
+
+def accuracy_report(flags, zs, ds, open_close_win: int = 15, merge_gap_mm: float = 10.0,
+                    trim_ratio: float = 0.1, capacity: int = 256) -> List[dict]:
+    """对比流式估计与精确统计：逐 flag 连续段、以及后处理段两个层面的绝对误差。"""
+    from pipeline.postprocess import (convert_flags_to_runs, dis_stat_for_range,
+                                      postprocess_sequences_ex)
+    rows = []
+    for method in ("median", "trimmed"):
+        tracker = RunDistanceTracker(method, trim_ratio, capacity)
+        for f, z, d in zip(flags, zs, ds):
+            tracker.add(f, z, d)
+        runs = tracker.finish()
+        exact_runs = [dis_stat_for_range(ds, i0, i1, method=method, trim_ratio=trim_ratio)
+                      for _, i0, i1 in convert_flags_to_runs(flags)]
+        run_err = [abs(r[4] - e) for r, e in zip(runs, exact_runs)]
+        segs = postprocess_sequences_ex(flags, zs, ds, open_close_win, 0, 0, 0, merge_gap_mm,
+                                        dis_method=method, dis_trim_ratio=trim_ratio)
+        seg_err = [abs(tracker.segment_dis(s, e) - d) for _, s, e, d in segs]
+        rows.append({"method": method, "runs": len(runs), "run_max_err": max(run_err, default=0.0),
+                     "segments": len(segs), "seg_max_err": max(seg_err, default=0.0),
+                     "seg_mean_err": sum(seg_err) / len(seg_err) if seg_err else 0.0})
+    return rows
+
+
+if __name__ == "__main__":
+    import csv
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--csv", default="logs/sample.csv")
+    ap.add_argument("--win", type=int, default=15, help="open_close_win")
+    ap.add_argument("--gap", type=float, default=10.0, help="merge_gap_mm")
+    ap.add_argument("--capacity", type=int, default=256)
+    a = ap.parse_args()
+
+    with open(a.csv, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    flags = [int(float(r["flag"])) for r in rows]
+    zs = [float(r["z"]) for r in rows]
+    ds = [float(r["dis"]) if r["dis"] not in ("", None) else float("nan") for r in rows]
+
+    print(f"{a.csv}: {len(flags)} 个采样")
+    for r in accuracy_report(flags, zs, ds, a.win, a.gap, capacity=a.capacity):
+        print(f"[{r['method']}] 连续段 {r['runs']} 个，最大误差 {r['run_max_err']:.3f} mm | "
+              f"后处理段 {r['segments']} 个，最大误差 {r['seg_max_err']:.3f} mm，平均 {r['seg_mean_err']:.3f} mm")
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+稀疏采样：由检测框几何重建绝对 Z 边界图。
+
+密集模式下段边界分辨率 = ``period_s`` × 上升速度。稀疏模式改为：
+
+1. 每次采样取当前帧的 body/flange/top/base 检测框上下边缘（像素）。
+2. 借助测距 ``dis``（``DistanceProvider``）与相机内参（``fy``、``cy``）把像素换算为毫米：
+   ``Z = z_cam + z_offset_mm + (cy - y) * dis / fy``（图像 y 向下，Z 向上）。
+3. 将每个框投影为绝对 Z 区间，按 ``res_mm`` 栅格累加置信度证据（片体为正、禁清类为负），
+   多帧重复观测自然融合。
+4. ``to_sequences()`` 输出栅格化的 ``flags / zs / ds``，直接交给 ``postprocess_sequences_ex``。
+
+注意：此时 ``open_close_win`` 等以“样本”为单位的参数对应 ``res_mm`` 栅格。
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class CameraModel:
+    """针孔相机竖直方向模型：像素行 → 绝对高度。"""
+
+    def __init__(self, fy: float, cy: float, z_offset_mm: float = 0.0) -> None:
+        self.fy = float(fy)
+        self.cy = float(cy)
+        self.z_offset_mm = float(z_offset_mm)
+
+    @classmethod
+    def from_config(cls, cfg: Optional[Dict[str, Any]], img_height: int) -> "CameraModel":
+        """由 ``camera`` 配置段构造；``cy`` 缺省为图像中心行（即中心带位置）。"""
+        cfg = cfg or {}
+        return cls(fy=float(cfg.get("fy", 600.0)),
+                   cy=float(cfg.get("cy", img_height // 2)),
+                   z_offset_mm=float(cfg.get("z_offset_mm", 0.0)))
+
+    def mm_per_px(self, dis_mm: float) -> float:
+        return float(dis_mm) / self.fy
+
+    def y_to_z(self, y_px, z_cam: float, dis_mm: float):
+        """像素行（标量或数组）→ 绝对 Z（mm）。"""
+        return z_cam + self.z_offset_mm + (self.cy - np.asarray(y_px, dtype=np.float64)) * (float(dis_mm) / self.fy)
+
+
+class BoundaryMap:
+    """按 ``res_mm`` 栅格融合多帧检测框投影的边界图。"""
+
+    def __init__(self, camera: CameraModel, res_mm: float = 5.0, conf_thr: Optional[dict] = None,
+                 banned_weight: float = 1.0) -> None:
+        self.camera = camera
+        self.res_mm = float(res_mm)
+        self.conf_thr = conf_thr or {}
+        self.banned_weight = float(banned_weight)
+        self._b0 = 0                                   # 栅格 0 对应的 bin 编号
+        self._body = np.zeros(0, dtype=np.float64)     # 片体证据
+        self._banned = np.zeros(0, dtype=np.float64)   # 禁清证据
+        self._dis_sum = np.zeros(0, dtype=np.float64)
+        self._dis_cnt = np.zeros(0, dtype=np.int64)
+        self.n_frames = 0
+        self.n_boxes = 0
+
+    # ============ 栅格扩展 ============
+    def _ensure(self, lo: int, hi: int) -> None:
+        """保证 bin 区间 [lo, hi) 可索引，按需向两端扩展（倍增）。"""
+        n = self._body.size
+        if n == 0:
+            self._b0 = lo
+        start = min(self._b0, lo)
+        end = max(self._b0 + n, hi)
+        if start == self._b0 and end == self._b0 + n:
+            return
+        if start < self._b0:
+            start = min(start, self._b0 - n)
+        if end > self._b0 + n:
+            end = max(end, self._b0 + 2 * n)
+        pad_l, pad_r = self._b0 - start, end - (self._b0 + n)
+        self._body = np.pad(self._body, (pad_l, pad_r))
+        self._banned = np.pad(self._banned, (pad_l, pad_r))
+        self._dis_sum = np.pad(self._dis_sum, (pad_l, pad_r))
+        self._dis_cnt = np.pad(self._dis_cnt, (pad_l, pad_r))
+        self._b0 = start
+
+    # ============ 观测 ============
+    def observe(self, detections: List[List[float]], z_cam: float, dis_mm: Optional[float]) -> int:
+        """投影一帧检测框并融合，返回被采纳的框数。``dis`` 未知时跳过。"""
+        self.n_frames += 1
+        if not detections or dis_mm is None or not np.isfinite(dis_mm) or dis_mm <= 0:
+            return 0
+        arr = np.asarray(detections, dtype=np.float64).reshape(len(detections), -1)
+        y1, y2, cls, conf = arr[:, 1], arr[:, 3], arr[:, 4].astype(np.int64), arr[:, 5]
+        names = ('top', 'body', 'flange', 'base')
+        thr = np.array([float(self.conf_thr.get(n, 0.0)) for n in names])
+        ok = (cls >= 0) & (cls < 4) & (y2 > y1)
+        ok &= conf >= thr[np.clip(cls, 0, 3)]
+        if not ok.any():
+            return 0
+        # 图像 y 向下：框下边缘 y2 对应较低的 Z
+        z_lo = self.camera.y_to_z(y2[ok], z_cam, dis_mm)
+        z_hi = self.camera.y_to_z(y1[ok], z_cam, dis_mm)
+        b_lo = np.floor(z_lo / self.res_mm).astype(np.int64)
+        b_hi = np.ceil(z_hi / self.res_mm).astype(np.int64)
+        self._ensure(int(b_lo.min()), int(b_hi.max()))
+        body = cls[ok] == 1
+        w = conf[ok]
+        for lo, hi, is_body, wi in zip(b_lo - self._b0, b_hi - self._b0, body, w):
+            if is_body:
+                self._body[lo:hi] += wi
+            else:
+                self._banned[lo:hi] += self.banned_weight * wi
+            self._dis_sum[lo:hi] += dis_mm
+            self._dis_cnt[lo:hi] += 1
+        self.n_boxes += int(ok.sum())
+        return int(ok.sum())
+
+    # ============ 输出 ============
+    def to_sequences(self) -> Tuple[List[int], List[float], List[Optional[float]]]:
+        """导出已观测栅格的 (flags, zs, ds)，zs 为 bin 中心高度（升序）。"""
+        seen = np.flatnonzero(self._dis_cnt > 0)
+        if seen.size == 0:
+            return [], [], []
+        flags = (self._body[seen] > self._banned[seen]).astype(np.int64)
+        zs = (seen + self._b0 + 0.5) * self.res_mm
+        ds = self._dis_sum[seen] / self._dis_cnt[seen]
+        return flags.tolist(), zs.tolist(), ds.tolist()
+
+    def boundaries(self) -> List[Tuple[float, int]]:
+        """返回融合后的 flag 跳变位置：[(Z_mm, 跳变后 flag), ...]。"""
+        flags, zs, _ = self.to_sequences()
+        return [(0.5 * (zs[i - 1] + zs[i]), flags[i]) for i in range(1, len(flags)) if flags[i] != flags[i - 1]]
+
+    def log_stats(self) -> None:
+        logging.info("稀疏边界图：观测帧=%d 采纳框=%d 栅格=%d (res=%.1fmm) 跳变=%d",
+                     self.n_frames, self.n_boxes, int(np.count_nonzero(self._dis_cnt)),
+                     self.res_mm, len(self.boundaries()))
+
+
+__all__ = ["CameraModel", "BoundaryMap"]
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+多带前视：利用画面中中心带上方的部件，预测刷头即将到达的 flag 跳变高度，并据此调整采样周期。
+
+中心带位于 ``img_height // 2``；上升过程中，中心带上方第 i 条带（中心行 ``cy - i * pitch_px``）
+对应的绝对高度约为 ``z + i * pitch_px * mm_per_px``。相邻带 flag 不同即视为一次即将到来的跳变。
+
+采样策略：最近跳变距离大于 ``near_mm``（或视野内无跳变）时使用粗周期 ``coarse_period_s``，
+否则恢复为密集的 ``period_s``。``near_mm`` 应小于视野覆盖的高度 ``(k-1) * pitch_px * mm_per_px``。
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from vision.center_band1 import judge_bands
+
+
+class LookaheadScheduler:
+    """多带前视判定 + 粗/密采样周期切换。"""
+
+    def __init__(self, img_height: int, band_width: int, period_s: float,
+                 k: int = 8, pitch_px: int = 20, mm_per_px: float = 1.0,
+                 near_mm: float = 60.0, coarse_period_s: Optional[float] = None) -> None:
+        self.band_width = int(band_width)
+        self.pitch_px = int(pitch_px)
+        self.mm_per_px = float(mm_per_px)
+        self.near_mm = float(near_mm)
+        self.dense_period_s = float(period_s)
+        self.coarse_period_s = float(coarse_period_s) if coarse_period_s else 2.0 * float(period_s)
+        cy = int(img_height) // 2
+        self.centers = cy - self.pitch_px * np.arange(max(1, int(k)))
+        self.centers = self.centers[self.centers - max(1, self.band_width // 2) >= 0]
+        # 各带相对中心带的高度偏移（mm）
+        self.offsets_mm = (cy - self.centers) * self.mm_per_px
+        self.last_flags = np.zeros(self.centers.size, dtype=np.int8)
+        self.n_coarse = 0
+        self.n_dense = 0
+
+    @classmethod
+    def from_config(cls, cfg: Optional[Dict[str, Any]], img_height: int, band_width: int,
+                    period_s: float) -> Optional["LookaheadScheduler"]:
+        """由 ``sampling.lookahead`` 配置段构造；未启用返回 ``None``。"""
+        cfg = cfg or {}
+        if not cfg.get("enable", False):
+            return None
+        return cls(img_height, band_width, period_s,
+                   k=int(cfg.get("k", 8)),
+                   pitch_px=int(cfg.get("pitch_px", 20)),
+                   mm_per_px=float(cfg.get("mm_per_px", 1.0)),
+                   near_mm=float(cfg.get("near_mm", 60.0)),
+                   coarse_period_s=cfg.get("coarse_period_s"))
+
+    def update(self, detections: List[List[float]], conf_thr: dict) -> np.ndarray:
+        """对当前帧做多带判定，返回 flag 向量（索引 0 为中心带，向上依次递增）。"""
+        self.last_flags = judge_bands(detections, conf_thr, self.centers, self.band_width)
+        return self.last_flags
+
+    def predict_transitions(self, z_now: float) -> List[Tuple[float, int]]:
+        """按最近一次 flag 向量预测上方跳变：[(Z_mm, 跳变后 flag), ...]，按高度升序。"""
+        f = self.last_flags
+        if f.size < 2:
+            return []
+        idx = np.flatnonzero(f[1:] != f[:-1])
+        z = z_now + 0.5 * (self.offsets_mm[idx] + self.offsets_mm[idx + 1])
+        return [(float(zz), int(f[i + 1])) for zz, i in zip(z, idx)]
+
+    def next_period(self) -> float:
+        """最近跳变远于 ``near_mm`` 时返回粗周期，否则返回密集周期。"""
+        trans = self.predict_transitions(0.0)   # 以中心带为零点的相对高度
+        if trans and trans[0][0] <= self.near_mm:
+            self.n_dense += 1
+            return self.dense_period_s
+        self.n_coarse += 1
+        return self.coarse_period_s
+
+    def log_stats(self) -> None:
+        total = self.n_coarse + self.n_dense
+        if total:
+            logging.info("多带前视：粗采样帧 %d / %d (%.1f%%)，粗周期=%.2fs 密集周期=%.2fs",
+                         self.n_coarse, total, 100.0 * self.n_coarse / total,
+                         self.coarse_period_s, self.dense_period_s)
+
+
+__all__ = ["LookaheadScheduler"]
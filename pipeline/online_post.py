@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+在线后处理：上升采样过程中逐点喂入 ``(flag, z, dis)``，段一旦不再受后续采样影响即定稿，
+采样结束时段表即可用于下降执行，无需在顶端等待批量后处理。
+
+输出与 ``postprocess_sequences_ex(..., output_mode="segments")`` 完全一致，流水线逐级增量化：
+
+1. 开运算门：1 游程长度未达 ``win`` 前暂存，达到即确定保留；游程结束仍不足则确定置 0。
+2. 闭运算门：开运算后的 0 游程同理，不足 ``win`` 即结束的整段置 1。
+   两级门各至多暂存 ``win-1`` 个采样，门后的 flag 均已确定。
+3. 清洗游程：flag 变化即上一游程定稿，转为 (flag, Z_start, Z_end) 段。
+4. 最小段长过滤 → 边界缩退（前瞻一段取下一段 flag）→ 刷头偏置 → 合并（前瞻一段判断是否并入）。
+5. 段代表距离：需已出现 z > 段终点的采样（索引区间确定），且区间内的 dis 空缺均已被后续
+   有效值回填（bfill）；结束时尾部按 ``ffill_tail`` 前向填充或裁剪。
+
+仅保留尚未定稿段所覆盖的采样（含刷头偏置余量），已定稿部分分批裁剪。
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from pipeline.postprocess import dis_stats_for_segments
+
+Segment = Tuple[int, float, float]
+
+
+class _RunGate:
+    """
+    游程门：值为 ``hold_value`` 的游程长度未达 ``win`` 前暂存；达到后连同后续采样原样放行，
+    游程不足 ``win`` 即结束则整段改为 ``short_to`` 放行。其余值直接放行。
+    输出 ``emit(值, 起始索引, 个数)``，索引连续递增。
+    """
+
+    __slots__ = ("win", "hold_value", "short_to", "emit", "cur", "run_len", "held_start", "held_n")
+
+    def __init__(self, win: int, hold_value: int, short_to: int, emit: Callable[[int, int, int], None]) -> None:
+        self.win = int(win)
+        self.hold_value = hold_value
+        self.short_to = short_to
+        self.emit = emit
+        self.cur: Optional[int] = None
+        self.run_len = 0
+        self.held_start = 0
+        self.held_n = 0
+
+    def feed(self, v: int, start: int, n: int) -> None:
+        if v != self.cur:
+            self.flush()
+            self.cur = v
+            self.run_len = 0
+        self.run_len += n
+        if v != self.hold_value or self.run_len - n >= self.win:
+            self.emit(v, start, n)
+            return
+        if self.held_n == 0:
+            self.held_start = start
+        self.held_n += n
+        if self.run_len >= self.win:
+            self.emit(v, self.held_start, self.held_n)
+            self.held_n = 0
+
+    def flush(self) -> None:
+        """当前游程结束：暂存部分按过短处理。"""
+        if self.held_n:
+            self.emit(self.short_to, self.held_start, self.held_n)
+            self.held_n = 0
+
+
+class OnlinePostprocessor:
+    """增量后处理器：``push`` 逐点喂入，``pop_ready`` 取已定稿段，``finish`` 收尾并返回完整段表。"""
+
+    def __init__(self, open_close_win: int, min_segment_mm: float, safety_delta_mm: float,
+                 brush_offset_mm: float, merge_gap_mm: float,
+                 dis_method: str = "median", dis_trim_ratio: float = 0.1,
+                 ffill_tail: bool = True) -> None:
+        self.min_segment_mm = float(min_segment_mm)
+        self.delta = float(safety_delta_mm)
+        self.offset = float(brush_offset_mm)
+        self.merge_gap_mm = float(merge_gap_mm)
+        self.dis_method = dis_method
+        self.dis_trim_ratio = float(dis_trim_ratio)
+        self.ffill_tail = bool(ffill_tail)
+
+        # 形态学两级门：开运算（短 1 → 0）→ 闭运算（短 0 → 1）→ 清洗游程
+        self._close_gate = _RunGate(open_close_win, hold_value=0, short_to=1, emit=self._on_clean)
+        self._open_gate = _RunGate(open_close_win, hold_value=1, short_to=0, emit=self._close_gate.feed)
+
+        # 采样缓冲（全局索引 = _base + 局部索引）
+        self._z: List[float] = []
+        self._d: List[Optional[float]] = []
+        self._base = 0
+        self._n = 0
+        self._pending_from: Optional[int] = None   # 最早一个尚未回填的 dis 空缺（全局索引）
+        self._last_dis: Optional[float] = None
+
+        # 清洗游程 (flag, 起点全局索引, 终点全局索引)
+        self._clean: Optional[List[int]] = None
+        # 边界缩退：前一段 flag 与前瞻中的当前段
+        self._prev_flag: Optional[int] = None
+        self._shrink_cur: Optional[Segment] = None
+        # 合并：累积中的段
+        self._merge_acc: Optional[List[float]] = None
+        # 等待距离统计的定稿段与已完成输出
+        self._dis_queue: List[Segment] = []
+        self._ready: List[List[float]] = []
+        self.segments: List[List[float]] = []
+        self._finished = False
+
+    # ============ 输入 ============
+    def push(self, flag: int, z: float, dis: Optional[float]) -> None:
+        assert not self._finished, "OnlinePostprocessor 已结束"
+        idx = self._n
+        self._n += 1
+        self._z.append(float(z))
+        self._d.append(dis)
+        if dis is None:
+            if self._pending_from is None:
+                self._pending_from = idx
+        else:
+            # bfill：用本次有效值回填此前的所有空缺
+            if self._pending_from is not None:
+                for i in range(self._pending_from - self._base, idx - self._base):
+                    self._d[i] = dis
+                self._pending_from = None
+            self._last_dis = dis
+        self._open_gate.feed(int(flag), idx, 1)
+        self._drain_dis()
+        self._trim()
+
+    def finish(self) -> List[List[float]]:
+        """采样结束：冲刷各级暂存，尾部 dis 按 ``ffill_tail`` 处理，返回完整段表。"""
+        if self._finished:
+            return self.segments
+        self._finished = True
+        self._open_gate.flush()
+        self._close_gate.flush()
+        if self._clean is not None:
+            self._emit_clean(*self._clean)
+            self._clean = None
+        if self._shrink_cur is not None:
+            self._shrink_step(None)
+        if self._merge_acc is not None:
+            self._dis_queue.append(tuple(self._merge_acc))
+            self._merge_acc = None
+        if self._pending_from is not None:
+            k = self._pending_from - self._base
+            if self.ffill_tail:
+                fill = self._last_dis
+                for i in range(k, len(self._d)):
+                    self._d[i] = fill
+            else:
+                del self._d[k:]        # 与批量版一致：尾部空缺被裁剪，窗口随之截断
+            self._pending_from = None
+        self._drain_dis()
+        return self.segments
+
+    def pop_ready(self) -> List[List[float]]:
+        """取出自上次调用以来新定稿的段 [flag, z_start, z_end, dis]。"""
+        out, self._ready = self._ready, []
+        return out
+
+    # ============ 清洗游程 → 段 ============
+    def _on_clean(self, v: int, start: int, n: int) -> None:
+        if self._clean is not None and self._clean[0] == v:
+            self._clean[2] = start + n - 1
+            return
+        if self._clean is not None:
+            self._emit_clean(*self._clean)
+        self._clean = [v, start, start + n - 1]
+
+    def _emit_clean(self, v: int, i0: int, i1: int) -> None:
+        seg = (v, self._z[i0 - self._base], self._z[i1 - self._base])
+        # 最小段长过滤
+        if seg[0] == 1 and seg[2] - seg[1] < self.min_segment_mm:
+            return
+        if self._shrink_cur is not None:
+            self._shrink_step(seg[0])
+        self._shrink_cur = seg
+
+    def _shrink_step(self, next_flag: Optional[int]) -> None:
+        flag, s, e = self._shrink_cur
+        if flag == 1:
+            if self._prev_flag is not None and self._prev_flag != flag:
+                s = max(s, s + self.delta)
+            if next_flag is not None and next_flag != flag:
+                e = min(e, e - self.delta)
+        self._prev_flag = flag
+        self._shrink_cur = None
+        if e > s:
+            if flag == 1:
+                s, e = s + self.offset, e + self.offset
+            self._merge_step(flag, s, e)
+
+    def _merge_step(self, flag: int, s: float, e: float) -> None:
+        acc = self._merge_acc
+        if acc is not None and acc[0] == flag and s - acc[2] < self.merge_gap_mm:
+            acc[2] = e
+            return
+        if acc is not None:
+            self._dis_queue.append(tuple(acc))
+        self._merge_acc = [flag, s, e]
+
+    # ============ 段代表距离 ============
+    def _drain_dis(self) -> None:
+        while self._dis_queue:
+            flag, s, e = self._dis_queue[0]
+            if not self._finished:
+                # 索引区间右端需已有 z > e 的采样；区间内 dis 需已全部回填
+                right = bisect_left(self._z, np.nextafter(e, np.inf))
+                if right >= len(self._z):
+                    return
+                if self._pending_from is not None and self._pending_from - self._base <= right:
+                    return
+            dis = dis_stats_for_segments(self._z, self._resolved_d(), [s], [e],
+                                         method=self.dis_method, trim_ratio=self.dis_trim_ratio)[0]
+            row = [float(flag), float(s), float(e), float(dis)]
+            self._dis_queue.pop(0)
+            self._ready.append(row)
+            self.segments.append(row)
+
+    def _resolved_d(self) -> List[float]:
+        n = len(self._d) if self._pending_from is None else self._pending_from - self._base
+        return [float(x) if x is not None else float("nan") for x in self._d[:n]]
+
+    # ============ 缓冲裁剪 ============
+    def _trim(self) -> None:
+        starts = [seg[1] for seg in self._dis_queue]
+        if self._merge_acc is not None:
+            starts.append(self._merge_acc[1])
+        if self._shrink_cur is not None:
+            starts.append(self._shrink_cur[1])
+        if self._clean is not None:
+            starts.append(self._z[self._clean[1] - self._base])
+        if not starts:
+            return
+        # 刷头偏置为负时可清段起点会前移，保留相应余量
+        low = min(starts) + min(0.0, self.offset)
+        k = bisect_left(self._z, low)
+        if self._pending_from is not None:
+            k = min(k, self._pending_from - self._base)
+        if k >= 1024 and k * 2 >= len(self._z):
+            del self._z[:k]
+            del self._d[:k]
+            self._base += k
+
+
+__all__ = ["OnlinePostprocessor"]
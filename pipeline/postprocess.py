@@ -17,38 +17,46 @@ from __future__ import annotations
 import csv
 from typing import List, Tuple
 
-import pandas as pd
+import numpy as np
 
-from vision.kf_vote import remove_small_segments
+from vision.kf_vote import remove_small_segments, run_length_encode
+from pipeline.segtable import SegmentPipeline, SegmentTable
+from core import trace
+
+
+def _merge_runs(values: np.ndarray, lengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """合并游程表中值相同的相邻段。"""
+    if values.size == 0:
+        return values, lengths
+    heads = np.flatnonzero(np.concatenate(([True], values[1:] != values[:-1])))
+    return values[heads], np.add.reduceat(lengths, heads)
+
+
+def _morph_runs(values: np.ndarray, lengths: np.ndarray, win: int) -> Tuple[np.ndarray, np.ndarray]:
+    """在游程域完成开闭运算，复杂度与段数成正比。"""
+    # 开运算：长度不足 win 的段置 0（短 1 段被腐蚀），相邻同值段合并后重新计长
+    values, lengths = _merge_runs(np.where(lengths < win, 0, values), lengths)
+    # 闭运算：等价于对反转序列做开运算，即短段置 1（短 0 段被填充）
+    return _merge_runs(np.where(lengths < win, 1, values), lengths)
+
+
+def _morph_array(flags, open_close_win: int) -> np.ndarray:
+    """开闭运算，输入输出均为数组（不经过 Python 列表）。"""
+    values, _, lengths = run_length_encode(flags)
+    values, lengths = _morph_runs(values, lengths, open_close_win)
+    return np.repeat(values, lengths)
 
 
 def morph_open_close(flags: List[int], open_close_win: int) -> List[int]:
     """对二值序列执行形态学开闭运算，去除孤立噪声。"""
-    # 开运算：先腐蚀小的 1 段，再膨胀恢复
-    eroded = remove_small_segments(flags, open_close_win, fill_with=0)
-    # 闭运算：先填充小的 0 段，再恢复
-    # 先对反转序列开运算，相当于闭运算
-    inverted = [1 - f for f in eroded]
-    closed_inverted = remove_small_segments(inverted, open_close_win, fill_with=0)
-    closed = [1 - f for f in closed_inverted]
-    return closed
+    if len(flags) == 0:
+        return []
+    return _morph_array(flags, open_close_win).tolist()
 
 
 def merge_segments(segments: List[Tuple[int, float, float]], merge_gap_mm: float) -> List[Tuple[int, float, float]]:
     """合并相邻同 flag 且间距小于 ``merge_gap_mm`` 的段。"""
-    if not segments:
-        return []
-    merged: List[Tuple[int, float, float]] = []
-    curr_flag, curr_start, curr_end = segments[0]
-    for flag, start, end in segments[1:]:
-        if flag == curr_flag and start - curr_end < merge_gap_mm:
-            # 合并
-            curr_end = end
-        else:
-            merged.append((curr_flag, curr_start, curr_end))
-            curr_flag, curr_start, curr_end = flag, start, end
-    merged.append((curr_flag, curr_start, curr_end))
-    return merged
+    return SegmentTable.from_list(segments).merge(merge_gap_mm).to_list()
 
 
 def shrink_boundaries(segments: List[Tuple[int, float, float]], delta: float) -> List[Tuple[int, float, float]]:
@@ -60,57 +68,17 @@ def shrink_boundaries(segments: List[Tuple[int, float, float]], delta: float) ->
     - 如果 ``flag1`` 为 1，则反向操作。
     缩退后若出现逆序（即 ``e <= s``），则舍弃该段。
     """
-    if not segments:
-        return []
-    adjusted: List[Tuple[int, float, float]] = []
-    for i, (flag, s, e) in enumerate(segments):
-        new_s, new_e = s, e
-        # 前后标志不同则分别处理边界
-        # 与前一个比较
-        if i > 0:
-            prev_flag, prev_s, prev_e = segments[i - 1]
-            if prev_flag != flag:
-                # 前一段和当前段不同
-                if flag == 1:
-                    # 当前段为可清，缩小起点
-                    new_s = max(new_s, s + delta)
-                elif flag == 0:
-                    # 当前段为不可清，扩大起点（禁清方向即向前）
-                    new_s = max(new_s, s)
-        # 与下一段比较
-        if i < len(segments) - 1:
-            next_flag, next_s, next_e = segments[i + 1]
-            if next_flag != flag:
-                if flag == 1:
-                    # 当前段为可清，缩小终点
-                    new_e = min(new_e, e - delta)
-                elif flag == 0:
-                    # 当前段为不可清，扩大终点
-                    new_e = min(new_e, e)
-        # 过滤掉反向或空段
-        if new_e > new_s:
-            adjusted.append((flag, new_s, new_e))
-    return adjusted
+    return SegmentTable.from_list(segments).shrink_boundaries(delta).to_list()
 
 
 def apply_brush_offset(segments: List[Tuple[int, float, float]], offset: float) -> List[Tuple[int, float, float]]:
     """将刷头偏置应用到可清段。"""
-    return [
-        (flag, s + offset, e + offset) if flag == 1 else (flag, s, e)
-        for flag, s, e in segments
-    ]
+    return SegmentTable.from_list(segments).apply_brush_offset(offset).to_list()
 
 
 def filter_min_length(segments: List[Tuple[int, float, float]], min_length: float) -> List[Tuple[int, float, float]]:
     """移除长度小于 ``min_length`` 的可清段。"""
-    filtered: List[Tuple[int, float, float]] = []
-    for flag, s, e in segments:
-        length = e - s
-        if flag == 1 and length < min_length:
-            # 放弃短可清段
-            continue
-        filtered.append((flag, s, e))
-    return filtered
+    return SegmentTable.from_list(segments).filter_min_length(min_length).to_list()
 
 
 def convert_flags_to_segments(flags: List[int], zs: List[float]) -> List[Tuple[int, float, float]]:
@@ -121,23 +89,7 @@ def convert_flags_to_segments(flags: List[int], zs: List[float]) -> List[Tuple[i
     :param zs: 按照采样时间升序排列的 Z 值列表。
     :return: 段列表，每个元素为 (flag, Z_start, Z_end)。
     """
-    assert len(flags) == len(zs), "flags 与 zs 长度不一致"
-    if not flags:
-        return []
-    segments: List[Tuple[int, float, float]] = []
-    curr_flag = flags[0]
-    start_z = zs[0]
-    prev_z = zs[0]
-    for flag, z in zip(flags[1:], zs[1:]):
-        # 遇到标志变化或非连续 Z（大幅跳变）
-        if flag != curr_flag:
-            segments.append((curr_flag, start_z, prev_z))
-            curr_flag = flag
-            start_z = z
-        prev_z = z
-    # 最后一段
-    segments.append((curr_flag, start_z, prev_z))
-    return segments
+    return SegmentTable.from_flags(flags, zs).to_list()
 
 
 def postprocess_sequences(flags: List[int], zs: List[float],
@@ -164,15 +116,9 @@ def postprocess_sequences(flags: List[int], zs: List[float],
     # 1. 开闭运算去噪
     flags_clean = morph_open_close(flags, open_close_win)
     # 2. 转换为段表
-    segments = convert_flags_to_segments(flags_clean, zs)
-    # 3. 最小段长过滤
-    segments = filter_min_length(segments, min_segment_mm)
-    # 4. 边界缩退
-    segments = shrink_boundaries(segments, safety_delta_mm)
-    # 5. 刷头偏置
-    segments = apply_brush_offset(segments, brush_offset_mm)
-    # 6. 合并相邻同 flag 段
-    segments = merge_segments(segments, merge_gap_mm)
+    # 3~6. 最小段长过滤 → 边界缩退 → 刷头偏置 → 合并相邻同 flag 段（段表上整列运算）
+    pipe = SegmentPipeline(min_segment_mm, safety_delta_mm, brush_offset_mm, merge_gap_mm)
+    segments = pipe.run(flags_clean, zs).to_list()
     # 输出
     if output_mode.lower() == "points":
         # 点表：保持 flags 和 zs
@@ -193,7 +139,7 @@ __all__ = [
 ]
 # ——在原文件顶部 import 附近追加——
 from bisect import bisect_left, bisect_right
-from typing import Optional
+from typing import Callable, Optional
 
 # ——在原文件中新增：dis 序列回填工具——
 def backfill_then_ffill_dis(ds: List[Optional[float]],
@@ -202,7 +148,16 @@ def backfill_then_ffill_dis(ds: List[Optional[float]],
     """
     先向后填充（bfill）：用右侧最近的非 None 回填左边的 None；
     再可选向前填充（ffill）尾段；可选在短缺口做线性插值。
+
+    ``ds`` 为 ndarray 时 NaN 视为空缺；无空缺（如 ``SampleStore.ds`` 已由采样器回填）原样返回不复制，
+    否则转为列表按同样规则填充。
     """
+    if isinstance(ds, np.ndarray):
+        arr = np.asarray(ds, dtype=np.float64)
+        nan = np.isnan(arr)
+        if not nan.any():
+            return arr
+        ds = np.where(nan, None, arr).tolist()
     n = len(ds)
     out = ds[:]
     # bfill
@@ -245,9 +200,14 @@ def backfill_then_ffill_dis(ds: List[Optional[float]],
 def convert_flags_to_runs(flags: List[int]) -> List[Tuple[int, int, int]]:
     """
     将 flags 转为索引段：[(flag, i_start, i_end)]，闭区间。
+
+    ndarray 输入走向量化游程编码；list 输入保持逐元素循环（转数组再转回反而更慢）。
     """
-    if not flags:
+    if len(flags) == 0:
         return []
+    if isinstance(flags, np.ndarray):
+        values, starts, lengths = run_length_encode(flags)
+        return list(zip(values.tolist(), starts.tolist(), (starts + lengths - 1).tolist()))
     runs: List[Tuple[int, int, int]] = []
     curr_flag = flags[0]
     i_start = 0
@@ -282,9 +242,69 @@ def dis_stat_for_range(ds: List[float], i0: int, i1: int, method: str = "median"
     wsorted = wsorted[k: len(wsorted)-k] if len(wsorted) >= 2*k+1 else wsorted
     return float(sum(wsorted)/len(wsorted))
 
+# ——批量版：所有段一次反查索引并统计距离——
+def z_ranges_to_index(zs, z_starts, z_ends) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    ``z_range_to_index`` 的批量版：一次 ``np.searchsorted`` 求出全部段的闭区间索引 (i0, i1)。
+
+    bisect_right(zs, e) 等价于 bisect_left(zs, nextafter(e, +inf))，因此起止点可合并为一次左侧查找。
+    """
+    z = np.asarray(zs, dtype=np.float64)
+    s = np.asarray(z_starts, dtype=np.float64)
+    e = np.asarray(z_ends, dtype=np.float64)
+    pos = np.searchsorted(z, np.concatenate((s, np.nextafter(e, np.inf))), side="left")
+    i0, right = pos[:s.size], pos[s.size:]
+    i1 = np.maximum(i0, right - 1)
+    hi = max(z.size - 1, 0)
+    return np.clip(i0, 0, hi), np.clip(i1, 0, hi)
+
+
+def dis_stats_for_segments(zs, ds_filled, z_starts, z_ends,
+                           method: str = "median", trim_ratio: float = 0.1) -> np.ndarray:
+    """
+    ``dis_stat_for_range`` 的批量版：所有段的距离窗口拼接后按 (段号, 值) 一次排序，
+    再按下标取中位数，或用 ``np.add.reduceat`` 求截尾均值。
+
+    - ``ds_filled`` 可短于 ``zs``（``ffill_tail=False`` 时尾部被裁剪），窗口按实际长度截断，空窗口为 NaN。
+    - 窗口内含 NaN 的段结果为 NaN。
+    """
+    d = np.asarray(ds_filled, dtype=np.float64)
+    n_seg = len(z_starts)
+    out = np.full(n_seg, np.nan)
+    if n_seg == 0 or d.size == 0:
+        return out
+    i0, i1 = z_ranges_to_index(zs, z_starts, z_ends)
+    i1 = np.minimum(i1 + 1, d.size)                      # 开区间终点，按 ds 实际长度截断
+    lens = np.maximum(i1 - i0, 0)
+    nz = np.flatnonzero(lens)
+    if nz.size == 0:
+        return out
+    lens_nz = lens[nz]
+    offsets = np.concatenate(([0], np.cumsum(lens_nz)[:-1]))
+    # 拼接所有窗口的下标：段内 0..L-1 加上各段起点
+    seg = np.repeat(np.arange(nz.size), lens_nz)
+    idx = np.arange(seg.size) - offsets[seg] + i0[nz][seg]
+    vals = d[idx]
+    vals = vals[np.lexsort((vals, seg))]                 # 段内升序，NaN 排在段尾
+    has_nan = np.add.reduceat(np.isnan(vals), offsets) > 0
+
+    if method == "median":
+        lo = vals[offsets + (lens_nz - 1) // 2]
+        hi = vals[offsets + lens_nz // 2]
+        res = np.where(lens_nz % 2 == 1, lo, 0.5 * (lo + hi))
+    else:
+        k = np.maximum(1, (lens_nz * trim_ratio).astype(np.int64))
+        k = np.where(lens_nz >= 2 * k + 1, k, 0)          # 过短的窗口不截尾
+        rank = np.arange(seg.size) - offsets[seg]
+        keep = (rank >= k[seg]) & (rank < (lens_nz - k)[seg])
+        res = np.add.reduceat(np.where(keep, vals, 0.0), offsets) / (lens_nz - 2 * k)
+    out[nz] = np.where(has_nan, np.nan, res)
+    return out
+
 # ——保留原 postprocess_sequences 不变——
 
 # ——新增：带距离的后处理主函数——
+@trace.traced("postprocess_sequences_ex", "phase")
 def postprocess_sequences_ex(flags: List[int], zs: List[float], ds: List[Optional[float]],
                              open_close_win: int,
                              min_segment_mm: float,
@@ -295,34 +315,39 @@ def postprocess_sequences_ex(flags: List[int], zs: List[float], ds: List[Optiona
                              dis_method: str = "median",
                              dis_trim_ratio: float = 0.1,
                              interp_gap_max: int = 0,
-                             ffill_tail: bool = True
+                             ffill_tail: bool = True,
+                             dis_of: Optional[Callable[[float, float], float]] = None,
                              ) -> List[List[float]]:
     """
     扩展版后处理：在原有段表基础上追加段代表距离 dis。
     - points 模式输出 [flag, z, dis]
     - segments 模式输出 [flag, z_start, z_end, dis]
+    - 给定 ``dis_of(z_start, z_end)``（如 ``RunDistanceTracker.segment_dis``）时段距离由其给出，
+      跳过批量统计，``ds`` 可为 ``None``（points 模式下 dis 为 NaN）。
     """
-    assert len(flags) == len(zs) == len(ds), "flags/zs/ds 长度不一致"
-    # 1) dis 回填与清洗
-    ds_filled = backfill_then_ffill_dis(ds, ffill_tail=ffill_tail, max_interp_gap=interp_gap_max)
+    if ds is None:
+        assert dis_of is not None, "ds 为 None 时须给定 dis_of"
+        ds_filled = np.full(len(zs), np.nan)
+    else:
+        assert len(flags) == len(zs) == len(ds), "flags/zs/ds 长度不一致"
+        # 1) dis 回填与清洗
+        ds_filled = backfill_then_ffill_dis(ds, ffill_tail=ffill_tail, max_interp_gap=interp_gap_max)
     # 2) 形态学去噪
-    flags_clean = morph_open_close(flags, open_close_win)
+    flags_clean = _morph_array(flags, open_close_win)
     # 3) 段表（z）
-    segments = convert_flags_to_segments(flags_clean, zs)
-    segments = filter_min_length(segments, min_segment_mm)
-    segments = shrink_boundaries(segments, safety_delta_mm)
-    segments = apply_brush_offset(segments, brush_offset_mm)
-    segments = merge_segments(segments, merge_gap_mm)
+    pipe = SegmentPipeline(min_segment_mm, safety_delta_mm, brush_offset_mm, merge_gap_mm)
+    table = pipe.run(flags_clean, zs)
 
     if output_mode.lower() == "points":
-        return [[float(f), float(z), float(d)] for f, z, d in zip(flags_clean, zs, ds_filled)]
+        return [[float(f), float(z), float(d)] for f, z, d in zip(flags_clean.tolist(), zs, ds_filled)]
     else:
-        out: List[List[float]] = []
-        for flag, s, e in segments:
-            i0, i1 = z_range_to_index(zs, s, e)
-            dis_val = dis_stat_for_range(ds_filled, i0, i1, method=dis_method, trim_ratio=dis_trim_ratio)
-            out.append([float(flag), float(s), float(e), float(dis_val)])
-        return out
+        # 4) 全部段一次性反查索引并统计代表距离
+        if dis_of is not None:
+            dis = np.array([dis_of(s, e) for s, e in zip(table.start.tolist(), table.end.tolist())])
+        else:
+            dis = dis_stats_for_segments(zs, ds_filled, table.start, table.end,
+                                         method=dis_method, trim_ratio=dis_trim_ratio)
+        return np.column_stack((table.flag, table.start, table.end, dis)).tolist()
 
 # ——更新导出符号——
 __all__ += [
@@ -330,13 +355,17 @@ __all__ += [
     "convert_flags_to_runs",
     "z_range_to_index",
     "dis_stat_for_range",
+    "z_ranges_to_index",
+    "dis_stats_for_segments",
     "postprocess_sequences_ex",
 ]
 
 
 if __name__ == "__main__":
-    df = pd.read_csv(r'D:\workspace\绝缘子清洗机器人\项目代码\草稿版本0908-3\insulator_bot\logs\sample.csv')
-    flags = list(df['flag'])
+    from core.binlog import load_samples
+
+    flags, _, _ = load_samples(r'D:\workspace\绝缘子清洗机器人\项目代码\草稿版本0908-3\insulator_bot\logs\sample.csv')
+    flags = flags.tolist()
     win = 15
     eroded = remove_small_segments(flags, win, fill_with=0)
     closed = [1 - x for x in remove_small_segments([1 - x for x in eroded], win, fill_with=0)]
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+列式采样缓冲：flag / z / dis 三列 NumPy 数组，容量按倍增摊还扩展，``valid`` 位图代替 ``None`` 占位。
+
+- 每个采样 18 字节（int8 + 2×float64 + bool），追加只做标量写入，无逐 tick 的对象分配。
+- ``backfill`` 以一次切片赋值回填自上次回填以来的所有空缺。
+- ``flags`` / ``zs`` / ``ds`` 返回有效长度的视图，后处理与 CSV 写出直接使用，不复制。
+- ``keep_dis=False``（流式段距离统计时）不保存 dis 列：dis 只经 ``backfill`` 写入，一次回填的区间
+  取同一个值，由 ``dis_range`` 在回填后立即读出交给下游，每个采样只占 9 字节。
+"""
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class SampleStore:
+    """可增长的列式采样存储。"""
+
+    __slots__ = ("_flag", "_z", "_dis", "_valid", "n", "last_filled", "last_dis", "keep_dis", "_fill")
+
+    def __init__(self, capacity: int = 1024, keep_dis: bool = True) -> None:
+        cap = max(16, int(capacity))
+        self.keep_dis = bool(keep_dis)
+        dcap = cap if self.keep_dis else 0
+        self._flag = np.zeros(cap, dtype=np.int8)
+        self._z = np.zeros(cap, dtype=np.float64)
+        self._dis = np.full(dcap, np.nan, dtype=np.float64)
+        self._valid = np.zeros(dcap, dtype=bool)
+        self._fill = float("nan")              # 最近一次回填区间的取值（keep_dis=False 时供 dis_range）
+        self.n = 0
+        self.last_filled = -1                  # 最后一个已有 dis 的采样索引
+        self.last_dis: Optional[float] = None
+
+    def __len__(self) -> int:
+        return self.n
+
+    @property
+    def capacity(self) -> int:
+        return self._flag.size
+
+    def _grow(self) -> None:
+        cap = self.capacity * 2
+        for name, fill in (("_flag", 0), ("_z", 0.0), ("_dis", np.nan), ("_valid", False)):
+            old = getattr(self, name)
+            if old.size == 0:
+                continue
+            new = np.full(cap, fill, dtype=old.dtype)
+            new[:self.n] = old[:self.n]
+            setattr(self, name, new)
+
+    def append(self, flag: int, z: float, dis: Optional[float] = None) -> int:
+        """追加一个采样，返回其索引；``dis`` 为 ``None`` 表示待回填。"""
+        if self.n == self.capacity:
+            self._grow()
+        i = self.n
+        self._flag[i] = flag
+        self._z[i] = z
+        if dis is not None:
+            if not self.keep_dis:
+                raise ValueError("keep_dis=False 时 dis 只能经 backfill 写入")
+            self._dis[i] = dis
+            self._valid[i] = True
+        self.n += 1
+        return i
+
+    def backfill(self, dis: float) -> Tuple[int, int]:
+        """新距离到来：回填 ``last_filled`` 之后所有空缺，返回被回填的索引区间 [i0, i1)。"""
+        i0, i1 = self.last_filled + 1, self.n
+        if self.keep_dis:
+            gap = ~self._valid[i0:i1]
+            self._dis[i0:i1][gap] = dis
+            self._valid[i0:i1] = True
+        self.last_filled = i1 - 1
+        self.last_dis = self._fill = float(dis)
+        return i0, i1
+
+    def ffill_tail(self) -> Tuple[int, int]:
+        """采样结束：尾部空缺用最后一个已知值前向填充，没有已知值则为 NaN。返回填充区间。"""
+        i0, i1 = self.last_filled + 1, self.n
+        self._fill = np.nan if self.last_dis is None else self.last_dis
+        if self.keep_dis:
+            gap = ~self._valid[i0:i1]
+            self._dis[i0:i1][gap] = self._fill
+            self._valid[i0:i1] = True
+        self.last_filled = i1 - 1
+        return i0, i1
+
+    def dis_range(self, i0: int, i1: int) -> np.ndarray:
+        """刚由 ``backfill`` / ``ffill_tail`` 确定的 [i0, i1) 的 dis。"""
+        if self.keep_dis:
+            return self._dis[i0:i1]
+        return np.full(i1 - i0, self._fill)
+
+    @property
+    def flags(self) -> np.ndarray:
+        return self._flag[:self.n]
+
+    @property
+    def zs(self) -> np.ndarray:
+        return self._z[:self.n]
+
+    @property
+    def ds(self) -> Optional[np.ndarray]:
+        """dis 列视图；未回填位置为 NaN（以 ``valid`` 区分）。``keep_dis=False`` 时为 ``None``。"""
+        return self._dis[:self.n] if self.keep_dis else None
+
+    @property
+    def valid(self) -> np.ndarray:
+        return self._valid[:self.n]
+
+    def ds_optional(self) -> list:
+        """兼容旧接口：未回填位置为 ``None`` 的列表。"""
+        return [d if v else None for d, v in zip(self.ds.tolist(), self.valid.tolist())]
+
+    @property
+    def nbytes(self) -> int:
+        return self._flag.nbytes + self._z.nbytes + self._dis.nbytes + self._valid.nbytes
+
+
+__all__ = ["SampleStore"]
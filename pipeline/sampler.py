@@ -1,55 +1,175 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
-import time, logging, cv2, numpy as np
+import time, logging, queue, cv2, numpy as np
 from typing import List, Tuple, Optional
 
 from vision.detector import Detector
-from vision.center_band1 import judge_center_band
-from vision.kf_vote import VotingBuffer
-from core.utils import Ticker
+from vision.center_band1 import judge_center_band, band_body_prob
+from vision.kf_vote import VotingBuffer, HMMFlagFilter
+from vision.size_filter import SizeFilter
+from vision.band_classifier import BandStripClassifier
+from vision.adaptive_res import ResolutionController
+from core.utils import Ticker, FrameTicker
+from core.binlog import BinLogWriter
+from core import trace
+from pipeline.lookahead import LookaheadScheduler
+from pipeline.geometry_map import BoundaryMap
+from pipeline.online_post import OnlinePostprocessor
+from pipeline.dis_stream import RunDistanceTracker
+from pipeline.sample_store import SampleStore
 from comms.modbus import ModbusClient, CMD_SAMPLE_UP, ST_SAMPLING, ST_AT_TOP
 from sensors.distance_provider import DistanceProvider  # 新增
 
+def _decode_skip_allowed(ticker: Ticker, smoother: Optional[HMMFlagFilter], lookahead_cfg: Optional[dict],
+                         res_ctrl: Optional[ResolutionController]) -> bool:
+    """跳帧解码的前提：帧时钟，且没有需要逐帧可见的部件。不满足时告警并返回 False。"""
+    if not isinstance(ticker, FrameTicker):
+        logging.warning("跳帧解码需要视频源与帧时钟（replay_clock=frame），已禁用")
+        return False
+    if smoother is not None or (lookahead_cfg or {}).get("enable", False) or res_ctrl is not None:
+        # HMM 平滑、前瞻调度、自适应分辨率均假定逐帧可见，跳帧会使其只看到 tick 前的 vote_k 帧
+        logging.warning("跳帧解码与 HMM 平滑/前瞻调度/自适应分辨率不兼容，已禁用")
+        return False
+    return True
+
+
+@trace.traced("run_sampling", "phase")
 def run_sampling(mod: ModbusClient, reg_base: int, detector: Detector, video: str | None,
                  period_s: float, conf_thr: dict, center_band_px: int,
                  vote_k: int, vote_t: int,
-                 distance_cfg: Optional[dict] = None
-                 ) -> tuple[list[int], list[float], list[float], float]:
+                 distance_cfg: Optional[dict] = None,
+                 size_filter: Optional[SizeFilter] = None,
+                 band_clf: Optional[BandStripClassifier] = None,
+                 band_clf_conf: float = 0.9,
+                 lookahead_cfg: Optional[dict] = None,
+                 geo_map: Optional[BoundaryMap] = None,
+                 frame_size: Tuple[int, int] = (640, 480),
+                 res_ctrl: Optional[ResolutionController] = None,
+                 stream: bool = False,
+                 replay_clock: str = "wall",
+                 decode_skip: bool = False,
+                 smoother: Optional[HMMFlagFilter] = None,
+                 online_post: Optional[OnlinePostprocessor] = None,
+                 dis_tracker: Optional[RunDistanceTracker] = None,
+                 binlog: Optional[BinLogWriter] = None,
+                 row_q: Optional[queue.Queue] = None,
+                 keep_dis: bool = True,
+                 ) -> tuple[np.ndarray, np.ndarray, Optional[np.ndarray], float]:
 
     stop_reason = 0.0
     voter = VotingBuffer(window_size=vote_k, vote_threshold=vote_t)
 
-    flags: list[int] = []
-    zs: list[float] = []
-    ds: list[Optional[float]] = []     # 可能出现 None，占位等待回填
-    last_filled = -1
-    last_dis_val: Optional[float] = None
+    # 列式缓冲：flag/z/dis，dis 以 valid 位图标记待回填；keep_dis=False 时不保留 dis 列（返回 ds 为 None），
+    # dis 回填后即交给 dis_tracker / row_q
+    store = SampleStore(keep_dis=keep_dis)
+
+    def _resolved(i0: int, i1: int) -> None:
+        """[i0, i1) 的 dis 已确定：喂给流式距离统计，并按行送入 CSV 写线程。"""
+        if dis_tracker is None and row_q is None:
+            return
+        for f_, z_, d_ in zip(store.flags[i0:i1].tolist(), store.zs[i0:i1].tolist(), store.dis_range(i0, i1).tolist()):
+            if dis_tracker is not None:
+                dis_tracker.add(f_, z_, d_)
+            if row_q is not None:
+                row_q.put((f_, z_, d_))
     z=1000 # 模拟上升
 
     cap = None
-    if video:
+    results_iter = None
+    if video and stream:
+        # 流式模式：视频源交由检测器的流式预测器持有，逐帧取 (帧号, 时间戳, 原图, 检测结果)
+        results_iter = detector.stream(video)
+        if band_clf is not None or res_ctrl is not None:
+            logging.info("流式模式下检测与解码一体完成，忽略条带分类器与自适应分辨率")
+            band_clf = res_ctrl = None
+    elif video:
         cap = cv2.VideoCapture(video)
         if not cap.isOpened():
             logging.error("无法打开视频：%s", video)
             cap = None
 
+    # 预分配工作帧缓冲区 (高, 宽, 3)：视频帧缩放直接写入，无视频时保持全零
+    frame_w, frame_h = int(frame_size[0]), int(frame_size[1])
+    frame_buf = np.zeros((frame_h, frame_w, 3), dtype=np.uint8)
+    raw = None
+
     dis_provider = DistanceProvider(distance_cfg or {})
     ticker = Ticker(period_s)
+    if cap is not None and replay_clock == "frame":
+        # 离线回放按帧计时：采样行与处理速度无关，可复现
+        ticker = FrameTicker(period_s, cap.get(cv2.CAP_PROP_FPS))
+        logging.info("回放帧时钟：每 %d 帧采样一次", ticker.every_n)
+    decode_skip = decode_skip and _decode_skip_allowed(ticker, smoother, lookahead_cfg, res_ctrl)
+    n_skipped = 0
+    n_frames = n_fast = 0
+    lookahead: Optional[LookaheadScheduler] = None
     logging.info("开始采样...")
 
     while True:
-        if cap:
-            ret, frame = cap.read()
+        pre_dets = None
+        if results_iter is not None:
+            item = next(results_iter, None)
+            if item is None:
+                logging.info("视频结束，停止采样")
+                break
+            _, _, raw, pre_dets = item
+            # 检测框从原图坐标换算到工作帧坐标
+            sx, sy = frame_w / raw.shape[1], frame_h / raw.shape[0]
+            if sx != 1.0 or sy != 1.0:
+                pre_dets = [[x1 * sx, y1 * sy, x2 * sx, y2 * sy, c, p] for x1, y1, x2, y2, c, p in pre_dets]
+            frame = cv2.resize(raw, (frame_w, frame_h), dst=frame_buf)
+        elif cap:
+            # 跳帧解码：只有 tick 前最后 vote_k 帧会进入投票窗口，其余帧仅 grab() 不解码、不推理
+            if decode_skip and ticker.frames_until_tick() > vote_k:
+                if not cap.grab():
+                    logging.info("视频结束，停止采样")
+                    break
+                ticker.ready()   # 推进帧时钟（此时必不触发）
+                n_skipped += 1
+                continue
+            ret, raw = cap.read(raw)   # 解码复用上一帧的缓冲区
             if not ret:
                 logging.info("视频结束，停止采样")
                 break
-            frame = cv2.resize(frame, (640, 480))
+            frame = cv2.resize(raw, (frame_w, frame_h), dst=frame_buf)
         else:
-            frame = np.zeros((640, 480, 3), dtype=np.uint8)
+            frame = frame_buf
 
-        dets = Detector.detect(detector, frame)
-        flag_frame, cls_ins = judge_center_band(dets, conf_thr, frame.shape[0], center_band_px)
-        flag = voter.update(flag_frame)
+        # 条带分类器快速路径：高置信直接采用，否则回退到检测器 + 中心带判定
+        # 注：快速路径不区分禁清部件，cls_ins 仅为 'body' / 'none'
+        fast = False
+        dets: list = []
+        if band_clf is not None:
+            flag_frame, clf_conf = band_clf.predict(frame)
+            fast = clf_conf >= band_clf_conf
+            if fast:
+                cls_ins = "body" if flag_frame else "none"
+                p_frame = clf_conf if flag_frame else 1.0 - clf_conf
+                n_fast += 1
+        if not fast:
+            if pre_dets is not None:
+                dets = pre_dets
+            elif res_ctrl is not None:
+                dets = Detector.detect(detector, frame, imgsz=res_ctrl.current)
+            else:
+                dets = Detector.detect(detector, frame)
+            if size_filter is not None:
+                dets = size_filter.apply(dets, frame.shape[1], frame.shape[0])
+            flag_frame, cls_ins = judge_center_band(dets, conf_thr, frame.shape[0], center_band_px)
+            if smoother is not None:
+                p_frame = band_body_prob(dets, conf_thr, frame.shape[0], center_band_px)
+            if res_ctrl is not None:
+                res_ctrl.update(dets, flag_frame)
+            # 多带前视：远离跳变时粗采样，接近跳变时恢复密集采样
+            if lookahead is None and lookahead_cfg:
+                lookahead = LookaheadScheduler.from_config(lookahead_cfg, frame.shape[0], center_band_px, period_s)
+                lookahead_cfg = None
+            if lookahead is not None:
+                lookahead.update(dets, conf_thr)
+                ticker.period = lookahead.next_period()
+        n_frames += 1
+        # HMM 平滑器消费软概率；未启用时沿用 k-of-n 滑窗投票
+        flag = smoother.update(p_frame) if smoother is not None else voter.update(flag_frame)
 
         if ticker.ready():
             # 每周期：Z_SIGNAL++ → CMD_SAMPLE_UP
@@ -57,19 +177,28 @@ def run_sampling(mod: ModbusClient, reg_base: int, detector: Detector, video: st
             st, z_ = mod.read_status_and_z(reg_base)
             z+=50
             # 记录 Z/flag
-            flags.append(int(flag))
-            zs.append(float(z))
-            ds.append(None)  # 先占位，等 dis 到来后回填
+            store.append(flag, z)   # dis 先留空，等 dis 到来后回填
             logging.info("采样 flag=%d, z=%.2f, STATUS=%d", flag, z, st)
 
             # 获取 dis（慢速/异步）
             new_dis = dis_provider.try_get_distance_mm(frame)
             if new_dis is not None:
                 # 回填所有尚未填充的位置
-                for i in range(last_filled + 1, len(ds)):
-                    if ds[i] is None:
-                        ds[i] = float(new_dis)
-                last_filled = len(ds) - 1
+                _resolved(*store.backfill(float(new_dis)))
+
+            # 二进制日志增量落盘：dis 记原始读数，未测得记 NaN（加载时按同一规则回填）
+            if binlog is not None:
+                binlog.append(flag, z, float("nan") if new_dis is None else float(new_dis))
+
+            # 在线后处理：逐点喂入，段定稿即可用（dis 空缺由其内部回填）
+            if online_post is not None:
+                online_post.push(int(flag), float(z), None if new_dis is None else float(new_dis))
+                for seg in online_post.pop_ready():
+                    logging.info("段定稿 flag=%d z=[%.1f, %.1f] dis=%.1f", *seg)
+
+            # 稀疏模式：当前帧检测框按几何投影到绝对 Z 并融合
+            if geo_map is not None:
+                geo_map.observe(dets, z, store.last_dis)
 
             # TODO:现场测试的时候取消注释
             # # 触顶或视觉 top 结束（按需启用）
@@ -78,9 +207,28 @@ def run_sampling(mod: ModbusClient, reg_base: int, detector: Detector, video: st
             #     break
 
     if cap: cap.release()
+    if results_iter is not None: results_iter.close()
+    if size_filter is not None:
+        size_filter.log_stats()
+    if lookahead is not None:
+        lookahead.log_stats()
+    if res_ctrl is not None:
+        res_ctrl.log_stats()
+    if n_skipped:
+        logging.info("跳帧解码：跳过 %d 帧，解码推理 %d 帧", n_skipped, n_frames)
+    if band_clf is not None and n_frames:
+        logging.info("条带分类器快速路径命中 %d/%d 帧 (%.1f%%)", n_fast, n_frames, 100.0 * n_fast / n_frames)
+
+    # 采样结束后的尾部处理：若末尾仍有待回填位置，用最后一个已知值前向填充；没有已知值则用 NaN。
+    _resolved(*store.ffill_tail())
+    if dis_tracker is not None:
+        dis_tracker.finish()
 
-    # 采样结束后的尾部处理：若末尾仍有 None，用最后一个已知值前向填充；没有已知值则用 NaN。
-    last = next((v for v in reversed(ds) if v is not None), None)
-    ds = [ (last if (v is None and last is not None) else (float('nan') if v is None else v)) for v in ds ]
+    if geo_map is not None:
+        # 稀疏模式：以融合后的边界图代替逐 tick 的密集 flag 序列
+        geo_map.log_stats()
+        flags, zs, ds = geo_map.to_sequences()
+        return flags, zs, ds, stop_reason
 
-    return flags, zs, ds, stop_reason
+    # 返回有效长度视图，后处理与 CSV 写出直接使用
+    return store.flags, store.zs, store.ds, stop_reason
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+自适应段超时：记录每段 CLEANING 实际耗时，按机器人维护稳健线性模型，超时 = 预测耗时 + 分位数余量。
+
+- 特征：刷次 ``n`` 与段内行程 ``step*(n-1)``（mm），耗时 ≈ b0 + b1*n + b2*行程。
+- 拟合：Huber IRLS（残差尺度取 MAD），少量异常段（卡滞、人工暂停）不会拉偏模型。
+- 余量：内点残差（3σ 以内，σ 取 MAD）的 ``quantile`` 分位数 × ``margin_factor``，且不低于 ``min_margin_s``。
+- ACK（START_SEG → CLEANING）延迟同样取分位数 × 系数作为 ack 超时。
+- 样本不足 ``min_samples`` 时回退到旧公式 ``max(seg_timeout_base, 0.1*n)`` 与固定 ack 超时。
+- 学习的段超时只是预警：超过后继续等待至硬上限（旧公式与 ``hard_factor`` × 学习超时的较大者），
+  段在硬上限内完成即记录实际耗时，机器整体变慢时模型随之更新，不会因超时段不入模型而一直超时。
+- 观测逐段在线追加并重拟合；JSON 持久化（临时文件 + ``os.replace`` 原子替换），按 ``robot_id`` 分开。
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+def huber_fit(X: np.ndarray, y: np.ndarray, k: float = 1.345, iters: int = 20) -> np.ndarray:
+    """Huber 稳健线性回归（IRLS），返回系数。"""
+    w = np.ones(len(y))
+    beta = np.zeros(X.shape[1])
+    for _ in range(iters):
+        sw = np.sqrt(w)
+        beta_new = np.linalg.lstsq(X * sw[:, None], y * sw, rcond=None)[0]
+        r = y - X @ beta_new
+        s = 1.4826 * np.median(np.abs(r - np.median(r)))
+        if s < 1e-9:
+            beta = beta_new
+            break
+        u = np.abs(r) / (k * s)
+        w = np.where(u <= 1.0, 1.0, 1.0 / np.maximum(u, 1e-12))
+        if np.allclose(beta_new, beta, atol=1e-9):
+            beta = beta_new
+            break
+        beta = beta_new
+    return beta
+
+
+class SegmentTimeModel:
+    """按机器人持久化的段耗时模型，给出每段的 CLEANING 超时与 ack 超时。"""
+
+    def __init__(self, path: Optional[str] = None, robot_id: str = "default", quantile: float = 0.99,
+                 margin_factor: float = 1.5, min_margin_s: float = 0.3, min_timeout_s: float = 0.5,
+                 min_samples: int = 8, window: int = 500, huber_k: float = 1.345,
+                 hard_factor: float = 3.0) -> None:
+        self.path = path
+        self.robot_id = str(robot_id)
+        self.quantile = float(quantile)
+        self.margin_factor = float(margin_factor)
+        self.min_margin_s = float(min_margin_s)
+        self.min_timeout_s = float(min_timeout_s)
+        self.min_samples = int(min_samples)
+        self.window = int(window)
+        self.huber_k = float(huber_k)
+        self.hard_factor = float(hard_factor)
+        self.obs: List[List[float]] = []        # [n, 行程 mm, 耗时 s]
+        self.acks: List[float] = []             # START→CLEANING 延迟 s
+        self.beta: Optional[np.ndarray] = None
+        self.margin_s = 0.0
+        self._all: Dict[str, dict] = {}
+        self.load()
+
+    @classmethod
+    def from_config(cls, cfg: Optional[dict]) -> Optional["SegmentTimeModel"]:
+        """由 ``cleaning.timeouts`` 配置段构造；未启用返回 ``None``。"""
+        cfg = cfg or {}
+        if not cfg.get("adaptive", False):
+            return None
+        return cls(path=cfg.get("path", "logs/seg_timing.json"), robot_id=cfg.get("robot_id", "default"),
+                   quantile=float(cfg.get("quantile", 0.99)), margin_factor=float(cfg.get("margin_factor", 1.5)),
+                   min_margin_s=float(cfg.get("min_margin_s", 0.3)),
+                   min_timeout_s=float(cfg.get("min_timeout_s", 0.5)),
+                   min_samples=int(cfg.get("min_samples", 8)), window=int(cfg.get("window", 500)),
+                   hard_factor=float(cfg.get("hard_factor", 3.0)))
+
+    # ============ 持久化 ============
+    def load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._all = json.load(f).get("robots", {})
+        except (OSError, ValueError) as e:
+            logging.warning("段耗时模型读取失败，重新学习：%s", e)
+            self._all = {}
+            return
+        rec = self._all.get(self.robot_id, {})
+        self.obs = [list(map(float, o)) for o in rec.get("obs", [])][-self.window:]
+        self.acks = [float(a) for a in rec.get("acks", [])][-self.window:]
+        self._refit()
+        logging.info("段耗时模型 [%s]：%d 个观测，%s", self.robot_id, len(self.obs),
+                     "已拟合" if self.beta is not None else "样本不足，使用默认超时")
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        self._all[self.robot_id] = {"obs": self.obs, "acks": self.acks,
+                                    "beta": None if self.beta is None else self.beta.tolist(),
+                                    "margin_s": self.margin_s}
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "robots": self._all}, f)
+        os.replace(tmp, self.path)
+
+    # ============ 拟合 ============
+    def _refit(self) -> None:
+        if len(self.obs) < self.min_samples:
+            self.beta = None
+            return
+        a = np.asarray(self.obs, dtype=np.float64)
+        X = np.column_stack([np.ones(len(a)), a[:, 0], a[:, 1]])
+        y = a[:, 2]
+        self.beta = huber_fit(X, y, self.huber_k)
+        r = y - X @ self.beta
+        # 余量只看内点残差（|r| ≤ 3σ，σ 取 MAD）：异常段本就是要检出的故障，不应放宽超时
+        s = 1.4826 * np.median(np.abs(r - np.median(r)))
+        inl = r[np.abs(r) <= 3.0 * s] if s > 1e-9 else r
+        q = float(np.quantile(inl if inl.size else r, self.quantile))
+        self.margin_s = max(self.min_margin_s, self.margin_factor * max(0.0, q))
+
+    def observe(self, n: int, step_mm: float, dur_s: float) -> None:
+        """记录一段的 CLEANING 实测耗时并在线重拟合。"""
+        self.obs.append([float(n), float(step_mm) * max(0, int(n) - 1), float(dur_s)])
+        del self.obs[:-self.window]
+        self._refit()
+
+    def observe_ack(self, dt_s: float) -> None:
+        self.acks.append(float(dt_s))
+        del self.acks[:-self.window]
+
+    # ============ 超时 ============
+    def predict(self, n: int, step_mm: float) -> Optional[float]:
+        if self.beta is None:
+            return None
+        return float(self.beta @ [1.0, float(n), float(step_mm) * max(0, int(n) - 1)])
+
+    def seg_timeout(self, n: int, step_mm: float, seg_timeout_base: float) -> float:
+        pred = self.predict(n, step_mm)
+        if pred is None:
+            return max(seg_timeout_base, 0.1 * max(1, n))
+        return max(self.min_timeout_s, pred + self.margin_s)
+
+    def hard_timeout(self, n: int, step_mm: float, seg_timeout_base: float) -> float:
+        """判段失败的硬上限：不低于旧公式，且为学习超时的 ``hard_factor`` 倍。"""
+        return max(seg_timeout_base, 0.1 * max(1, n), self.hard_factor * self.seg_timeout(n, step_mm, seg_timeout_base))
+
+    def ack_timeout(self, default_s: float) -> float:
+        if len(self.acks) < self.min_samples:
+            return default_s
+        a = np.asarray(self.acks)
+        s = 1.4826 * np.median(np.abs(a - np.median(a)))
+        inl = a[np.abs(a - np.median(a)) <= 3.0 * s] if s > 1e-9 else a
+        return max(self.min_timeout_s, self.margin_factor * float(np.quantile(inl, self.quantile)))
+
+
+__all__ = ["SegmentTimeModel", "huber_fit"]
@@ -42,7 +42,8 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 import math
-from typing import List, Tuple
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
 
 def _clamp(x: float, lo: float, hi: float) -> float:
     return max(lo, min(hi, x))
@@ -111,3 +112,171 @@ def segments_to_commands(
         cmds.append((int(z0), int(step_use), int(n), int(dis_i), int(is_last)))
 
     return cmds
+
+
+
+# ============ 节拍最优规划 ============
+@dataclass
+class CycleCostModel:
+    """
+    下降节拍模型：每刷一次 ``stroke_s``；每条段命令一次握手（START_SEG→CLEANING→WAIT_SEG）``handshake_s``；
+    段内步进与段间移动按 ``travel_mm_s``。相邻可清段间隙不超过 ``bridge_max_mm`` 才考虑桥接合并。
+    """
+    stroke_s: float = 1.5
+    handshake_s: float = 2.0
+    travel_mm_s: float = 100.0
+    bridge_max_mm: float = 150.0
+
+    @classmethod
+    def from_config(cls, cfg: Optional[dict]) -> "CycleCostModel":
+        cfg = cfg or {}
+        d = cls()
+        return cls(stroke_s=float(cfg.get("stroke_s", d.stroke_s)),
+                   handshake_s=float(cfg.get("handshake_s", d.handshake_s)),
+                   travel_mm_s=float(cfg.get("travel_mm_s", d.travel_mm_s)),
+                   bridge_max_mm=float(cfg.get("bridge_max_mm", d.bridge_max_mm)))
+
+
+@dataclass
+class CleaningPlan:
+    """规划结果：``commands`` 自上而下 (h0_top, step, n, dis, is_last)；``groups`` 为每条命令合并的原段序号。"""
+    commands: List[tuple] = field(default_factory=list)
+    groups: List[List[int]] = field(default_factory=list)
+    est_s: float = 0.0
+
+
+def _n_step_min(L_eff: float, W: int, min_step_mm: int, max_step_mm: int, quant_mm: int) -> Tuple[int, int]:
+    """步距限定在 [min_step, max_step] 时覆盖 L_eff 的最少刷次，以及该刷次下的均分步距。"""
+    if L_eff <= W:
+        return 1, int(min_step_mm)
+    n = 1 + int(math.ceil((L_eff - W) / max_step_mm))
+    step = int(_clamp(_qceil((L_eff - W) / (n - 1), quant_mm), min_step_mm, max_step_mm))
+    if W + step * (n - 1) < L_eff:          # 量化后被钳到上限仍不足：加一刷
+        n += 1
+        step = int(_clamp(_qceil((L_eff - W) / (n - 1), quant_mm), min_step_mm, max_step_mm))
+    return n, step
+
+
+def estimate_cycle_time(commands: List[tuple], cost: CycleCostModel) -> float:
+    """按节拍模型估算自上而下命令序列 (h0_top, step, n, ...) 的下降时长（握手 + 刷次 + 移动）。"""
+    t = 0.0
+    pos: Optional[float] = None
+    v = max(1e-6, cost.travel_mm_s)
+    for c in commands:
+        h0, step, n = float(c[0]), float(c[1]), int(c[2])
+        if pos is not None:
+            t += abs(pos - h0) / v
+        t += cost.handshake_s + n * cost.stroke_s + step * (n - 1) / v
+        pos = h0 - step * (n - 1)
+    return t
+
+
+def _weighted_dis(parts: List[Tuple[float, float, float]]) -> float:
+    """合并段的代表距离：各原段有效 dis 按段长加权；均无效返回 NaN。"""
+    num = den = 0.0
+    for s, e, d in parts:
+        if d is None or math.isnan(d) or d < 0:
+            continue
+        w = max(e - s, 1e-6)
+        num += w * d
+        den += w
+    return num / den if den > 0 else float("nan")
+
+
+def greedy_plan(segments: List[list], dis_mm: float, cost: CycleCostModel, **kw) -> CleaningPlan:
+    """原逐段规划（``segments_to_commands``，step_pref 贪心）包装为 ``CleaningPlan`` 以便比较节拍。"""
+    clean = sorted([(float(sg[1]), float(sg[2]), float(sg[3]) if len(sg) >= 4 else float(dis_mm))
+                    for sg in segments if int(sg[0]) == 1], key=lambda x: x[1], reverse=True)
+    cmds = segments_to_commands([(1, s, e) for s, e, _ in clean], dis_mm=dis_mm, **kw)
+    commands = [(e, c[1], c[2], d, c[4]) for (s, e, d), c in zip(clean, cmds)]
+    return CleaningPlan(commands, [[i] for i in range(len(clean))], estimate_cycle_time(commands, cost))
+
+
+def plan_cleaning(
+    segments: List[list],
+    dis_mm: float,
+    cost: CycleCostModel,
+    *,
+    brush_width_mm: int = 200,
+    overlap_pct: float = 0.20,
+    min_step_mm: int = 150,
+    max_step_mm: int = 180,
+    guard_start_mm: int = 5,
+    guard_end_mm: int = 10,
+    quant_mm: int = 1,
+    banned: Optional[List[Tuple[float, float]]] = None,
+) -> CleaningPlan:
+    """
+    节拍最优规划：自上而下对可清段做区间 DP，相邻段 i..j 合并为一条命令的代价为
+    一次握手 + 覆盖 [s_j, e_i]（含护边）的刷次 + 段内步进 + 移动到下一条命令起点；取总代价最小的分组。
+
+    - 间隙超过 ``bridge_max_mm``、或与 ``banned``（禁刷区 [(z0, z1)]，如法兰）有交叠的相邻段不合并；
+      flag==0 行只是可清段之间的间隙（后处理输出 1/0 交替全覆盖），本身不构成禁刷区；
+    - 每条命令的 (n, step) 候选：步距不超过 ``brush_width_mm*(1-overlap_pct)``（钳到 [min_step, max_step]）
+      的最少刷次均分步距，以及 ``segments_to_commands`` 对同一区间的取值，择节拍较短者；
+      因此结果不慢于 ``greedy_plan``（同参数），覆盖保障同 ``segments_to_commands``；
+    - segments 行为 [flag, z_start, z_end] 或 [flag, z_start, z_end, dis]，返回命令自上而下。
+    """
+    assert quant_mm >= 1 and min_step_mm <= max_step_mm
+    W = int(brush_width_mm)
+    step_cap = int(_clamp(round(W * (1.0 - overlap_pct)), min_step_mm, max_step_mm))
+    kw = dict(brush_width_mm=brush_width_mm, overlap_pct=overlap_pct, min_step_mm=min_step_mm,
+              max_step_mm=max_step_mm, guard_start_mm=guard_start_mm, guard_end_mm=guard_end_mm,
+              quant_mm=quant_mm)
+    clean = sorted([(float(sg[1]), float(sg[2]), float(sg[3]) if len(sg) >= 4 else float(dis_mm))
+                    for sg in segments if int(sg[0]) == 1], key=lambda x: x[1], reverse=True)
+    banned = [(float(min(a, b)), float(max(a, b))) for a, b in (banned or [])]
+    m = len(clean)
+    if m == 0:
+        return CleaningPlan()
+
+    # bridge_ok[k]：第 k 段与其下方第 k+1 段之间的间隙可桥接
+    bridge_ok = []
+    for k in range(m - 1):
+        lo, hi = clean[k + 1][1], clean[k][0]
+        ok = hi - lo <= cost.bridge_max_mm and not any(bs < hi and be > lo for bs, be in banned)
+        bridge_ok.append(ok)
+
+    v = max(1e-6, cost.travel_mm_s)
+
+    def group_cost(i: int, j: int) -> Tuple[float, int, int]:
+        top = clean[i][1]
+        L_eff = max(0.0, top - clean[j][0]) + guard_start_mm + guard_end_mm
+        _, step_g, n_g, _, _ = segments_to_commands([(1, clean[j][0], top)], dis_mm, **kw)[0]
+        cands = [_n_step_min(L_eff, W, min_step_mm, step_cap, quant_mm), (n_g, step_g)]
+        best = None
+        for n, step in cands:
+            c = cost.handshake_s + n * cost.stroke_s + step * (n - 1) / v
+            if j + 1 < m:
+                c += abs(top - step * (n - 1) - clean[j + 1][1]) / v
+            if best is None or c < best[0]:
+                best = (c, int(n), int(step))
+        return best
+
+    # dp[j]：前 j 段（自上而下）的最小代价；back[j]：最后一组的起始段
+    dp = [0.0] + [math.inf] * m
+    back = [0] * (m + 1)
+    for j in range(1, m + 1):
+        i = j - 1
+        while True:
+            c = dp[i] + group_cost(i, j - 1)[0]
+            if c < dp[j]:
+                dp[j], back[j] = c, i
+            if i == 0 or not bridge_ok[i - 1]:
+                break
+            i -= 1
+
+    groups: List[List[int]] = []
+    j = m
+    while j > 0:
+        groups.append(list(range(back[j], j)))
+        j = back[j]
+    groups.reverse()
+
+    commands = []
+    for g_idx, g in enumerate(groups):
+        i, j = g[0], g[-1]
+        _, n, step = group_cost(i, j)
+        dis = clean[i][2] if len(g) == 1 else _weighted_dis([clean[k] for k in g])
+        commands.append((clean[i][1], int(step), int(n), dis, 1 if g_idx == len(groups) - 1 else 0))
+    return CleaningPlan(commands, groups, estimate_cycle_time(commands, cost))
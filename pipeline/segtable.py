@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+段表：以三列平行数组（flag / start / end）存放 ``(flag, Z_start, Z_end)`` 段序列。
+
+最小段长过滤、边界缩退、刷头偏置、相邻段合并均为整列向量化运算，每步只生成新的数组，
+不构造中间 tuple 列表；``SegmentPipeline`` 按 postprocess 的固定顺序串联这四步。
+语义与 ``pipeline.postprocess`` 中原有的列表版函数逐段一致。
+"""
+from __future__ import annotations
+
+from typing import Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from vision.kf_vote import run_length_encode
+
+Segment = Tuple[int, float, float]
+
+
+class SegmentTable:
+    """段表（平行数组）。各变换方法返回新表，不修改原表。"""
+
+    __slots__ = ("flag", "start", "end")
+
+    def __init__(self, flag, start, end) -> None:
+        self.flag = np.asarray(flag, dtype=np.int8)
+        self.start = np.asarray(start, dtype=np.float64)
+        self.end = np.asarray(end, dtype=np.float64)
+
+    # ============ 构造 / 导出 ============
+    @classmethod
+    def empty(cls) -> "SegmentTable":
+        return cls(np.zeros(0), np.zeros(0), np.zeros(0))
+
+    @classmethod
+    def from_list(cls, segments: Sequence[Segment]) -> "SegmentTable":
+        if len(segments) == 0:
+            return cls.empty()
+        arr = np.asarray(segments, dtype=np.float64).reshape(len(segments), 3)
+        return cls(arr[:, 0], arr[:, 1], arr[:, 2])
+
+    @classmethod
+    def from_flags(cls, flags, zs) -> "SegmentTable":
+        """由逐采样 flag 与 Z 序列生成段表（每个连续同值游程一段，起止取首尾采样的 Z）。"""
+        assert len(flags) == len(zs), "flags 与 zs 长度不一致"
+        if len(flags) == 0:
+            return cls.empty()
+        values, starts, lengths = run_length_encode(flags)
+        z = np.asarray(zs, dtype=np.float64)
+        return cls(values, z[starts], z[starts + lengths - 1])
+
+    def to_list(self) -> List[Segment]:
+        return list(zip(self.flag.tolist(), self.start.tolist(), self.end.tolist()))
+
+    def __len__(self) -> int:
+        return int(self.flag.size)
+
+    def __iter__(self) -> Iterator[Segment]:
+        return iter(self.to_list())
+
+    def __repr__(self) -> str:
+        return f"SegmentTable(n={len(self)})"
+
+    def _take(self, idx) -> "SegmentTable":
+        return SegmentTable(self.flag[idx], self.start[idx], self.end[idx])
+
+    # ============ 向量化变换 ============
+    def filter_min_length(self, min_length: float) -> "SegmentTable":
+        """移除长度小于 ``min_length`` 的可清段。"""
+        drop = (self.flag == 1) & (self.end - self.start < min_length)
+        return self._take(~drop)
+
+    def shrink_boundaries(self, delta: float) -> "SegmentTable":
+        """0↔1 交界处可清段两端各缩退 ``delta``（相邻关系取自缩退前的段表），缩退后空段舍弃。"""
+        f = self.flag
+        if f.size == 0:
+            return self
+        change = f[1:] != f[:-1]
+        prev_diff = np.concatenate(([False], change)) & (f == 1)
+        next_diff = np.concatenate((change, [False])) & (f == 1)
+        s = np.where(prev_diff, np.maximum(self.start, self.start + delta), self.start)
+        e = np.where(next_diff, np.minimum(self.end, self.end - delta), self.end)
+        keep = e > s
+        return SegmentTable(f[keep], s[keep], e[keep])
+
+    def apply_brush_offset(self, offset: float) -> "SegmentTable":
+        """可清段整体偏移 ``offset``。"""
+        shift = np.where(self.flag == 1, offset, 0.0)
+        return SegmentTable(self.flag, self.start + shift, self.end + shift)
+
+    def merge(self, merge_gap_mm: float) -> "SegmentTable":
+        """合并相邻同 flag 且间距（后段起点 - 前段终点）小于 ``merge_gap_mm`` 的段。"""
+        f = self.flag
+        if f.size <= 1:
+            return self
+        joins = (f[1:] == f[:-1]) & (self.start[1:] - self.end[:-1] < merge_gap_mm)
+        heads = np.flatnonzero(np.concatenate(([True], ~joins)))
+        tails = np.append(heads[1:] - 1, f.size - 1)
+        return SegmentTable(f[heads], self.start[heads], self.end[tails])
+
+
+class SegmentPipeline:
+    """按固定顺序串联：最小段长过滤 → 边界缩退 → 刷头偏置 → 合并。"""
+
+    __slots__ = ("min_segment_mm", "safety_delta_mm", "brush_offset_mm", "merge_gap_mm")
+
+    def __init__(self, min_segment_mm: float, safety_delta_mm: float,
+                 brush_offset_mm: float, merge_gap_mm: float) -> None:
+        self.min_segment_mm = float(min_segment_mm)
+        self.safety_delta_mm = float(safety_delta_mm)
+        self.brush_offset_mm = float(brush_offset_mm)
+        self.merge_gap_mm = float(merge_gap_mm)
+
+    def __call__(self, table: SegmentTable) -> SegmentTable:
+        return (table.filter_min_length(self.min_segment_mm)
+                .shrink_boundaries(self.safety_delta_mm)
+                .apply_brush_offset(self.brush_offset_mm)
+                .merge(self.merge_gap_mm))
+
+    def run(self, flags, zs) -> SegmentTable:
+        """逐采样 flag/Z → 处理后的段表。"""
+        return self(SegmentTable.from_flags(flags, zs))
+
+
+__all__ = ["SegmentTable", "SegmentPipeline"]
@@ -1,44 +1,97 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 import logging, time, math
-from typing import List
+from functools import partial
+from typing import Callable, List, Optional, Tuple
 
 from comms.modbus import (
     ModbusClient,
     CMD_STOP_ASC, CMD_START_SEG, CMD_FINISH_ALL,
     ST_STOPPED, ST_CLEANING, ST_WAIT_SEG, ST_DONE,
 )
-from pipeline.segments import segments_to_commands
+from pipeline.segments import segments_to_commands, plan_cleaning, greedy_plan, CycleCostModel
+from pipeline.seg_timing import SegmentTimeModel
+from pipeline.checkpoint import DescentCheckpoint
+from core import trace
 
 def _wait_status(mod: ModbusClient, reg_base: int, expect: int, timeout: float, poll_s: float=0.05) -> bool:
-    t0 = time.time()
-    while time.time() - t0 < timeout:
-        st, _ = mod.read_status_and_z(reg_base)
-        if st == expect:
-            return True
-        time.sleep(poll_s)
-    return False
+    with trace.span("wait_status", "plc", expect=expect):
+        t0 = time.time()
+        while time.time() - t0 < timeout:
+            st, _ = mod.read_status_and_z(reg_base)
+            if st == expect:
+                return True
+            time.sleep(poll_s)
+        return False
 
+def _wait_status_fast(mod: ModbusClient, reg_base: int, expect: int, timeout: float, poll_s: float = 0.002) -> bool:
+    """紧凑轮询：仅读 STATUS 单寄存器，短间隔，用于段间交接。"""
+    with trace.span("wait_status", "plc", expect=expect):
+        t0 = time.perf_counter()
+        while time.perf_counter() - t0 < timeout:
+            if mod.read_status(reg_base) == expect:
+                return True
+            time.sleep(poll_s)
+        return False
+
+@trace.traced("negotiate_stop", "phase")
 def negotiate_stop(mod: ModbusClient, reg_base: int, reason: float = 2.0, timeout: float = 3.0) -> bool:
     mod.write_cmd(reg_base, CMD_STOP_ASC)
     ok = _wait_status(mod, reg_base, ST_STOPPED, timeout)
     logging.info("停止上升 STATUS=3 达成=%s", ok)
     return ok
 
+@trace.traced("descend_execute", "phase")
 def descend_execute(mod: ModbusClient, reg_base: int, segments: List[List[float]], dis_mm: float = -1.0,
                     ack_timeout: float = 3.0,
                     seg_timeout_base: float = 3.0,
                     brush_width_mm: int = 200,
                     min_step_mm: int = 150,
                     max_step_mm: int = 180,
-                    overlap_pct: float = 0.20) -> None:
+                    overlap_pct: float = 0.20,
+                    planner: Optional[CycleCostModel] = None,
+                    banned_zones: Optional[List[Tuple[float, float]]] = None,
+                    pipelined: bool = False,
+                    poll_s: Optional[float] = None,
+                    prewrite: bool = False,
+                    timing: Optional[SegmentTimeModel] = None,
+                    checkpoint: Optional[DescentCheckpoint] = None) -> None:
     """
     每段初始清洗点 = 该段最上端的 z（上边界 e）。
     segments 支持：
       - [flag, z_start, z_end]
       - [flag, z_start, z_end, dis]
     仅对 flag==1 的段下发。
+    给定 ``planner``（节拍模型）时按 ``plan_cleaning`` 合并相邻段并联合选取 n/step，
+    合并不跨越 ``banned_zones``（禁刷区 [(z0, z1)]）；否则逐段贪心规划。
+    ``pipelined`` 为真时下一段参数在当前段清洗期间预编码、校验，WAIT_SEG 一出现即块写参数并 START
+    （``prewrite`` 时参数在清洗期间就已写入，交接只剩 START 一次写；前提是 PLC 在 START_SEG 时锁存
+    H0..DIS、清洗中不再读参数寄存器，否则会改写正在执行的段）。
+    ``poll_s`` 为 STATUS 轮询间隔，None 取各模式默认（逐段 0.05s，流水线 0.002s）。
+    给定 ``timing`` 时段超时与 ack 超时由学习的耗时模型给出，并记录每段实测耗时、结束时持久化。
+    给定 ``checkpoint`` 时下发前写入完整命令表，每段确认完成后推进进度，链路中断可 ``resume_descent`` 续跑。
     """
+    run = partial(_runner(pipelined, poll_s, prewrite), timing=timing, on_done=None if checkpoint is None else checkpoint.mark_done)
+
+    def dispatch(rows: List[tuple]) -> None:
+        if checkpoint is not None:
+            checkpoint.begin(segments, rows, reg_base)
+        run(mod, reg_base, rows, ack_timeout, seg_timeout_base)
+        if checkpoint is not None:
+            checkpoint.clear()
+
+    if planner is not None:
+        plan = plan_cleaning(segments, dis_mm, planner, brush_width_mm=brush_width_mm,
+                             min_step_mm=min_step_mm, max_step_mm=max_step_mm, overlap_pct=overlap_pct,
+                             banned=banned_zones)
+        greedy = greedy_plan(segments, dis_mm, planner, brush_width_mm=brush_width_mm,
+                             min_step_mm=min_step_mm, max_step_mm=max_step_mm, overlap_pct=overlap_pct)
+        logging.info("节拍规划：%d 段 → %d 条命令，预计 %.1fs（逐段贪心 %d 条，%.1fs）",
+                     len(segments), len(plan.commands), plan.est_s, len(greedy.commands), greedy.est_s)
+        rows = [(h0, step, n, dis if not math.isnan(dis) else dis_mm) for h0, step, n, dis, _ in plan.commands]
+        dispatch(rows)
+        return
+
     # 仅保留可清段，抽出 (s, e, dis)
     seg_pairs = []
     for seg in segments:
@@ -73,6 +126,7 @@ def descend_execute(mod: ModbusClient, reg_base: int, segments: List[List[float]
 
     # 起始点改为：每段最上端 e（满足“从最上面一点开始”）
     # 如若 PLC 的 h0 语义是“首刷覆盖区的下边界”，改为：h0_top = e - brush_width_mm
+    rows = []
     for idx, (z_start_calc, step, n, dis_calc, is_last_calc) in enumerate(cmds):
         e_top = seg_pairs[idx][1]
         dis_seg = seg_dis_list[idx] if idx < len(seg_dis_list) else dis_calc
@@ -81,24 +135,226 @@ def descend_execute(mod: ModbusClient, reg_base: int, segments: List[List[float]
 
         h0_top = float(e_top)                 # 方案A：h0 为段上端“点”
         # h0_top = float(e_top - brush_width_mm)  # 方案B：若 h0 表示首刷下边界，请改用这一行
+        rows.append((h0_top, step, n, dis_seg))
+    dispatch(rows)
+
+
+def _runner(pipelined: bool, poll_s: Optional[float], prewrite: bool) -> Callable:
+    """按下发模式选择执行函数；``poll_s`` 为 None 时取该模式的默认轮询间隔。"""
+    if pipelined:
+        return partial(_run_segments_pipelined, poll_s=0.002 if poll_s is None else poll_s, prewrite=prewrite)
+    return partial(_run_segments, poll_s=0.05 if poll_s is None else poll_s)
+
+
+def _seg_timeouts(timing: Optional[SegmentTimeModel], n: int, step: float, ack_timeout: float,
+                  seg_timeout_base: float) -> tuple:
+    """
+    (ack 超时, 段超时, 段硬上限)：有耗时模型按模型给出，段超时仅作预警、超过后继续等待至硬上限；
+    否则为固定 ack 超时与旧公式（两者相同）。
+    """
+    if timing is None:
+        seg_to = max(seg_timeout_base, 0.1 * max(1, n))
+        return ack_timeout, seg_to, seg_to
+    return (timing.ack_timeout(ack_timeout), timing.seg_timeout(n, step, seg_timeout_base),
+            timing.hard_timeout(n, step, seg_timeout_base))
+
 
+def _wait_segment(wait: Callable[[float], bool], n: int, step: float, seg_to: float, hard_to: float) -> bool:
+    """等段完成：超过学习的段超时只告警并继续等待，到硬上限才判失败。"""
+    if wait(seg_to):
+        return True
+    if hard_to <= seg_to:
+        return False
+    logging.warning("段耗时超出预测超时 %.2fs（n=%d step=%.1f），继续等待至 %.2fs", seg_to, n, step, hard_to)
+    return wait(hard_to - seg_to)
+
+
+def _record_timing(timing: Optional[SegmentTimeModel], n: int, step: float, ok: bool, acked_first: bool,
+                   t_start: float, t_clean: float, t_done: float, hard_to: float) -> None:
+    """记录一段的实测耗时（含超出预测超时的慢段）；硬上限内未完成的段不入模型，重试后才进入清洗的 ack 延迟不计。"""
+    if timing is None:
+        return
+    if not ok:
+        logging.warning("段超时：n=%d step=%.1f 硬上限 %.2fs（预测 %s）", n, step, hard_to, timing.predict(n, step))
+        return
+    if acked_first:
+        timing.observe_ack(t_clean - t_start)
+    timing.observe(n, step, t_done - t_clean)
+
+
+def _run_segments(mod: ModbusClient, reg_base: int, rows: List[tuple], ack_timeout: float,
+                  seg_timeout_base: float, timing: Optional[SegmentTimeModel] = None,
+                  on_done: Optional[Callable[[int], None]] = None, start: int = 0,
+                  poll_s: float = 0.05) -> None:
+    """
+    逐条下发 (h0_top, step, n, dis)：START_SEG → 等 CLEANING → 等 WAIT_SEG，最后 FINISH_ALL。
+    确认回到 WAIT_SEG 后调用 ``on_done(start + 序号)``。
+    """
+    for idx, (h0_top, step, n, dis_seg) in enumerate(rows):
+        ack_to, seg_to, hard_to = _seg_timeouts(timing, n, step, ack_timeout, seg_timeout_base)
         logging.info("START_SEG h0=%.1f step=%.1f n=%d dis=%.1f last=%d",
-                     h0_top, step, n, dis_seg, 1 if idx == len(cmds)-1 else 0)
+                     h0_top, step, n, dis_seg, 1 if idx == len(rows)-1 else 0)
 
         mod.write_segment_params(reg_base, h0_top, step, n, dis_seg)
         mod.write_cmd(reg_base, CMD_START_SEG)
+        t_start = time.perf_counter()
+        trace.instant("START_SEG", "plc", idx=start + idx, n=n)
 
         # 等待进入清洗
-        if not _wait_status(mod, reg_base, ST_CLEANING, ack_timeout):
+        acked = _wait_status(mod, reg_base, ST_CLEANING, ack_to, poll_s)
+        if not acked:
             logging.warning("等待进入STATUS=6超时，重试一次CMD=5")
             mod.write_cmd(reg_base, CMD_START_SEG)
-            _ = _wait_status(mod, reg_base, ST_CLEANING, ack_timeout)
+            _ = _wait_status(mod, reg_base, ST_CLEANING, ack_to, poll_s)
+        t_clean = time.perf_counter()
 
         # 段完成后回到等待分段
-        ok = _wait_status(mod, reg_base, ST_WAIT_SEG, max(seg_timeout_base, 0.1 * max(1, n)))
+        ok = _wait_segment(lambda to: _wait_status(mod, reg_base, ST_WAIT_SEG, to, poll_s), n, step, seg_to, hard_to)
+        _record_timing(timing, n, step, ok, acked, t_start, t_clean, time.perf_counter(), hard_to)
         logging.info("段完成返回STATUS=5：%s", ok)
+        if ok and on_done is not None:
+            on_done(start + idx)
 
     # 完成
+    if timing is not None:
+        timing.save()
     mod.write_cmd(reg_base, CMD_FINISH_ALL)
-    _ = _wait_status(mod, reg_base, ST_DONE, 5.0)
+    _ = _wait_status(mod, reg_base, ST_DONE, 5.0, poll_s)
     logging.info("流程结束，STATUS=7")
+
+
+def _prepare_segment(row: tuple) -> Optional[List[int]]:
+    """校验并预编码一条段参数；非法（非有限值、步距/刷次越界）返回 None。"""
+    h0, step, n, dis = row
+    if not (math.isfinite(h0) and math.isfinite(step) and step > 0 and int(n) >= 1):
+        return None
+    if not math.isfinite(dis):
+        dis = -1.0
+    return ModbusClient.pack_segment_params(float(h0), float(step), int(n), float(dis))
+
+
+def _run_segments_pipelined(mod: ModbusClient, reg_base: int, rows: List[tuple], ack_timeout: float,
+                            seg_timeout_base: float, poll_s: float = 0.002, prewrite: bool = False,
+                            timing: Optional[SegmentTimeModel] = None,
+                            on_done: Optional[Callable[[int], None]] = None, start: int = 0) -> None:
+    """
+    流水线下发：当前段清洗期间预编码/校验下一段参数（``prewrite`` 时一并写入 PLC），
+    紧凑轮询 STATUS，回到 WAIT_SEG 即一次 FC16 块写参数（或直接）发 START_SEG。
+    ``prewrite`` 假定 PLC 在 START_SEG 时锁存参数块（plc_sim 即如此），清洗中改写参数寄存器不影响当前段。
+    ``on_done`` 推迟到下一段清洗期间调用，不占用段间交接。
+    """
+    rows = list(rows)
+    packed = [None] * len(rows)
+    written = -1                       # 已写入 PLC 的参数块对应的行号
+
+    def prepare(i: int) -> None:
+        packed[i] = _prepare_segment(rows[i])
+        if packed[i] is None:
+            logging.error("段参数非法，跳过：%s", rows[i])
+
+    if rows:
+        prepare(0)
+    idle = []
+    t_ready = None
+    done_pending = None                # 已确认完成、尚未通知 on_done 的序号
+    for idx, (h0_top, step, n, dis_seg) in enumerate(rows):
+        if packed[idx] is None:
+            if idx + 1 < len(rows):
+                prepare(idx + 1)
+            continue
+        ack_to, seg_to, hard_to = _seg_timeouts(timing, n, step, ack_timeout, seg_timeout_base)
+        if written != idx:
+            mod.write_segment_block(reg_base, packed[idx])
+            written = idx
+        mod.write_cmd(reg_base, CMD_START_SEG)
+        t_start = time.perf_counter()
+        trace.instant("START_SEG", "plc", idx=start + idx, n=n)
+        if t_ready is not None:
+            idle.append(time.perf_counter() - t_ready)
+        logging.info("START_SEG h0=%.1f step=%.1f n=%d dis=%.1f last=%d",
+                     h0_top, step, n, dis_seg, 1 if idx == len(rows) - 1 else 0)
+
+        acked = _wait_status_fast(mod, reg_base, ST_CLEANING, ack_to, poll_s)
+        if not acked:
+            logging.warning("等待进入STATUS=6超时，重试一次CMD=5")
+            mod.write_cmd(reg_base, CMD_START_SEG)
+            _ = _wait_status_fast(mod, reg_base, ST_CLEANING, ack_to, poll_s)
+        t_clean = time.perf_counter()
+
+        # 清洗期间：通知上一段完成，准备下一段
+        if done_pending is not None and on_done is not None:
+            on_done(start + done_pending)
+        done_pending = None
+        if idx + 1 < len(rows):
+            prepare(idx + 1)
+            if prewrite and packed[idx + 1] is not None:
+                mod.write_segment_block(reg_base, packed[idx + 1])
+                written = idx + 1
+
+        ok = _wait_segment(lambda to: _wait_status_fast(mod, reg_base, ST_WAIT_SEG, to, poll_s),
+                           n, step, seg_to, hard_to)
+        t_ready = time.perf_counter()
+        _record_timing(timing, n, step, ok, acked, t_start, t_clean, t_ready, hard_to)
+        logging.info("段完成返回STATUS=5：%s", ok)
+        if ok:
+            done_pending = idx
+
+    if done_pending is not None and on_done is not None:
+        on_done(start + done_pending)
+    if idle:
+        logging.info("段间交接 %d 次：主机侧平均 %.1f ms，最大 %.1f ms",
+                     len(idle), 1e3 * sum(idle) / len(idle), 1e3 * max(idle))
+    if timing is not None:
+        timing.save()
+    mod.write_cmd(reg_base, CMD_FINISH_ALL)
+    _ = _wait_status_fast(mod, reg_base, ST_DONE, 5.0, poll_s)
+    logging.info("流程结束，STATUS=7")
+
+
+def _params_index(mod: ModbusClient, reg_base: int, rows: List[tuple], nxt: int) -> Optional[int]:
+    """读回 PLC 段参数块，判断其属于第 nxt 还是 nxt+1 条命令；都不匹配（如写入中途断线）返回 None。"""
+    regs = mod.read_segment_block(reg_base)
+    for i in (nxt + 1, nxt):
+        if 0 <= i < len(rows) and _prepare_segment(rows[i]) == regs:
+            return i
+    return None
+
+
+@trace.traced("resume_descent", "phase")
+def resume_descent(mod: ModbusClient, checkpoint: DescentCheckpoint,
+                   ack_timeout: float = 3.0, seg_timeout_base: float = 3.0,
+                   pipelined: bool = False, poll_s: Optional[float] = None, prewrite: bool = False,
+                   timing: Optional[SegmentTimeModel] = None) -> None:
+    """
+    从检查点续跑下降。检查点可能落后一段（流水线模式推迟记录、或断线发生在记录之前），
+    因此读回 PLC 段参数块校正：第 k+1 段参数只会在第 k 段确认完成后写入，参数为 ``next+1``
+    即说明 ``next`` 已完成（``prewrite`` 模式下参数提前写入，不作此推断）。
+
+    - PLC 处于 CLEANING：等待当前段完成并记为完成，从其后一段继续；
+    - PLC 处于 WAIT_SEG（或尚未开始下降的 STOPPED）：从第一条未确认完成的命令继续
+      （无法确认的段重做，宁可多刷不漏刷）；
+    - 其他状态说明 PLC 已复位或流程已变化，拒绝续跑。
+    """
+    rows = checkpoint.rows
+    reg_base = int(checkpoint.data.get("reg_base", 0))
+    nxt = checkpoint.next_index
+    st = mod.read_status(reg_base)
+    if st not in (ST_CLEANING, ST_WAIT_SEG, ST_STOPPED):
+        raise RuntimeError(f"续跑：PLC STATUS={st}，不在等待分段/清洗状态，无法续跑")
+    cur = None if prewrite or nxt >= len(rows) else _params_index(mod, reg_base, rows, nxt)
+    if cur == nxt + 1:
+        checkpoint.mark_done(nxt)
+        nxt += 1
+    if st == ST_CLEANING and nxt < len(rows):
+        _, step, n, _ = rows[nxt]
+        _, _, hard_to = _seg_timeouts(timing, n, step, ack_timeout, seg_timeout_base)
+        logging.info("续跑：PLC 正在清洗第 %d 段，等待完成", nxt)
+        if not _wait_status(mod, reg_base, ST_WAIT_SEG, hard_to):
+            raise RuntimeError(f"续跑：等待第 {nxt} 段完成超时（STATUS 仍非 {ST_WAIT_SEG}）")
+        checkpoint.mark_done(nxt)
+        nxt += 1
+    logging.info("续跑：从第 %d/%d 段继续", nxt, len(rows))
+    run = _runner(pipelined, poll_s, prewrite)
+    run(mod, reg_base, rows[nxt:], ack_timeout, seg_timeout_base, timing=timing,
+        on_done=checkpoint.mark_done, start=nxt)
+    checkpoint.clear()
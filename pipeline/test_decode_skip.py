@@ -0,0 +1,29 @@
+# test_decode_skip.py
+# -*- coding: utf-8 -*-
+"""
+跳帧解码开关：前瞻配置存在但未启用时保持开启，需逐帧可见的部件启用时关闭。
+"""
+
+from __future__ import annotations
+
+from core.utils import FrameTicker, Ticker
+from pipeline.sampler import _decode_skip_allowed
+from vision.kf_vote import HMMFlagFilter
+
+# 与 config.yaml 中 sampling.lookahead 段一致（enable: false）
+LOOKAHEAD_OFF = {"enable": False, "k": 8, "pitch_px": 20, "mm_per_px": 1.0, "near_mm": 60, "coarse_period_s": 1.0}
+
+
+def test_stays_on_when_lookahead_section_disabled():
+    assert _decode_skip_allowed(FrameTicker(0.2, 25.0), None, LOOKAHEAD_OFF, None)
+    assert _decode_skip_allowed(FrameTicker(0.2, 25.0), None, None, None)
+
+
+def test_off_when_per_frame_consumer_enabled():
+    ticker = FrameTicker(0.2, 25.0)
+    assert not _decode_skip_allowed(ticker, None, dict(LOOKAHEAD_OFF, enable=True), None)
+    assert not _decode_skip_allowed(ticker, HMMFlagFilter(), LOOKAHEAD_OFF, None)
+
+
+def test_off_without_frame_clock():
+    assert not _decode_skip_allowed(Ticker(0.2), None, LOOKAHEAD_OFF, None)
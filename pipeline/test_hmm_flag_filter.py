@@ -0,0 +1,55 @@
+# test_hmm_flag_filter.py
+# -*- coding: utf-8 -*-
+"""
+HMMFlagFilter 离线接口：短序列上与手算结果对照。
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from vision.kf_vote import HMMFlagFilter
+
+
+def test_viterbi_weights_first_frame_by_prior():
+    # p_stay=0.9, eps=0.05, prior=0.3：首帧 P(s0=1) = 0.3*0.9 + 0.7*0.1 = 0.34；L1 = 0.05 + 0.9*0.6 = 0.59
+    # 路径 11：0.34*0.59*0.9*0.59 ≈ 0.1065；路径 00：0.66*0.41*0.9*0.41 ≈ 0.0999 → 11
+    # （若对初始隐状态取 max 而非求和，00 的 0.63 会压过 11 的 0.27，得到错误的 00）
+    hmm = HMMFlagFilter(p_stay=0.9, eps=0.05, prior=0.3)
+    assert hmm.viterbi([0.6, 0.6]).tolist() == [1, 1]
+    assert hmm.viterbi([0.7, 0.4, 0.7]).tolist() == [1, 1, 1]
+
+
+def test_viterbi_suppresses_single_frame_spike():
+    hmm = HMMFlagFilter(p_stay=0.95, eps=0.05)
+    probs = [0.9] * 5 + [0.1] + [0.9] * 5 + [0.1] * 8
+    assert hmm.viterbi(probs).tolist() == [1] * 11 + [0] * 8
+
+
+def test_posterior_closed_form():
+    hmm = HMMFlagFilter(p_stay=0.9, eps=0.05, prior=0.3)
+    # 单帧：0.34*0.59 / (0.34*0.59 + 0.66*0.41)
+    np.testing.assert_allclose(hmm.posterior([0.6]), [0.34 * 0.59 / (0.34 * 0.59 + 0.66 * 0.41)])
+    # 两帧：对四条路径的联合概率求边缘
+    l1, l0 = 0.59, 0.41
+    p = {(a, b): (0.34 if a else 0.66) * (l1 if a else l0) * (0.9 if a == b else 0.1) * (l1 if b else l0)
+         for a in (0, 1) for b in (0, 1)}
+    z = sum(p.values())
+    expect = [(p[1, 0] + p[1, 1]) / z, (p[0, 1] + p[1, 1]) / z]
+    np.testing.assert_allclose(hmm.posterior([0.6, 0.6]), expect)
+
+
+def test_filter_sequence_matches_online_update():
+    probs = [0.2, 0.9, 0.8, 0.1, 0.95, 0.5, 0.3]
+    hmm = HMMFlagFilter(p_stay=0.9, eps=0.1, prior=0.3)
+    online = []
+    for p in probs:
+        hmm.update(p)
+        online.append(hmm.belief)
+    np.testing.assert_allclose(hmm.filter_sequence(probs), online, rtol=1e-12)
+
+
+def test_empty_sequence():
+    hmm = HMMFlagFilter()
+    assert hmm.viterbi([]).size == 0
+    assert hmm.posterior([]).size == 0
@@ -0,0 +1,49 @@
+# test_judge_bands.py
+# -*- coding: utf-8 -*-
+"""
+judge_bands（多带向量化判定）逐带与 judge_center_band 的 flag 一致。
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from vision.center_band1 import judge_bands, judge_center_band
+
+THR = {"top": 0.25, "body": 0.25, "flange": 0.25, "base": 0.25}
+# 图像高 480，带宽 20：片体 y∈[100, 300]，法兰 y∈[290, 330]，低置信度伞顶 y∈[0, 480]
+DETS = [
+    [0, 100, 640, 300, 1, 0.9],
+    [0, 290, 640, 330, 2, 0.8],
+    [0, 0, 640, 480, 0, 0.1],
+]
+
+
+@pytest.mark.parametrize("center,expect", [
+    (200, 1),   # 片体完全覆盖
+    (310, 0),   # 法兰完全覆盖
+    (295, 0),   # 片体与法兰都覆盖，禁清优先
+    (105, 0),   # 带 [95, 115] 未被片体完全覆盖，重叠比 15/200 不充分
+    (400, 0),   # 无覆盖（伞顶置信度低于阈值被滤除）
+])
+def test_single_band(center, expect):
+    assert judge_bands(DETS, THR, [center], 20).tolist() == [expect]
+    assert judge_center_band(DETS, THR, 2 * center, 20)[0] == expect
+
+
+def test_bands_match_center_band():
+    centers = [50, 105, 200, 290, 295, 310, 331, 400]
+    expect = [judge_center_band(DETS, THR, 2 * c, 20)[0] for c in centers]
+    assert judge_bands(DETS, THR, centers, 20).tolist() == expect == [0, 0, 1, 1, 0, 0, 0, 0]
+
+
+def test_short_box_strong_overlap():
+    # 高 30 的片体框与带 [190, 210] 重叠 20/30 > 0.5：充分覆盖即可清
+    dets = [[0, 185, 640, 215, 1, 0.9]]
+    assert judge_bands(dets, THR, [200], 20).tolist() == [1]
+    assert judge_center_band(dets, THR, 400, 20)[0] == 1
+
+
+def test_no_bands_or_detections():
+    assert judge_bands([], THR, [10, 20], 10).tolist() == [0, 0]
+    assert judge_bands(DETS, THR, [], 10).size == 0
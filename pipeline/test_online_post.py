@@ -0,0 +1,44 @@
+# test_online_post.py
+# -*- coding: utf-8 -*-
+"""
+OnlinePostprocessor 逐点增量结果与批量 postprocess_sequences_ex 段表一致，且段在采样过程中提前定稿。
+"""
+
+from __future__ import annotations
+
+from pipeline.online_post import OnlinePostprocessor
+from pipeline.postprocess import postprocess_sequences_ex
+
+# 同 test_postprocess_sequences 用例A，每 7 个样本缺测一次距离
+FLAGS = [0] * 200 + [1] * 400 + [0] * 200 + [1] * 10 + [0] * 30 + [1] * 250
+ZS = [i * 2.0 for i in range(len(FLAGS))]
+DS = [None if i % 7 == 3 else (150.0 if i < 600 else 180.0) for i in range(len(FLAGS))]
+PARAMS = dict(open_close_win=15, min_segment_mm=60, safety_delta_mm=25, brush_offset_mm=0, merge_gap_mm=30)
+
+
+def _run(flags, zs, ds, **kw):
+    op = OnlinePostprocessor(**kw)
+    early = []
+    for i, (f, z, d) in enumerate(zip(flags, zs, ds)):
+        op.push(f, z, d)
+        early += [(i, seg) for seg in op.pop_ready()]
+    return op.finish(), early
+
+
+def test_online_matches_batch():
+    got, early = _run(FLAGS, ZS, DS, **PARAMS)
+    expect = [[0.0, 0.0, 398.0, 150.0], [1.0, 425.0, 1173.0, 150.0],
+              [0.0, 1200.0, 1678.0, 180.0], [1.0, 1705.0, 2178.0, 180.0]]
+    assert got == expect == postprocess_sequences_ex(FLAGS, ZS, DS, **PARAMS)
+    # 首段在上升途中（第 854 个样本，采样共 1090 个）即已定稿；其余段需前瞻后续段，在 finish 时定稿
+    assert early == [(854, expect[0])]
+
+
+def test_trailing_gap_trimmed_without_ffill():
+    flags = [1] * 6
+    zs = [0.0, 10.0, 20.0, 30.0, 40.0, 50.0]
+    ds = [100.0, None, 120.0, 140.0, None, None]
+    kw = dict(open_close_win=1, min_segment_mm=0, safety_delta_mm=0, brush_offset_mm=0, merge_gap_mm=0)
+    got, _ = _run(flags, zs, ds, **kw, ffill_tail=False)
+    assert got == [[1.0, 0.0, 50.0, 120.0]]
+    assert got == postprocess_sequences_ex(flags, zs, ds, **kw, ffill_tail=False)
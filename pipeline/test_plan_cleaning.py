@@ -0,0 +1,60 @@
+# test_plan_cleaning.py
+# -*- coding: utf-8 -*-
+"""
+plan_cleaning（节拍最优规划）：以真实后处理输出为输入，间隙可桥接时合并、不跨越显式禁刷区，节拍与手算一致。
+"""
+
+from __future__ import annotations
+
+from pipeline.postprocess import postprocess_sequences_ex
+from pipeline.segments import CycleCostModel, greedy_plan, plan_cleaning
+
+# 三段 300mm 可清区，间隔 40mm 的无本体区，每样本 2mm
+FLAGS = [0] * 20 + [1] * 150 + [0] * 20 + [1] * 150 + [0] * 20 + [1] * 150 + [0] * 20
+ZS = [i * 2.0 for i in range(len(FLAGS))]
+PARAMS = dict(open_close_win=15, min_segment_mm=60, safety_delta_mm=25, brush_offset_mm=0, merge_gap_mm=30)
+
+
+def _segments():
+    return postprocess_sequences_ex(FLAGS, ZS, [150.0] * len(FLAGS), **PARAMS)
+
+
+def test_postprocess_output_is_full_partition():
+    # 后处理输出 1/0 交替全覆盖：flag==0 行就是可清段之间的间隙
+    assert [s[:3] for s in _segments()] == [
+        [0.0, 0.0, 38.0], [1.0, 65.0, 313.0], [0.0, 340.0, 378.0], [1.0, 405.0, 653.0],
+        [0.0, 680.0, 718.0], [1.0, 745.0, 993.0], [0.0, 1020.0, 1058.0]]
+
+
+def test_greedy_baseline():
+    # 每段 L_eff = 248 + 15 → n=2、step=150；每条 2 + 2×1.5 + 1.5 = 6.5s，段间移动 (843-653)/100 = 1.9s ×2
+    g = greedy_plan(_segments(), 150.0, CycleCostModel())
+    assert g.commands == [(993.0, 150, 2, 150.0, 0), (653.0, 150, 2, 150.0, 0), (313.0, 150, 2, 150.0, 1)]
+    assert abs(g.est_s - 23.3) < 1e-9
+
+
+def test_bridges_gaps_of_real_output():
+    # 92mm 间隙 ≤ bridge_max 150：三段合并为一条，L_eff = 993-65+15 = 943，
+    # step_cap=160 → n=6、step=ceil(743/5)=149 钳到 150；2 + 6×1.5 + 750/100 = 18.5s
+    plan = plan_cleaning(_segments(), 150.0, CycleCostModel())
+    assert plan.groups == [[0, 1, 2]]
+    assert plan.commands == [(993.0, 150, 6, 150.0, 1)]
+    assert abs(plan.est_s - 18.5) < 1e-9
+
+
+def test_banned_zone_blocks_bridge():
+    # 禁刷区落在上方间隙 (653, 745) 内：上段单独下发，下两段仍合并
+    plan = plan_cleaning(_segments(), 150.0, CycleCostModel(), banned=[(690.0, 700.0)])
+    assert plan.groups == [[0], [1, 2]]
+    assert plan.commands == [(993.0, 150, 2, 150.0, 0), (653.0, 150, 4, 150.0, 1)]
+    assert plan.est_s < greedy_plan(_segments(), 150.0, CycleCostModel()).est_s
+
+
+def test_gap_over_bridge_max_not_merged():
+    segs = _segments()
+    plan = plan_cleaning(segs, 150.0, CycleCostModel(bridge_max_mm=50.0))
+    assert plan.commands == greedy_plan(segs, 150.0, CycleCostModel(bridge_max_mm=50.0)).commands
+
+
+def test_no_clean_segments():
+    assert plan_cleaning([[0, 0.0, 100.0]], 150.0, CycleCostModel()).commands == []
@@ -0,0 +1,86 @@
+# test_postprocess_ex.py
+# -*- coding: utf-8 -*-
+"""
+向量化后处理（游程形态学、SegmentTable、批量段距离统计）：固定序列与手算结果对照。
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from pipeline.postprocess import (backfill_then_ffill_dis, convert_flags_to_runs, merge_segments,
+                                  morph_open_close, postprocess_sequences, postprocess_sequences_ex,
+                                  shrink_boundaries)
+
+# 同 test_postprocess_sequences 用例A：(0×200, 1×400, 0×200, 1×10, 0×30, 1×250)，每样本 2mm
+FLAGS = [0] * 200 + [1] * 400 + [0] * 200 + [1] * 10 + [0] * 30 + [1] * 250
+ZS = [i * 2.0 for i in range(len(FLAGS))]
+PARAMS = dict(open_close_win=15, min_segment_mm=60, safety_delta_mm=25, brush_offset_mm=0, merge_gap_mm=30)
+# 1×10 短段被开运算去除；可清段两端各缩退 25mm
+SEGMENTS = [[0.0, 0.0, 398.0], [1.0, 425.0, 1173.0], [0.0, 1200.0, 1678.0], [1.0, 1705.0, 2178.0]]
+
+
+def test_runs_list_and_ndarray():
+    flags = [1, 1, 0, 0, 0, 1]
+    expect = [(1, 0, 1), (0, 2, 4), (1, 5, 5)]
+    assert convert_flags_to_runs(flags) == expect
+    assert convert_flags_to_runs(np.asarray(flags)) == expect
+    assert convert_flags_to_runs([]) == []
+
+
+def test_morph_open_close():
+    clean = morph_open_close(FLAGS, 15)
+    assert clean == [0] * 200 + [1] * 400 + [0] * 240 + [1] * 250
+    # 短 0 段被闭运算填充
+    assert morph_open_close([1] * 20 + [0] * 3 + [1] * 20, 5) == [1] * 43
+
+
+def test_segment_steps():
+    segs = [(0, 0.0, 100.0), (1, 100.0, 130.0), (0, 130.0, 300.0), (1, 300.0, 500.0)]
+    # 30mm 的可清段两端各缩退 20mm 后为空，被舍弃
+    assert shrink_boundaries(segs, 20) == [(0, 0.0, 100.0), (0, 130.0, 300.0), (1, 320.0, 500.0)]
+    assert merge_segments([(1, 0.0, 100.0), (1, 120.0, 200.0), (1, 260.0, 300.0)], 30) == \
+        [(1, 0.0, 200.0), (1, 260.0, 300.0)]
+
+
+def test_postprocess_sequences():
+    assert postprocess_sequences(FLAGS, ZS, **PARAMS) == SEGMENTS
+
+
+def test_postprocess_sequences_ex_dis():
+    # 样本 0..599 距离 150，其后 180；每 7 个样本缺测一次（bfill 回填）
+    ds = [None if i % 7 == 3 else (150.0 if i < 600 else 180.0) for i in range(len(FLAGS))]
+    got = postprocess_sequences_ex(FLAGS, ZS, ds, **PARAMS)
+    assert got == [s + [d] for s, d in zip(SEGMENTS, [150.0, 150.0, 180.0, 180.0])]
+
+
+def test_dis_window_across_jump():
+    flags = [1] * 10
+    zs = [i * 10.0 for i in range(10)]
+    ds = [100.0] * 4 + [200.0] * 6
+    kw = dict(open_close_win=1, min_segment_mm=0, safety_delta_mm=0, brush_offset_mm=0, merge_gap_mm=0)
+    assert postprocess_sequences_ex(flags, zs, ds, **kw)[0][3] == 200.0
+    # 截尾 k=max(1, int(10*0.1))=1：去掉一个 100 与一个 200，(3*100 + 5*200) / 8
+    assert postprocess_sequences_ex(flags, zs, ds, **kw, dis_method="trimmed")[0][3] == 162.5
+
+
+def test_postprocess_sequences_ex_ffill_tail_off():
+    flags = [1] * 6
+    zs = [0.0, 10.0, 20.0, 30.0, 40.0, 50.0]
+    ds = [100.0, None, 120.0, 140.0, None, None]
+    kw = dict(open_close_win=1, min_segment_mm=0, safety_delta_mm=0, brush_offset_mm=0, merge_gap_mm=0)
+    # 尾部空缺裁剪：窗口只剩 [100, 120, 120, 140]，中位数 120
+    assert postprocess_sequences_ex(flags, zs, ds, **kw, ffill_tail=False) == [[1.0, 0.0, 50.0, 120.0]]
+    # 尾部前向填充：[100, 120, 120, 140, 140, 140]，中位数 130
+    assert postprocess_sequences_ex(flags, zs, ds, **kw, ffill_tail=True) == [[1.0, 0.0, 50.0, 130.0]]
+
+
+@pytest.mark.parametrize("ffill_tail,expect", [(True, [1.0, 1.0, 2.0, 2.0, 2.0, 2.0]),
+                                               (False, [1.0, 1.0, 2.0, 2.0])])
+def test_backfill_ndarray_nan(ffill_tail, expect):
+    arr = np.array([np.nan, 1.0, np.nan, 2.0, np.nan, np.nan])
+    assert list(backfill_then_ffill_dis(arr, ffill_tail=ffill_tail)) == expect
+    assert list(backfill_then_ffill_dis([None, 1.0, None, 2.0, None, None], ffill_tail=ffill_tail)) == expect
+    clean = np.array([1.0, 2.0])
+    assert backfill_then_ffill_dis(clean) is clean or np.shares_memory(backfill_then_ffill_dis(clean), clean)
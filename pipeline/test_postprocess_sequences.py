@@ -7,7 +7,8 @@
 
 from __future__ import annotations
 import os
-import csv
+
+from core.binlog import load_samples
 
 # 优先从项目包导入；若无，则请改成你的文件路径
 try:
@@ -54,7 +55,7 @@ def run_case_A():
 
 def run_case_B():
     """
-    从 CSV 测试：期望 CSV 至少包含列 'flag','z'
+    从采样日志测试：CSV 至少包含列 'flag','z'，或二进制日志 .blog
     默认路径 logs/sample.csv；可用环境变量 POST_CSV 覆盖
     """
     csv_path = os.getenv("POST_CSV", r"D:\workspace\绝缘子清洗机器人\项目代码\草稿版本0908-3\insulator_bot\logs\sample.csv")
@@ -62,12 +63,8 @@ def run_case_B():
         print(f"[跳过用例B] 未找到 {csv_path}")
         return
 
-    flags, zs = [], []
-    with open(csv_path, newline="", encoding="utf-8") as f:
-        r = csv.DictReader(f)
-        for row in r:
-            flags.append(int(float(row["flag"])))
-            zs.append(float(row["z"]))
+    flags, zs, _ = load_samples(csv_path)
+    flags, zs = flags.tolist(), zs.tolist()
 
     params = dict(
         open_close_win=15,
@@ -0,0 +1,81 @@
+# test_resume.py
+# -*- coding: utf-8 -*-
+"""
+断线续跑（resume_descent / _params_index）：对 plc_sim 在第二段的不同时刻断开链路，
+两种下发模式下续跑后 PLC 执行的段序列与手推结果一致，流程结束且检查点删除。
+"""
+
+from __future__ import annotations
+
+import os
+
+import pytest
+
+import comms.plc_sim as plc_sim
+from comms.modbus import CMD_START_SEG, ST_DONE, ModbusClient
+from pipeline.checkpoint import DescentCheckpoint
+from pipeline.state_machine import descend_execute, resume_descent
+
+# 三段可清区，命令 h0 自上而下 900 / 600 / 300
+SEGMENTS = [[1, 700.0, 900.0, 150.0], [0, 600.0, 700.0, 150.0], [1, 400.0, 600.0, 150.0],
+            [0, 300.0, 400.0, 150.0], [1, 100.0, 300.0, 150.0]]
+
+
+def _drop_link(mod, monkeypatch, pipelined, when):
+    """第二条命令（序号 1）处断开链路：写参数前 / 写参数后、START 前 / START 后。"""
+    param_fn = "write_segment_block" if pipelined else "write_segment_params"
+    real_params, real_cmd = getattr(mod, param_fn), mod.write_cmd
+    calls = {"params": 0, "start": 0}
+
+    def params(*a):
+        calls["params"] += 1
+        if calls["params"] == 2 and when == "before_params":
+            raise ConnectionError("链路中断")
+        real_params(*a)
+        if calls["params"] == 2 and when == "after_params":
+            raise ConnectionError("链路中断")
+
+    def write_cmd(reg_base, cmd):
+        real_cmd(reg_base, cmd)
+        if cmd == CMD_START_SEG:
+            calls["start"] += 1
+            if calls["start"] == 2 and when == "after_start":
+                raise ConnectionError("链路中断")
+
+    monkeypatch.setattr(mod, param_fn, params)
+    monkeypatch.setattr(mod, "write_cmd", write_cmd)
+
+
+@pytest.mark.parametrize("pipelined,when,executed", [
+    (False, "before_params", [900, 600, 300]),
+    (False, "after_params", [900, 600, 300]),
+    (False, "after_start", [900, 600, 300]),
+    # 流水线模式推迟记录完成：写参数前断线时检查点仍停在第 0 段，参数块也无法证明其已完成，重做
+    (True, "before_params", [900, 900, 600, 300]),
+    # 参数块已是第 1 段：推断第 0 段已完成
+    (True, "after_params", [900, 600, 300]),
+    # PLC 正在清洗第 1 段：等其完成后从第 2 段继续
+    (True, "after_start", [900, 600, 300]),
+])
+def test_resume_after_link_drop(plc, monkeypatch, tmp_path, pipelined, when, executed):
+    path = str(tmp_path / "ckpt.json")
+    _drop_link(plc, monkeypatch, pipelined, when)
+    with pytest.raises(OSError):
+        descend_execute(plc, plc_sim.REG_BASE, SEGMENTS, pipelined=pipelined, checkpoint=DescentCheckpoint(path))
+    assert os.path.exists(path)
+
+    ck = DescentCheckpoint(path)
+    assert ck.load()
+    mod = ModbusClient(plc_sim.HOST, plc_sim.PORT, plc_sim.UNIT_ID, timeout=2.0)
+    try:
+        resume_descent(mod, ck, pipelined=pipelined)
+        assert mod.read_status(plc_sim.REG_BASE) == ST_DONE
+    finally:
+        mod.sock.close()
+    assert [s[0] for s in plc_sim.SEGS] == executed
+    assert not os.path.exists(path)
+
+
+def test_backoff_requires_a_try():
+    with pytest.raises(ValueError):
+        ModbusClient.connect_with_backoff(plc_sim.HOST, 1, retries=0)
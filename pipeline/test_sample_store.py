@@ -0,0 +1,32 @@
+# test_sample_store.py
+# -*- coding: utf-8 -*-
+"""
+SampleStore：keep_dis=False 时不保留 dis 列，回填区间的取值与保留列时一致。
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from pipeline.sample_store import SampleStore
+
+
+def _feed(store):
+    out = []
+    for i in range(10):
+        store.append(i % 2, i * 10.0)
+        if i in (2, 6):
+            i0, i1 = store.backfill(100.0 + i)
+            out += store.dis_range(i0, i1).tolist()
+    i0, i1 = store.ffill_tail()
+    return out + store.dis_range(i0, i1).tolist()
+
+
+def test_drop_dis_column():
+    kept, dropped = SampleStore(keep_dis=True), SampleStore(keep_dis=False)
+    expect = [102.0] * 3 + [106.0] * 4 + [106.0] * 3
+    assert _feed(kept) == _feed(dropped) == expect
+    assert kept.ds.tolist() == expect
+    assert dropped.ds is None
+    assert dropped.nbytes < kept.nbytes
+    np.testing.assert_array_equal(dropped.zs, kept.zs)
@@ -0,0 +1,55 @@
+# test_seg_timing.py
+# -*- coding: utf-8 -*-
+"""
+自适应段超时：机器整体变慢后，超出学习超时的段继续等待至硬上限并记录实测耗时，模型随之更新。
+"""
+
+from __future__ import annotations
+
+import pytest
+
+import comms.plc_sim as plc_sim
+from pipeline.seg_timing import SegmentTimeModel
+from pipeline.state_machine import _run_segments, _run_segments_pipelined
+
+
+def _trained(dur_s):
+    """以耗时 0.2 + 0.1n 的 40 个观测训练的模型（可选整体倍率）。"""
+    m = SegmentTimeModel()
+    for i in range(40):
+        n = 2 + i % 5
+        m.observe(n, 150.0, dur_s(n))
+    return m
+
+
+def test_slowdown_adapts():
+    m = _trained(lambda n: 0.2 + 0.1 * n)
+    # 训练数据无残差：余量取 min_margin 0.3；超时 = 0.4 + 0.3 = 0.7，硬上限 max(3.0, 3×0.7)
+    assert abs(m.seg_timeout(2, 150.0, 3.0) - 0.7) < 1e-6
+    assert abs(m.hard_timeout(2, 150.0, 3.0) - 3.0) < 1e-6
+    # 整体慢一倍：前几段超出学习超时，但都在硬上限内完成并记录
+    for i in range(5):
+        n = 2 + i
+        assert m.seg_timeout(n, 150.0, 3.0) < 2 * (0.2 + 0.1 * n) < m.hard_timeout(n, 150.0, 3.0)
+        m.observe(n, 150.0, 2 * (0.2 + 0.1 * n))
+    # 慢段成为多数后稳健拟合切换到新速度，超时重新覆盖实测耗时
+    for i in range(55):
+        n = 2 + i % 5
+        m.observe(n, 150.0, 2 * (0.2 + 0.1 * n))
+    assert abs(m.predict(2, 150.0) - 0.8) < 0.01 and abs(m.predict(6, 150.0) - 1.6) < 0.01
+    assert m.seg_timeout(6, 150.0, 3.0) > 1.6
+
+
+@pytest.mark.parametrize("run", [_run_segments, _run_segments_pipelined])
+def test_slow_segments_complete_and_are_recorded(plc, monkeypatch, run):
+    # 模型学到 0.05s/段（超时取 min_timeout 0.5s），PLC 变慢到 0.8s/段：不判失败，实测耗时入模型
+    m = SegmentTimeModel()
+    for i in range(10):
+        m.observe(2 + i % 2, 150.0, 0.05)
+    assert m.seg_timeout(2, 150.0, 0.5) == 0.5
+    monkeypatch.setattr(plc_sim, "EXEC_SEG_TIME_S", 0.8)
+    done = []
+    run(plc, plc_sim.REG_BASE, [(900.0, 150, 2, 150.0), (600.0, 150, 3, 150.0)], 1.0, 0.5,
+        timing=m, on_done=done.append)
+    assert done == [0, 1]
+    assert len(m.obs) == 12 and all(0.75 < o[2] < 1.2 for o in m.obs[-2:])
@@ -0,0 +1,37 @@
+# test_vote_sequence.py
+# -*- coding: utf-8 -*-
+"""
+vote_sequence（前缀和整段投票）与逐帧 VotingBuffer.update 逐点一致。
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from vision.kf_vote import VotingBuffer, vote_sequence
+
+FLAGS = [0, 1, 1, 0, 1, 1, 1, 0, 0, 1, 0, 0, 0, 1, 1]
+
+
+def test_vote_sequence_k5_t3():
+    expect = [0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0]
+    assert vote_sequence(FLAGS, 5, 3).tolist() == expect
+    assert vote_sequence(np.asarray(FLAGS, dtype=np.int8), 5, 3).tolist() == expect
+
+
+@pytest.mark.parametrize("k,t", [(1, None), (3, 2), (5, 3), (5, 5)])
+def test_matches_voting_buffer(k, t):
+    voter = VotingBuffer(window_size=k, vote_threshold=t)
+    assert vote_sequence(FLAGS, k, t).tolist() == [voter.update(f) for f in FLAGS]
+
+
+def test_short_sequence_is_all_zero():
+    assert vote_sequence([1, 1], k=5).tolist() == [0, 0]
+
+
+def test_rejects_non_binary():
+    with pytest.raises(ValueError):
+        vote_sequence([0, 2, 1])
+    with pytest.raises(ValueError):
+        VotingBuffer().update(2)
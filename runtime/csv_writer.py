@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+成组提交（group commit）的 CSV 写线程：按块取空队列，按行数或时间预算落盘，可选低频 fsync。
+
+- 每轮阻塞等待第一行，随后非阻塞取空队列（至多 ``max_batch`` 行），一次 ``writerows``。
+- 缓冲行数达到 ``flush_rows`` 或距上次落盘超过 ``flush_s`` 才 ``flush()``，不再逐行系统调用。
+- ``fsync_s > 0`` 时以该周期 ``os.fsync``，断电安全与吞吐分开权衡。
+- 轮转：``rotate_bytes > 0`` 时文件超过该大小切换到 ``<名>.1.csv``、``<名>.2.csv``…；
+  ``per_run=True`` 时每次启动写入带时间戳的新文件。新文件（或空文件）先写表头。
+- 停止时取空队列剩余行后再关闭；``stats()`` 报告行数、字节数、落盘次数、队列深度与写入吞吐。
+"""
+from __future__ import annotations
+
+import csv
+import io
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence
+
+
+class CsvGroupWriter:
+    """队列 → CSV 的批量写入器；``run`` 可直接作为线程目标。"""
+
+    def __init__(self, row_q: queue.Queue, csv_path: str, header: Optional[Sequence[str]] = None,
+                 max_batch: int = 1024, flush_rows: int = 256, flush_s: float = 0.5,
+                 fsync_s: float = 0.0, rotate_bytes: int = 0, per_run: bool = False,
+                 report_s: float = 10.0) -> None:
+        self.row_q = row_q
+        self.header = list(header) if header else None
+        self.max_batch = max(1, int(max_batch))
+        self.flush_rows = max(1, int(flush_rows))
+        self.flush_s = float(flush_s)
+        self.fsync_s = float(fsync_s)
+        self.rotate_bytes = int(rotate_bytes)
+        self.report_s = float(report_s)
+        root, ext = os.path.splitext(csv_path)
+        if per_run:
+            root = f"{root}_{time.strftime('%Y%m%d_%H%M%S')}"
+        self._root, self._ext = root, ext or ".csv"
+        self._part = 0
+        self.path = self._root + self._ext
+
+        self.rows = 0
+        self.bytes = 0
+        self.flushes = 0
+        self.fsyncs = 0
+        self.files = 0
+        self.max_depth = 0
+        self._t0 = time.monotonic()
+        self._f = None
+        self._size = 0
+        self._buf = io.StringIO()
+        self._w = csv.writer(self._buf)
+
+    # ============ 文件 ============
+    def _open(self) -> None:
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self._f = open(self.path, "a", newline="", encoding="utf-8")
+        self._size = os.path.getsize(self.path)
+        self.files += 1
+        if self.header and self._size == 0:
+            self._write([self.header])
+
+    def _rotate(self) -> None:
+        self._close()
+        self._part += 1
+        self.path = f"{self._root}.{self._part}{self._ext}"
+        self._open()
+        logging.info("CSV 轮转 -> %s", self.path)
+
+    def _close(self) -> None:
+        if self._f is not None:
+            self._f.flush()
+            if self.fsync_s > 0:
+                os.fsync(self._f.fileno())
+            self._f.close()
+            self._f = None
+
+    def _write(self, rows) -> int:
+        """一批行先格式化到内存缓冲，再一次写入文件（不触发系统调用，落盘由 flush 控制）。"""
+        self._buf.seek(0)
+        self._buf.truncate()
+        self._w.writerows(rows)
+        data = self._buf.getvalue()
+        self._f.write(data)
+        n = len(data.encode("utf-8"))
+        self._size += n
+        return n
+
+    def _write_batch(self, batch) -> int:
+        """写入一批行；启用轮转时逐行检查大小，文件至多超出 ``rotate_bytes`` 一行。"""
+        if self.rotate_bytes <= 0:
+            return self._write(batch)
+        n = 0
+        for row in batch:
+            n += self._write((row,))
+            if self._size >= self.rotate_bytes:
+                self._rotate()
+        return n
+
+    # ============ 主循环 ============
+    def _drain(self, first) -> list:
+        batch = [first]
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self.row_q.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self, stop_evt: threading.Event) -> None:
+        self._open()
+        pending = 0
+        t_flush = t_sync = t_report = time.monotonic()
+        try:
+            while True:
+                stopping = stop_evt.is_set()
+                try:
+                    first = self.row_q.get(timeout=0 if stopping else min(0.1, self.flush_s))
+                except queue.Empty:
+                    if stopping:
+                        break
+                    first = None
+                if first is not None:
+                    self.max_depth = max(self.max_depth, self.row_q.qsize() + 1)
+                    batch = self._drain(first)
+                    self.bytes += self._write_batch(batch)
+                    self.rows += len(batch)
+                    pending += len(batch)
+                now = time.monotonic()
+                if pending and (pending >= self.flush_rows or now - t_flush >= self.flush_s):
+                    self._f.flush()
+                    self.flushes += 1
+                    pending = 0
+                    t_flush = now
+                    if self.fsync_s > 0 and now - t_sync >= self.fsync_s:
+                        os.fsync(self._f.fileno())
+                        self.fsyncs += 1
+                        t_sync = now
+                if self.report_s > 0 and now - t_report >= self.report_s:
+                    self.log_stats()
+                    t_report = now
+        finally:
+            self._close()
+            self.log_stats()
+
+    def stats(self) -> Dict[str, Any]:
+        dt = max(1e-9, time.monotonic() - self._t0)
+        return {"rows": self.rows, "bytes": self.bytes, "flushes": self.flushes, "fsyncs": self.fsyncs,
+                "files": self.files, "queue_depth": self.row_q.qsize(), "max_queue_depth": self.max_depth,
+                "rows_per_s": self.rows / dt, "bytes_per_s": self.bytes / dt}
+
+    def log_stats(self) -> None:
+        st = self.stats()
+        logging.info("CSV 写入 %s：%d 行 %.1f KB，落盘 %d 次，fsync %d 次，文件 %d 个，"
+                     "队列深度 %d（峰值 %d），吞吐 %.0f 行/s",
+                     self.path, st["rows"], st["bytes"] / 1024.0, st["flushes"], st["fsyncs"], st["files"],
+                     st["queue_depth"], st["max_queue_depth"], st["rows_per_s"])
+
+
+def start_csv_writer(row_q: queue.Queue, csv_path: str, **kw) -> tuple:
+    """启动写线程，返回 (writer, stop_evt, thread)；结束时 ``stop_evt.set(); thread.join()``。"""
+    writer = CsvGroupWriter(row_q, csv_path, **kw)
+    stop_evt = threading.Event()
+    t = threading.Thread(target=writer.run, args=(stop_evt,), name="csv-writer", daemon=True)
+    t.start()
+    return writer, stop_evt, t
+
+
+__all__ = ["CsvGroupWriter", "start_csv_writer"]
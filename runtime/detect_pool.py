@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+多相机检测进程池：每个工作进程只加载一次模型，帧经 ``multiprocessing.shared_memory`` 环形缓冲区传递。
+
+- 环形缓冲区共 ``slots`` 个槽位，每槽一帧 (H, W, 3) uint8；帧本身不经过 pickle，
+  队列里只传 ``(槽位, 相机ID, 帧序号, 高, 宽)`` 这样的小元组。
+- 空闲槽位由 ``free_q`` 管理：``submit`` 取槽写帧，工作进程推理完读完帧后归还槽位，
+  槽位耗尽即为背压（``submit`` 返回 False，调用方可丢帧）。
+- 结果 ``(相机ID, 帧序号, 检测结果)`` 从 ``result_q`` 返回；各进程独立推理，不受 GIL 限制。
+
+用法：
+    pool = DetectorPool(weight, n_workers=2, frame_shape=(480, 640)); pool.start()
+    pool.submit(cam_id, seq, frame); cam_id, seq, dets = pool.get_result()
+    pool.close()
+"""
+from __future__ import annotations
+
+import logging
+import multiprocessing as mp
+import queue
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+def _worker_main(shm_name: str, ring_shape: Tuple[int, int, int, int], task_q, result_q, free_q,
+                 weight_path: Optional[str], imgsz, device: str) -> None:
+    """工作进程：挂接共享内存，加载一次模型，循环处理任务直到收到 ``None``。"""
+    from vision.detector import Detector
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        ring = np.ndarray(ring_shape, dtype=np.uint8, buffer=shm.buf)
+        det = Detector(weight_path, device=device, imgsz=imgsz)
+        while True:
+            task = task_q.get()
+            if task is None:
+                break
+            slot, cam_id, seq, h, w = task
+            try:
+                dets = det.detect(ring[slot, :h, :w])
+            except Exception as e:
+                logging.error("检测进程推理失败 cam=%s seq=%s：%s", cam_id, seq, e)
+                dets = []
+            finally:
+                free_q.put(slot)
+            result_q.put((cam_id, seq, dets))
+        del ring
+    finally:
+        shm.close()
+
+
+class DetectorPool:
+    """基于共享内存环形缓冲区的多进程检测服务。"""
+
+    def __init__(self, weight_path: Optional[str], n_workers: int = 2,
+                 frame_shape: Tuple[int, int] = (480, 640), slots: Optional[int] = None,
+                 imgsz=640, device: str = "cpu") -> None:
+        self.weight_path = weight_path
+        self.n_workers = max(1, int(n_workers))
+        self.frame_h, self.frame_w = int(frame_shape[0]), int(frame_shape[1])
+        # 默认每个进程 2 个槽位：一帧推理中，一帧排队
+        self.slots = int(slots) if slots else 2 * self.n_workers
+        self.imgsz = imgsz
+        self.device = device
+        self._ring_shape = (self.slots, self.frame_h, self.frame_w, 3)
+        self._ctx = mp.get_context("spawn")
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._ring: Optional[np.ndarray] = None
+        self._procs: List = []
+        self.task_q = self._ctx.Queue()
+        self.result_q = self._ctx.Queue()
+        self.free_q = self._ctx.Queue()
+        self.dropped = 0
+
+    def start(self) -> "DetectorPool":
+        nbytes = int(np.prod(self._ring_shape))
+        self._shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        self._ring = np.ndarray(self._ring_shape, dtype=np.uint8, buffer=self._shm.buf)
+        for s in range(self.slots):
+            self.free_q.put(s)
+        for i in range(self.n_workers):
+            p = self._ctx.Process(target=_worker_main, name=f"detect-{i}", daemon=True,
+                                  args=(self._shm.name, self._ring_shape, self.task_q, self.result_q,
+                                        self.free_q, self.weight_path, self.imgsz, self.device))
+            p.start()
+            self._procs.append(p)
+        logging.info("检测进程池启动：进程=%d 槽位=%d 帧=%dx%d", self.n_workers, self.slots, self.frame_w, self.frame_h)
+        return self
+
+    def submit(self, cam_id: int, seq: int, frame: np.ndarray, timeout: float = 0.0) -> bool:
+        """写入一帧并派发；无空闲槽位（超时）时丢弃该帧并返回 False。"""
+        assert self._ring is not None, "进程池未启动"
+        h, w = frame.shape[:2]
+        if h > self.frame_h or w > self.frame_w:
+            raise ValueError(f"帧尺寸 {w}x{h} 超出槽位 {self.frame_w}x{self.frame_h}")
+        try:
+            slot = self.free_q.get(timeout=timeout) if timeout > 0 else self.free_q.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return False
+        np.copyto(self._ring[slot, :h, :w], frame)
+        self.task_q.put((slot, int(cam_id), int(seq), h, w))
+        return True
+
+    def get_result(self, timeout: Optional[float] = None) -> Tuple[int, int, List[List[float]]]:
+        """取一条结果 (相机ID, 帧序号, 检测结果)；超时抛出 ``queue.Empty``。"""
+        return self.result_q.get(timeout=timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        for _ in self._procs:
+            self.task_q.put(None)
+        for p in self._procs:
+            p.join(timeout)
+            if p.is_alive():
+                p.terminate()
+        self._procs.clear()
+        self._ring = None
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self) -> "DetectorPool":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+__all__ = ["DetectorPool"]
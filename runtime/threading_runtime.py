@@ -33,13 +33,16 @@ def frame_grabber(stop_evt, src, frame_q:queue.Queue, size=(640,480), fps_cap:fl
     finally:
         cap.release()
 
-def yolo_worker(stop_evt, frame_q:queue.Queue, det_latest:Latest, detector, conf_thr, center_band_px):
+def yolo_worker(stop_evt, frame_q:queue.Queue, det_latest:Latest, detector, conf_thr, center_band_px,
+                size_filter=None):
     from vision.detector import Detector
     from vision.center_band1 import judge_center_band
     while not stop_evt.is_set():
         try: frame = frame_q.get(timeout=0.1)
         except queue.Empty: continue
         dets = Detector.detect(detector, frame)
+        if size_filter is not None:
+            dets = size_filter.apply(dets, frame.shape[1], frame.shape[0])
         flag_frame, cls_ins = judge_center_band(dets, conf_thr, frame.shape[0], center_band_px)
         det_latest.set((flag_frame, cls_ins))  # 仅存“最新”的结果
 
@@ -58,14 +61,42 @@ def modbus_heartbeat_worker(stop_evt, mod, reg_base:int, period_s:float=0.7):
         except Exception as e: logging.warning("heartbeat error: %s", e)
         stop_evt.wait(period_s)
 
-def csv_writer_worker(stop_evt, row_q:queue.Queue, csv_path:str):
-    import csv, os
-    f = open(csv_path, "a", newline="", encoding="utf-8")
-    w = csv.writer(f)
+def csv_writer_worker(stop_evt, row_q:queue.Queue, csv_path:str, header=None, **kw):
+    """成组提交写 CSV：按块取队列、按行数/时间预算落盘，可选 fsync 与轮转（见 runtime.csv_writer）。"""
+    from runtime.csv_writer import CsvGroupWriter
+    CsvGroupWriter(row_q, csv_path, header=header, **kw).run(stop_evt)
+
+def pool_frame_producer(stop_evt, src, cam_id:int, pool, size=(640,480)):
+    """单相机抓帧并提交到检测进程池；帧序号逐帧递增，槽位不足时丢帧。"""
+    cap = cv2.VideoCapture(src)
+    if not cap.isOpened():
+        logging.error("无法打开视频源: %s", src); return
+    buf = np.empty((size[1], size[0], 3), dtype=np.uint8)
+    seq = 0
     try:
         while not stop_evt.is_set():
-            try: row = row_q.get(timeout=0.1)
-            except queue.Empty: continue
-            w.writerow(row); f.flush()
+            ret, frame = cap.read()
+            if not ret: break
+            pool.submit(cam_id, seq, cv2.resize(frame, size, dst=buf), timeout=0.01)
+            seq += 1
     finally:
-        f.close()
+        cap.release()
+
+def pool_result_consumer(stop_evt, pool, det_latest:dict, conf_thr, center_band_px, img_height:int=480,
+                         size_filter=None):
+    """消费检测进程池结果：按相机做中心带判定，det_latest[cam_id] 存 (seq, flag_frame, cls_ins)。"""
+    from vision.center_band1 import judge_center_band
+    last_seq: dict = {}
+    while not stop_evt.is_set():
+        try: cam_id, seq, dets = pool.get_result(timeout=0.1)
+        except queue.Empty: continue
+        # 多进程乱序返回：丢弃比已发布结果更旧的帧
+        if seq <= last_seq.get(cam_id, -1): continue
+        last_seq[cam_id] = seq
+        if size_filter is not None:
+            dets = size_filter.apply(dets, pool.frame_w, img_height)
+        flag_frame, cls_ins = judge_center_band(dets, conf_thr, img_height, center_band_px)
+        latest = det_latest.get(cam_id)
+        if latest is None:
+            latest = det_latest[cam_id] = Latest()
+        latest.set((seq, flag_frame, cls_ins))
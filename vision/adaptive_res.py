@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+自适应推理分辨率：长段片体上用低分辨率，接近法兰/顶端边界时恢复高分辨率。
+
+控制规则（每帧一次）：
+
+- 降档：中心带判定连续 ``stable_frames`` 帧不变，且决定判定的框置信度均不低于 ``conf_min``，
+  则降低一档并重新计数。
+- 升档：任一有效框的上/下边缘距中心带不超过 ``near_px``（即将跨越边界），立即升至最高档；
+  中心带附近框的最高置信度低于 ``conf_min``，升一档。
+
+``schedule`` 记录每次切换 (帧号, 尺寸)，``log_stats`` 按输入面积估算相对全程最高分辨率节省的推理量。
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class ResolutionController:
+    """按中心带判定的稳定性与置信度切换推理输入尺寸。"""
+
+    def __init__(self, sizes: Sequence[int] = (320, 480, 640), img_height: int = 480, band_px: int = 20,
+                 stable_frames: int = 10, conf_min: float = 0.6, near_px: int = 40) -> None:
+        self.sizes = sorted({int(s) for s in sizes})
+        self.level = len(self.sizes) - 1          # 从最高分辨率开始
+        self.stable_frames = int(stable_frames)
+        self.conf_min = float(conf_min)
+        self.near_px = float(near_px)
+        cy = int(img_height) // 2
+        half = max(1, int(band_px) // 2)
+        self.band_y1, self.band_y2 = cy - half, cy + half
+
+        self._last_flag: Optional[int] = None
+        self._streak = 0
+        self.frame_idx = 0
+        self.counts = {s: 0 for s in self.sizes}
+        self.schedule: List[Tuple[int, int]] = [(0, self.current)]
+
+    @classmethod
+    def from_config(cls, cfg: Optional[Dict[str, Any]], img_height: int, band_px: int) -> Optional["ResolutionController"]:
+        """由 ``vision.adaptive_imgsz`` 配置段构造；未启用返回 ``None``。"""
+        cfg = cfg or {}
+        if not cfg.get("enable", False):
+            return None
+        return cls(sizes=cfg.get("sizes", [320, 480, 640]), img_height=img_height, band_px=band_px,
+                   stable_frames=int(cfg.get("stable_frames", 10)),
+                   conf_min=float(cfg.get("conf_min", 0.6)),
+                   near_px=int(cfg.get("near_px", 40)))
+
+    @property
+    def current(self) -> int:
+        return self.sizes[self.level]
+
+    def _set_level(self, level: int) -> None:
+        level = min(max(0, level), len(self.sizes) - 1)
+        if level != self.level:
+            self.level = level
+            self.schedule.append((self.frame_idx + 1, self.current))
+        self._streak = 0
+
+    def update(self, detections: List[List[float]], flag_frame: int) -> int:
+        """记录本帧（以 ``current`` 推理）的结果并返回下一帧使用的输入尺寸。"""
+        self.counts[self.current] += 1
+
+        near = False
+        band_conf = 0.0
+        if detections:
+            arr = np.asarray(detections, dtype=np.float64).reshape(len(detections), -1)
+            y1, y2, conf = arr[:, 1], arr[:, 3], arr[:, 5]
+            # 框边缘逼近中心带：即将发生部件切换
+            d1 = np.minimum(np.abs(y1 - self.band_y1), np.abs(y1 - self.band_y2))
+            d2 = np.minimum(np.abs(y2 - self.band_y1), np.abs(y2 - self.band_y2))
+            near = bool((np.minimum(d1, d2) <= self.near_px).any())
+            covers = (y1 < self.band_y2) & (y2 > self.band_y1)
+            if covers.any():
+                band_conf = float(conf[covers].max())
+
+        if near:
+            self._set_level(len(self.sizes) - 1)
+        elif band_conf < self.conf_min:
+            self._set_level(self.level + 1)
+        else:
+            self._streak = self._streak + 1 if flag_frame == self._last_flag else 1
+            if self._streak >= self.stable_frames:
+                self._set_level(self.level - 1)
+        self._last_flag = flag_frame
+        self.frame_idx += 1
+        return self.current
+
+    def stats(self) -> Dict[str, Any]:
+        total = sum(self.counts.values())
+        full = float(self.sizes[-1]) ** 2
+        # 推理量近似正比于输入面积
+        cost = sum(n * (s * s) / full for s, n in self.counts.items())
+        return {
+            "frames": total,
+            "counts": dict(self.counts),
+            "switches": len(self.schedule) - 1,
+            "saved_ratio": 1.0 - cost / total if total else 0.0,
+        }
+
+    def log_stats(self) -> None:
+        st = self.stats()
+        logging.info("自适应分辨率：帧数=%d 各尺寸帧数=%s 切换=%d 次 估算节省推理量=%.1f%%",
+                     st["frames"], st["counts"], st["switches"], 100.0 * st["saved_ratio"])
+        logging.info("分辨率切换表 (帧号, 尺寸)：%s", self.schedule)
+
+
+__all__ = ["ResolutionController"]
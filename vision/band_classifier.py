@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+中心带条带分类器：对中心带附近的横向条带做“片体 / 禁清（顶端、法兰、底座或无目标）”二分类。
+
+flag 判定只关心中心带是否为片体，整帧 YOLO 推理在绝大多数帧上是多余的。
+本模块提供一个纯 CPU 的小模型：
+
+- 特征：条带灰度图缩放到固定尺寸后的 HOG 特征（8×8 像素单元、9 个无符号方向、单元内 L2 归一化）。
+- 模型：带 L2 正则的逻辑回归（NumPy 实现，无额外依赖），权重保存为 ``.npz``。
+- 标签：由检测器路径 ``Detector.detect`` + ``judge_center_band`` 在 ``videos/`` 上生成，
+  先缓存为特征文件，再训练。
+
+``run_sampling`` 中置信度高于 ``conf_min`` 时直接采用分类结果，否则回退到检测器路径。
+
+命令行：
+    python -m vision.band_classifier collect --config config.yaml --videos videos/demo1.mp4 --cache logs/band_feats.npz
+    python -m vision.band_classifier train --cache logs/band_feats.npz --out models/band_clf.npz
+    python -m vision.band_classifier eval --config config.yaml --model models/band_clf.npz --videos videos/demo2-1.mp4
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import time
+from typing import Iterable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# HOG 输入尺寸 (宽, 高)，条带为细长横向区域
+_STRIP_SIZE = (128, 32)
+_CELL = 8
+_BINS = 9
+
+
+def _hog(gray: np.ndarray) -> np.ndarray:
+    """简化 HOG：Sobel 梯度 → 每个单元的方向直方图（按幅值加权）→ 单元内 L2 归一化。"""
+    gx = cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=1)
+    gy = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=1)
+    mag, ang = cv2.cartToPolar(gx, gy, angleInDegrees=True)
+    h, w = gray.shape
+    ch, cw = h // _CELL, w // _CELL
+    bins = (np.mod(ang, 180.0) * (_BINS / 180.0)).astype(np.int64) % _BINS
+    # 每个像素所属单元编号
+    cell_id = (np.arange(h)[:, None] // _CELL) * cw + (np.arange(w)[None, :] // _CELL)
+    hist = np.bincount((cell_id * _BINS + bins).ravel(), weights=mag.ravel(),
+                       minlength=ch * cw * _BINS).reshape(ch * cw, _BINS)
+    hist /= np.sqrt((hist * hist).sum(axis=1, keepdims=True)) + 1e-6
+    return hist.ravel()
+
+
+def crop_band_strip(frame: np.ndarray, strip_px: int) -> np.ndarray:
+    """截取以图像中心行为中心、高度为 ``strip_px`` 的横向条带。"""
+    h = frame.shape[0]
+    cy = h // 2
+    half = max(1, strip_px // 2)
+    return frame[max(0, cy - half): min(h, cy + half)]
+
+
+class BandStripClassifier:
+    """HOG + 逻辑回归的中心带条带分类器。"""
+
+    def __init__(self, strip_px: int = 60) -> None:
+        self.strip_px = int(strip_px)
+        self.w: Optional[np.ndarray] = None
+        self.b = 0.0
+        self.mu: Optional[np.ndarray] = None
+        self.sd: Optional[np.ndarray] = None
+        # 预分配缓冲区，避免逐帧分配
+        self._gray = np.empty((_STRIP_SIZE[1], _STRIP_SIZE[0]), dtype=np.uint8)
+
+    @property
+    def ready(self) -> bool:
+        return self.w is not None
+
+    # ============ 特征 ============
+    def features(self, frame: np.ndarray) -> np.ndarray:
+        strip = crop_band_strip(frame, self.strip_px)
+        if strip.ndim == 3:
+            strip = cv2.cvtColor(strip, cv2.COLOR_BGR2GRAY)
+        cv2.resize(strip, _STRIP_SIZE, dst=self._gray, interpolation=cv2.INTER_AREA)
+        return _hog(self._gray)
+
+    # ============ 推理 ============
+    def predict_proba(self, frame: np.ndarray) -> float:
+        """返回条带为片体（可清）的概率。"""
+        assert self.w is not None and self.mu is not None and self.sd is not None, "分类器未加载"
+        x = (self.features(frame) - self.mu) / self.sd
+        z = float(x @ self.w + self.b)
+        return float(1.0 / (1.0 + np.exp(-z)))
+
+    def predict(self, frame: np.ndarray) -> Tuple[int, float]:
+        """返回 (flag, confidence)，confidence 为预测类别的概率。"""
+        p = self.predict_proba(frame)
+        return (1, p) if p >= 0.5 else (0, 1.0 - p)
+
+    # ============ 训练 ============
+    def fit(self, X: np.ndarray, y: np.ndarray, l2: float = 1e-3, lr: float = 0.5, epochs: int = 300) -> None:
+        """全批量梯度下降训练逻辑回归。"""
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        self.mu = X.mean(axis=0)
+        self.sd = X.std(axis=0) + 1e-6
+        Xn = (X - self.mu) / self.sd
+        n, d = Xn.shape
+        w = np.zeros(d)
+        b = 0.0
+        for _ in range(epochs):
+            p = 1.0 / (1.0 + np.exp(-(Xn @ w + b)))
+            g = p - y
+            w -= lr * (Xn.T @ g / n + l2 * w)
+            b -= lr * float(g.mean())
+        self.w, self.b = w, b
+
+    # ============ 持久化 ============
+    def save(self, path: str) -> None:
+        assert self.ready, "分类器未训练"
+        np.savez(path, w=self.w, b=self.b, mu=self.mu, sd=self.sd, strip_px=self.strip_px)
+
+    @classmethod
+    def load(cls, path: str) -> "BandStripClassifier":
+        d = np.load(path)
+        clf = cls(strip_px=int(d["strip_px"]))
+        clf.w, clf.b = d["w"], float(d["b"])
+        clf.mu, clf.sd = d["mu"], d["sd"]
+        return clf
+
+
+def load_band_classifier(cfg: Optional[dict]) -> Optional[BandStripClassifier]:
+    """按 ``vision.band_classifier`` 配置加载分类器；未启用或加载失败返回 ``None``。"""
+    cfg = cfg or {}
+    if not cfg.get("enable", False):
+        return None
+    path = cfg.get("model_path")
+    try:
+        clf = BandStripClassifier.load(path)
+        logging.info("加载中心带条带分类器：%s", path)
+        return clf
+    except Exception as e:
+        logging.warning("加载条带分类器失败，仅使用检测器路径：%s", e)
+        return None
+
+
+# ============ 数据集：用检测器路径生成标签 ============
+def _iter_frames(videos: Iterable[str], frame_size=(640, 480), stride: int = 1):
+    for v in videos:
+        cap = cv2.VideoCapture(v)
+        if not cap.isOpened():
+            logging.error("无法打开视频：%s", v)
+            continue
+        i = 0
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if i % stride == 0:
+                yield cv2.resize(frame, frame_size)
+            i += 1
+        cap.release()
+
+
+def collect_dataset(videos: Iterable[str], detector, conf_thr: dict, center_band_px: int,
+                    strip_px: int = 60, stride: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """在视频上运行检测器路径，返回 (特征矩阵, 逐帧 flag 标签)。"""
+    from vision.center_band1 import judge_center_band
+    clf = BandStripClassifier(strip_px=strip_px)
+    feats: List[np.ndarray] = []
+    labels: List[int] = []
+    for frame in _iter_frames(videos, stride=stride):
+        dets = detector.detect(frame)
+        flag, _ = judge_center_band(dets, conf_thr, frame.shape[0], center_band_px)
+        feats.append(clf.features(frame).copy())
+        labels.append(int(flag))
+    if not feats:
+        return np.zeros((0, 0)), np.zeros(0, dtype=np.int8)
+    return np.stack(feats), np.asarray(labels, dtype=np.int8)
+
+
+def evaluate(videos: Iterable[str], detector, clf: BandStripClassifier, conf_thr: dict,
+             center_band_px: int, conf_min: float = 0.9) -> dict:
+    """以检测器路径为基准，统计分类器准确率、快速路径命中率与单帧耗时。"""
+    from vision.center_band1 import judge_center_band
+    n = agree = fast = fast_agree = 0
+    t_det = t_clf = 0.0
+    for frame in _iter_frames(videos):
+        t0 = time.perf_counter()
+        dets = detector.detect(frame)
+        ref, _ = judge_center_band(dets, conf_thr, frame.shape[0], center_band_px)
+        t1 = time.perf_counter()
+        flag, conf = clf.predict(frame)
+        t2 = time.perf_counter()
+        t_det += t1 - t0
+        t_clf += t2 - t1
+        n += 1
+        agree += int(flag == ref)
+        if conf >= conf_min:
+            fast += 1
+            fast_agree += int(flag == ref)
+    if n == 0:
+        return {"frames": 0}
+    # 混合路径的期望单帧耗时：快速路径命中只付分类器代价，否则分类器 + 检测器
+    t_mix = (t_clf + (n - fast) * (t_det / n)) / n
+    return {
+        "frames": n,
+        "accuracy": agree / n,
+        "fast_ratio": fast / n,
+        "fast_accuracy": fast_agree / fast if fast else float("nan"),
+        "det_ms": 1000.0 * t_det / n,
+        "clf_ms": 1000.0 * t_clf / n,
+        "mixed_ms": 1000.0 * t_mix,
+        "speedup": (t_det / n) / t_mix if t_mix > 0 else float("nan"),
+    }
+
+
+__all__ = ["BandStripClassifier", "crop_band_strip", "load_band_classifier", "collect_dataset", "evaluate"]
+
+
+if __name__ == "__main__":
+    from core.config import Config
+    from vision.detector import Detector
+
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+    ap = argparse.ArgumentParser()
+    ap.add_argument("cmd", choices=["collect", "train", "eval"])
+    ap.add_argument("--config", default="config.yaml")
+    ap.add_argument("--videos", nargs="*", default=["videos/demo1.mp4"])
+    ap.add_argument("--cache", default="logs/band_feats.npz", help="特征缓存文件")
+    ap.add_argument("--model", default="models/band_clf.npz")
+    ap.add_argument("--out", default="models/band_clf.npz")
+    ap.add_argument("--strip_px", type=int, default=60)
+    ap.add_argument("--stride", type=int, default=1)
+    a = ap.parse_args()
+
+    if a.cmd == "train":
+        d = np.load(a.cache)
+        clf = BandStripClassifier(strip_px=int(d["strip_px"]))
+        clf.fit(d["X"], d["y"])
+        clf.save(a.out)
+        print(f"训练完成：样本={len(d['y'])} 正样本比例={float(np.mean(d['y'])):.3f} -> {a.out}")
+    else:
+        vcfg = Config.load(a.config).section("vision")
+        det = Detector(vcfg.get("weight_path"))
+        conf_thr = vcfg.get("conf_thr", {})
+        band_px = int(vcfg.get("center_band_px", 20))
+        if a.cmd == "collect":
+            X, y = collect_dataset(a.videos, det, conf_thr, band_px, strip_px=a.strip_px, stride=a.stride)
+            np.savez(a.cache, X=X, y=y, strip_px=a.strip_px)
+            print(f"特征缓存：{len(y)} 帧 -> {a.cache}")
+        else:
+            clf = BandStripClassifier.load(a.model)
+            conf_min = float(vcfg.get("band_classifier", {}).get("conf_min", 0.9))
+            rep = evaluate(a.videos, det, clf, conf_thr, band_px, conf_min=conf_min)
+            for k, v in rep.items():
+                print(f"{k}: {v}")
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
-from typing import List, Tuple
+from typing import List, Sequence, Tuple
+
+import numpy as np
 
 def judge_center_band(
     detections: List[List[float]],
@@ -93,6 +95,93 @@ def judge_center_band(
     return 0, part
 
 
+def judge_bands(
+    detections: List[List[float]],
+    conf_thr: dict[str, float],
+    band_centers: Sequence[int],
+    band_width: int,
+    overlap_thr: float = 0.5,
+) -> np.ndarray:
+    """
+    多带判定：一次向量化计算 K 条中心带（中心行为 ``band_centers``）的 flag 向量。
+
+    每条带的判定语义与 ``judge_center_band`` 的 flag 完全一致：
+    禁清类完全覆盖 → 0；片体完全覆盖 → 1；禁清类充分覆盖 → 0；片体充分覆盖 → 1；否则 0。
+
+    返回 ``np.ndarray[int8]``，形状 (K,)。
+    """
+    centers = np.asarray(band_centers, dtype=np.int64)
+    k = centers.size
+    if k == 0 or not detections:
+        return np.zeros(k, dtype=np.int8)
+
+    arr = np.asarray(detections, dtype=np.float64).reshape(len(detections), -1)
+    y1, y2, cls, conf = arr[:, 1], arr[:, 3], arr[:, 4].astype(np.int64), arr[:, 5]
+    names = ('top', 'body', 'flange', 'base')
+    thr = np.array([float(conf_thr.get(n, 0.0)) for n in names])
+    valid = (cls >= 0) & (cls < 4) & (y2 > y1)
+    valid &= conf >= thr[np.clip(cls, 0, 3)]
+    if not valid.any():
+        return np.zeros(k, dtype=np.int8)
+    y1, y2, cls = y1[valid, None], y2[valid, None], cls[valid, None]
+
+    band_half = max(1, band_width // 2)
+    b1 = (centers - band_half)[None, :]
+    b2 = (centers + band_half)[None, :]
+
+    box_h = np.maximum(1.0, y2 - y1)
+    overlap_h = np.maximum(0.0, np.minimum(b2, y2) - np.maximum(b1, y1))
+    strong = (overlap_h / box_h) > overlap_thr           # (N, K)
+    full = (y1 <= b1) & (b2 <= y2)
+    banned = cls != 1
+
+    banned_full = (full & banned).any(axis=0)
+    body_full = (full & ~banned).any(axis=0)
+    banned_strong = (strong & banned).any(axis=0)
+    body_strong = (strong & ~banned).any(axis=0)
+    flags = ~banned_full & (body_full | (~banned_strong & body_strong))
+    return flags.astype(np.int8)
+
+
+
+def band_body_prob(
+    detections: List[List[float]],
+    conf_thr: dict[str, float],
+    img_height: int,
+    band_width: int,
+    overlap_thr: float = 0.5,
+    none_prob: float = 0.2,
+) -> float:
+    """
+    中心带“可清洗”的软概率，供 ``HMMFlagFilter`` 使用（不做硬阈值投票）。
+
+    只考虑完全覆盖或充分覆盖中心带的框：p = max(片体置信度) × (1 - max(禁清类置信度))。
+    无覆盖框时返回 ``none_prob``（偏向不可清的弱证据）。
+    """
+    if not detections:
+        return float(none_prob)
+    arr = np.asarray(detections, dtype=np.float64).reshape(len(detections), -1)
+    y1, y2, cls, conf = arr[:, 1], arr[:, 3], arr[:, 4].astype(np.int64), arr[:, 5]
+    names = ('top', 'body', 'flange', 'base')
+    thr = np.array([float(conf_thr.get(n, 0.0)) for n in names])
+    valid = (cls >= 0) & (cls < 4) & (y2 > y1)
+    valid &= conf >= thr[np.clip(cls, 0, 3)]
+
+    center_y = img_height // 2
+    band_half = max(1, band_width // 2)
+    b1, b2 = center_y - band_half, center_y + band_half
+    box_h = np.maximum(1.0, y2 - y1)
+    overlap_h = np.maximum(0.0, np.minimum(b2, y2) - np.maximum(b1, y1))
+    covers = valid & (((y1 <= b1) & (b2 <= y2)) | (overlap_h / box_h > overlap_thr))
+    if not covers.any():
+        return float(none_prob)
+    body = covers & (cls == 1)
+    banned = covers & (cls != 1)
+    p_body = float(conf[body].max()) if body.any() else 0.0
+    p_banned = float(conf[banned].max()) if banned.any() else 0.0
+    return p_body * (1.0 - p_banned)
+
+
 if __name__ == "__main__":
     # 简单自测样例
     # 图像高 480，中带宽 20，中心在 y=240±10
@@ -29,20 +29,22 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+import importlib.util
 import logging
-from typing import List, Tuple
+import time
+from typing import Iterator, List, Tuple
 
 import numpy as np
 
-try:
-    # 如果 ulralytics 和 torch 可用，尝试导入
-    from ultralytics import YOLO  # type: ignore
-    _ULTRALYTICS_AVAILABLE = True
-except Exception:
-    _ULTRALYTICS_AVAILABLE = False
-
 import cv2  # OpenCV 用于 ONNX 推理或基础图像处理
 
+from vision.preprocess import Letterbox, parse_imgsz
+
+
+def _ultralytics_available() -> bool:
+    """仅查找 ultralytics 是否安装，不导入（导入会连带加载 torch，耗时数秒）。"""
+    return importlib.util.find_spec("ultralytics") is not None
+
 
 class Detector:
     """
@@ -51,20 +53,26 @@ class Detector:
     根据所提供的权重文件和环境情况选择使用 Ultralytics、OpenCV dnn 或 Dummy 模式。
     """
 
-    def __init__(self, weight_path: str | None = None, device: str = "cpu"):
+    def __init__(self, weight_path: str | None = None, device: str = "cpu", imgsz=640):
         """初始化检测器。
 
         :param weight_path: 模型权重路径，可为 yolov8.pt 或 onnx 文件。若为 ``None``，则启用 Dummy 模式。
         :param device: 计算设备（如 ``cpu`` 或 ``cuda``）。Ultralytics 模式下有效。
+        :param imgsz: 默认模型输入尺寸，整数（方形）或 ``(宽, 高)``；ONNX 模式下使用 letterbox 前处理。
+            ``detect`` 可逐帧指定其他尺寸（自适应分辨率），ONNX 需导出为动态输入尺寸。
         """
         self.weight_path = weight_path
         self.device = device
+        self.imgsz = parse_imgsz(imgsz)
+        self._letterboxes: dict[tuple[int, int], Letterbox] = {}
         self.model = None
         self.use_ultralytics = False
         self.use_onnx = False
-        if weight_path and _ULTRALYTICS_AVAILABLE and weight_path.endswith(('.pt', '.pth')):
+        if weight_path and weight_path.endswith(('.pt', '.pth')) and _ultralytics_available():
             try:
                 logging.info("使用 Ultralytics 加载模型：%s", weight_path)
+                # 延迟导入：Dummy / ONNX 模式无需加载 ultralytics 与 torch
+                from ultralytics import YOLO  # type: ignore
                 self.model = YOLO(weight_path)
                 self.use_ultralytics = True
             except Exception as e:
@@ -74,69 +82,122 @@ class Detector:
             try:
                 logging.info("使用 OpenCV DNN 加载 ONNX：%s", weight_path)
                 self.model = cv2.dnn.readNetFromONNX(weight_path)
+                self._letterboxes[self.imgsz] = Letterbox(self.imgsz)
                 self.use_onnx = True
             except Exception as e:
                 logging.warning("加载 ONNX 模型失败：%s", e)
         if self.model is None:
             logging.warning("未提供有效权重或无法加载模型，启用 Dummy 检测器。")
 
-    def detect(self, frame: np.ndarray) -> List[List[float]]:
+    def _get_letterbox(self, imgsz: tuple[int, int]) -> Letterbox:
+        """每种输入尺寸一个 letterbox（各自持有预分配缓冲区）。"""
+        lb = self._letterboxes.get(imgsz)
+        if lb is None:
+            lb = self._letterboxes[imgsz] = Letterbox(imgsz)
+        return lb
+
+    def detect(self, frame: np.ndarray, imgsz=None) -> List[List[float]]:
         """对单帧图像进行目标检测。
 
         :param frame: BGR 格式图像数组。
+        :param imgsz: 本帧推理输入尺寸，缺省使用初始化时的 ``imgsz``。
         :return: 检测结果列表，每个元素为 [x1, y1, x2, y2, class_id, confidence]。
         """
+        size = self.imgsz if imgsz is None else parse_imgsz(imgsz)
         if self.use_ultralytics and self.model:
             # 使用 Ultralytics 推理，自动完成预处理
             # results = self.model(frame)[0]
             # 优先使用 predict 并显式关闭 verbose
-            results = self.model.predict(frame, verbose=False, device=self.device)[0]
+            # ultralytics 的 imgsz 为 (高, 宽)
+            results = self.model.predict(frame, verbose=False, device=self.device,
+                                         imgsz=(size[1], size[0]))[0]
             # 如果你更喜欢 __call__ 语法，也必须传 verbose=False：
             # results = self.model(frame, verbose=False)[0]
 
-            boxes = []
-            for cls_id, conf, xyxy in zip(results.boxes.cls.tolist(),
-                                          results.boxes.conf.tolist(),
-                                          results.boxes.xyxy.tolist()):
-                x1, y1, x2, y2 = xyxy
-                boxes.append([x1, y1, x2, y2, int(cls_id), float(conf)])
-            return boxes
+            return self._boxes_from_result(results)
         elif self.use_onnx and self.model:
             # 使用 ONNX 模型推理
-            # 注：需根据实际模型的输入尺寸和输出格式调整以下代码
-            blob = cv2.dnn.blobFromImage(frame, 1/255.0, (640, 480), swapRB=True, crop=False)
+            # 注：需根据实际模型的输出格式调整以下解析代码
+            # letterbox 前处理：保持长宽比，写入复用的预分配输入张量
+            letterbox = self._get_letterbox(size)
+            blob = letterbox(frame)
             self.model.setInput(blob)
             try:
                 outputs = self.model.forward()  # 假设模型只有一个输出
             except Exception as e:
                 logging.error("ONNX 推理失败：%s", e)
                 return []
-            # 解析输出，需要根据模型修改
-            detections: List[List[float]] = []
-            # 示意性地假定输出形状为 (N, 85): [cx, cy, w, h, conf, class_scores...]
+            # 示意性地假定输出形状为 (N, 85): [cx, cy, w, h, conf, class_scores...]（输入坐标系）
             if len(outputs.shape) == 3:
                 outputs = outputs[0]
-            for det in outputs:
-                if len(det) < 6:
-                    continue
-                cx, cy, w, h, obj_conf, *class_confs = det
-                confs = np.array(class_confs) * obj_conf
-                class_id = int(np.argmax(confs))
-                confidence = float(confs[class_id])
-                # 筛除置信度极低的目标
-                if confidence < 0.01:
-                    continue
-                x1 = float((cx - w / 2) * frame.shape[1] / 640)
-                y1 = float((cy - h / 2) * frame.shape[0] / 480)
-                x2 = float((cx + w / 2) * frame.shape[1] / 640)
-                y2 = float((cy + h / 2) * frame.shape[0] / 480)
-                detections.append([x1, y1, x2, y2, class_id, confidence])
-            return detections
+            if outputs.ndim != 2 or outputs.shape[1] < 6:
+                return []
+            confs = outputs[:, 5:] * outputs[:, 4:5]
+            class_ids = np.argmax(confs, axis=1)
+            confidence = confs[np.arange(len(confs)), class_ids]
+            # 筛除置信度极低的目标
+            keep = confidence >= 0.01
+            if not keep.any():
+                return []
+            cxcywh = outputs[keep, :4].astype(np.float64)
+            xyxy = np.empty_like(cxcywh)
+            xyxy[:, :2] = cxcywh[:, :2] - 0.5 * cxcywh[:, 2:4]
+            xyxy[:, 2:] = cxcywh[:, :2] + 0.5 * cxcywh[:, 2:4]
+            # 输入坐标 → 原图坐标（扣除灰边并按缩放比例还原）
+            letterbox.unmap_boxes(xyxy)
+            return [[x1, y1, x2, y2, int(c), float(p)]
+                    for (x1, y1, x2, y2), c, p in zip(xyxy.tolist(), class_ids[keep], confidence[keep])]
         else:
             # Dummy 模式：返回空列表
             return []
 
 
+    @staticmethod
+    def _boxes_from_result(results) -> List[List[float]]:
+        """Ultralytics 单帧结果 → [[x1, y1, x2, y2, class_id, confidence], ...]。"""
+        boxes = []
+        for cls_id, conf, xyxy in zip(results.boxes.cls.tolist(),
+                                      results.boxes.conf.tolist(),
+                                      results.boxes.xyxy.tolist()):
+            x1, y1, x2, y2 = xyxy
+            boxes.append([x1, y1, x2, y2, int(cls_id), float(conf)])
+        return boxes
+
+    def stream(self, source, imgsz=None) -> Iterator[Tuple[int, float, np.ndarray, List[List[float]]]]:
+        """流式推理：逐帧产出 ``(帧号, 时间戳, 原图, 检测结果)``。
+
+        Ultralytics 模式下由其流式预测器持有视频源（``stream=True``），解码与推理重叠，
+        省去逐帧调用 ``predict`` 的准备开销；其余模式退化为 ``cv2.VideoCapture`` + ``detect``。
+
+        :param source: 视频文件路径或相机编号（整数或数字字符串）。
+        :param imgsz: 推理输入尺寸，缺省使用初始化时的 ``imgsz``。
+        :return: 生成器；时间戳为 ``time.monotonic()``，检测坐标基于原图。
+        """
+        if isinstance(source, str) and source.isdigit():
+            source = int(source)
+        size = self.imgsz if imgsz is None else parse_imgsz(imgsz)
+        if self.use_ultralytics and self.model:
+            results = self.model.predict(source, stream=True, verbose=False, device=self.device,
+                                         imgsz=(size[1], size[0]))
+            for idx, r in enumerate(results):
+                yield idx, time.monotonic(), r.orig_img, self._boxes_from_result(r)
+            return
+        cap = cv2.VideoCapture(source)
+        if not cap.isOpened():
+            logging.error("无法打开视频源：%s", source)
+            return
+        try:
+            idx = 0
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                yield idx, time.monotonic(), frame, self.detect(frame, imgsz=size)
+                idx += 1
+        finally:
+            cap.release()
+
+
 class DummyDetector(Detector):
     """
     一个始终返回空检测结果的示例检测器，用于离线回放或开发阶段。
@@ -144,7 +205,7 @@ class DummyDetector(Detector):
     def __init__(self):
         super().__init__(weight_path=None)
 
-    def detect(self, frame: np.ndarray) -> List[List[float]]:  # type: ignore[override]
+    def detect(self, frame: np.ndarray, imgsz=None) -> List[List[float]]:  # type: ignore[override]
         return []
 
 
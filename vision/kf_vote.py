@@ -4,13 +4,17 @@
 
 本模块实现了一个简单的一维卡尔曼滤波器 ``KalmanFilter1D``，
 可用于对二值测量的存在概率进行平滑估计。同时提供 ``VotingBuffer``，
-用于实现滑窗计数投票功能。
+用于实现滑窗计数投票功能；``vote_sequence`` 以前缀和对整段 flag 数组一次完成同样的投票。
+``HMMFlagFilter`` 是二状态隐马尔可夫平滑器：在线模式逐帧 O(1) 前向滤波软概率，
+离线模式以向量化的前向-后向 / Viterbi 对整段序列平滑。
 """
 
 from __future__ import annotations
 
 import collections
-from typing import Deque, Iterable, Optional
+from typing import Any, Callable, Deque, Dict, Iterable, Optional
+
+import numpy as np
 
 
 
@@ -26,21 +30,187 @@ class VotingBuffer:
         self.window_size = window_size
         self.vote_threshold = vote_threshold or ((window_size + 1) // 2)
         self.buffer: Deque[int] = collections.deque(maxlen=window_size)
+        self.count_ones = 0   # 窗口内 1 的个数，随进出窗口增量维护
 
     def update(self, value: int) -> int:
-        """向缓冲区添加新值并返回当前稳定输出。"""
-        if value not in (0, 1):
+        """向缓冲区添加新值并返回当前稳定输出（O(1)）。"""
+        if value != 0 and value != 1:
             raise ValueError("VotingBuffer 只能处理 0/1 值")
+        value = int(value)
+        if len(self.buffer) == self.window_size:
+            self.count_ones -= self.buffer[0]   # 即将被挤出窗口的旧值
         self.buffer.append(value)
-        count_ones = sum(self.buffer)
+        self.count_ones += value
         # 如果缓冲区未满，直接输出 0（保守策略）
         if len(self.buffer) < self.window_size:
             return 0
-        return 1 if count_ones >= self.vote_threshold else 0
+        return 1 if self.count_ones >= self.vote_threshold else 0
 
     def reset(self) -> None:
         """清空缓冲区。"""
         self.buffer.clear()
+        self.count_ones = 0
+
+
+def vote_sequence(flags, k: int = 5, t: Optional[int] = None) -> np.ndarray:
+    """
+    对整段 0/1 序列做滑窗投票，逐点结果与依次调用 ``VotingBuffer.update`` 完全一致。
+
+    :param flags: 帧级 0/1 序列（list 或 ndarray）。
+    :param k: 窗口长度；前 ``k-1`` 个输出为 0（窗口未满）。
+    :param t: 阈值，窗口内 1 的个数 ≥ t 输出 1；缺省为 ``(k+1)//2``。
+    :return: ``int8`` 数组，长度与输入相同。
+    """
+    a = np.asarray(flags)
+    if a.size and ((a != 0) & (a != 1)).any():
+        raise ValueError("vote_sequence 只能处理 0/1 值")
+    t = t or ((k + 1) // 2)
+    n = a.size
+    out = np.zeros(n, dtype=np.int8)
+    if n < k:
+        return out
+    c = np.concatenate(([0], np.cumsum(a.ravel(), dtype=np.int64)))
+    win = c[k:] - c[:-k]                # win[j] = 以第 j+k-1 帧结尾的窗口内 1 的个数
+    out[k - 1:] = win >= t
+    return out
+
+
+def _scan(mats: np.ndarray, op: Callable[[np.ndarray, np.ndarray], np.ndarray]) -> np.ndarray:
+    """对 (T, 2, 2) 矩阵序列做包含式前缀扫描 ``out[t] = m[0] ∘ ... ∘ m[t]``（倍增法，log2(T) 轮）。"""
+    out = mats.copy()
+    d = 1
+    while d < len(out):
+        out[d:] = op(out[:-d], out[d:])
+        d *= 2
+    return out
+
+
+def _mul_norm(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """批量矩阵乘，逐个按总和归一化防止下溢（归一化不改变滤波后的相对概率）。"""
+    c = a @ b
+    return c / c.sum(axis=(1, 2), keepdims=True)
+
+
+def _maxplus(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """批量 max-plus 矩阵乘：c[i, j] = max_k a[i, k] + b[k, j]，并减去最大值保持数值范围。"""
+    c = (a[:, :, :, None] + b[:, None, :, :]).max(axis=2)
+    return c - c.max(axis=(1, 2), keepdims=True)
+
+
+class HMMFlagFilter:
+    """
+    二状态（0=不可清，1=可清）隐马尔可夫平滑器，输入为逐帧的软概率 p∈[0, 1]。
+
+    - 状态转移：每帧以 ``p_stay`` 保持原状态。
+    - 观测似然：L(1) = eps + (1-2·eps)·p，L(0) = eps + (1-2·eps)·(1-p)；``eps`` 限制单帧证据的强度。
+    - 在线：``update(p)`` 预测 + 更新后验 ``belief``，≥ ``threshold`` 输出 1。
+    - 离线：``filter_sequence`` / ``posterior`` / ``viterbi`` 对整段数组一次计算，
+      ``filter_sequence`` 与逐帧 ``update`` 的后验一致。
+    """
+
+    def __init__(self, p_stay: float = 0.95, eps: float = 0.05, threshold: float = 0.5,
+                 prior: float = 0.5) -> None:
+        self.p_stay = float(p_stay)
+        self.eps = float(eps)
+        self.threshold = float(threshold)
+        self.prior = float(prior)
+        self.belief = self.prior
+        self.A = np.array([[self.p_stay, 1.0 - self.p_stay],
+                           [1.0 - self.p_stay, self.p_stay]])
+
+    @classmethod
+    def from_config(cls, cfg: Optional[Dict[str, Any]]) -> Optional["HMMFlagFilter"]:
+        """由 ``vision.smoother`` 配置段构造；未启用返回 ``None``（沿用滑窗投票）。"""
+        cfg = cfg or {}
+        if not cfg.get("enable", False):
+            return None
+        return cls(p_stay=float(cfg.get("p_stay", 0.95)), eps=float(cfg.get("eps", 0.05)),
+                   threshold=float(cfg.get("threshold", 0.5)), prior=float(cfg.get("prior", 0.5)))
+
+    # ============ 在线 ============
+    def update(self, p: float) -> int:
+        """输入本帧软概率，返回平滑后的 flag（O(1)）。"""
+        b = self.belief * self.p_stay + (1.0 - self.belief) * (1.0 - self.p_stay)
+        l1 = self.eps + (1.0 - 2.0 * self.eps) * float(p)
+        l0 = 1.0 - l1
+        self.belief = b * l1 / (b * l1 + (1.0 - b) * l0)
+        return 1 if self.belief >= self.threshold else 0
+
+    def reset(self) -> None:
+        self.belief = self.prior
+
+    # ============ 离线 ============
+    def _emission_mats(self, probs) -> np.ndarray:
+        """M_t = A · diag(L_t)，形状 (T, 2, 2)。"""
+        p = np.clip(np.asarray(probs, dtype=np.float64).ravel(), 0.0, 1.0)
+        l1 = self.eps + (1.0 - 2.0 * self.eps) * p
+        lik = np.stack([1.0 - l1, l1], axis=1)          # (T, 2)
+        return self.A[None, :, :] * lik[:, None, :]
+
+    def filter_sequence(self, probs) -> np.ndarray:
+        """前向滤波后验 P(s_t=1 | p_0..p_t)，与逐帧 ``update`` 一致。"""
+        m = self._emission_mats(probs)
+        if len(m) == 0:
+            return np.zeros(0)
+        prior = np.array([1.0 - self.prior, self.prior])
+        alpha = prior @ _scan(m, _mul_norm)               # (T, 2)
+        return alpha[:, 1] / alpha.sum(axis=1)
+
+    def posterior(self, probs) -> np.ndarray:
+        """前向-后向平滑后验 P(s_t=1 | 全序列)。"""
+        m = self._emission_mats(probs)
+        n = len(m)
+        if n == 0:
+            return np.zeros(0)
+        prior = np.array([1.0 - self.prior, self.prior])
+        alpha = prior @ _scan(m, _mul_norm)
+        beta = np.ones((n, 2))
+        if n > 1:
+            # 后缀积 S_t = M_{t+1} ... M_{T-1}：对逆序序列做前缀扫描，乘法顺序相反
+            suffix = _scan(m[:0:-1], lambda a, b: _mul_norm(b, a))[::-1]
+            beta[:-1] = suffix.sum(axis=2)
+        post = alpha * beta
+        return post[:, 1] / post.sum(axis=1)
+
+    def viterbi(self, probs) -> np.ndarray:
+        """最可能状态路径（max-plus 前缀/后缀扫描求各时刻 max-marginal 再取 argmax），返回 int8。"""
+        m = self._emission_mats(probs)
+        n = len(m)
+        if n == 0:
+            return np.zeros(0, dtype=np.int8)
+        logm = np.log(m)
+        # 首帧：先验经一次转移后的状态分布（初始隐状态求和而非取 max）× 首帧似然
+        prior = np.array([1.0 - self.prior, self.prior])
+        delta = np.empty((n, 2))
+        delta[0] = np.log((prior @ m[0]).clip(1e-300))
+        back = np.zeros((n, 2))
+        if n > 1:
+            delta[1:] = (delta[0][None, :, None] + _scan(logm[1:], _maxplus)).max(axis=1)   # (T-1, 2)
+            suffix = _scan(logm[:0:-1], lambda a, b: _maxplus(b, a))[::-1]
+            back[:-1] = suffix.max(axis=2)
+        return np.argmax(delta + back, axis=1).astype(np.int8)
+
+    def smooth(self, probs, method: str = "posterior") -> np.ndarray:
+        """离线平滑为 flag 数组：``posterior`` 按平滑后验阈值化，``viterbi`` 取最可能路径。"""
+        if method == "viterbi":
+            return self.viterbi(probs)
+        return (self.posterior(probs) >= self.threshold).astype(np.int8)
+
+
+def run_length_encode(flags) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    游程编码：返回 ``(values, starts, lengths)``，第 i 段为 ``values[i]`` 重复 ``lengths[i]`` 次，起点 ``starts[i]``。
+
+    用 ``np.diff`` / ``np.flatnonzero`` 一次找出所有变化点，无逐样本 Python 循环。
+    """
+    a = np.asarray(flags).ravel()
+    n = a.size
+    if n == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return a[:0], empty, empty
+    starts = np.concatenate(([0], np.flatnonzero(a[1:] != a[:-1]) + 1))
+    lengths = np.diff(np.append(starts, n))
+    return a[starts], starts, lengths
 
 
 def remove_small_segments(flags: Iterable[int], min_length: int, fill_with: int) -> list[int]:
@@ -53,23 +223,12 @@ def remove_small_segments(flags: Iterable[int], min_length: int, fill_with: int)
     :return: 处理后的序列列表。
     """
     flags = list(flags)
-    n = len(flags)
-    if n == 0:
+    if not flags:
         return flags
-    result = flags.copy()
-    i = 0
-    while i < n:
-        j = i
-        # 找出连续片段 [i, j)
-        while j < n and flags[j] == flags[i]:
-            j += 1
-        segment_len = j - i
-        if segment_len < min_length:
-            for k in range(i, j):
-                result[k] = fill_with
-        i = j
-    return result
-
-
-__all__ = [ "VotingBuffer", "remove_small_segments"]
+    values, _, lengths = run_length_encode(flags)
+    values = np.where(lengths < min_length, fill_with, values)
+    return np.repeat(values, lengths).tolist()
+
+
+__all__ = [ "VotingBuffer", "vote_sequence", "HMMFlagFilter", "run_length_encode", "remove_small_segments"]
 # 这里保留 VotingBuffer，用于稳定帧级判定；如需概率卡尔曼，可在此扩展。
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+推理前处理：等比例缩放 + 灰边填充（letterbox），输入张量预分配复用。
+
+- ``imgsz`` 可为整数（方形输入）或 ``(宽, 高)``。
+- 缩放通过 ``cv2.resize(..., dst=...)`` 直接写入预分配画布的有效区域，不产生逐帧临时数组。
+- 归一化与 HWC→CHW、BGR→RGB 一步写入预分配的 ``float32`` 张量 ``(1, 3, H, W)``。
+- ``unmap_boxes`` 将模型输入坐标系下的框精确映射回原图坐标。
+"""
+from __future__ import annotations
+
+from typing import Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+ImgSize = Union[int, Sequence[int]]
+
+
+def parse_imgsz(imgsz: ImgSize) -> Tuple[int, int]:
+    """整数 → (s, s)；序列 → (宽, 高)。"""
+    if isinstance(imgsz, (int, float)):
+        return int(imgsz), int(imgsz)
+    w, h = imgsz
+    return int(w), int(h)
+
+
+class Letterbox:
+    """letterbox 前处理器，缓冲区按输入尺寸复用。"""
+
+    def __init__(self, imgsz: ImgSize = 640, pad_value: int = 114) -> None:
+        self.in_w, self.in_h = parse_imgsz(imgsz)
+        self.pad_value = int(pad_value)
+        self.canvas = np.full((self.in_h, self.in_w, 3), self.pad_value, dtype=np.uint8)
+        self.blob = np.empty((1, 3, self.in_h, self.in_w), dtype=np.float32)
+        self._src_shape: Tuple[int, int] = (-1, -1)
+        # 最近一次映射参数：原图坐标 = (输入坐标 - pad) / scale
+        self.scale = 1.0
+        self.pad_x = 0
+        self.pad_y = 0
+        self._roi = self.canvas
+
+    def _layout(self, h0: int, w0: int) -> None:
+        """原图尺寸变化时重算缩放比例与填充，并重置画布灰边。"""
+        r = min(self.in_w / w0, self.in_h / h0)
+        nw, nh = max(1, int(round(w0 * r))), max(1, int(round(h0 * r)))
+        self.pad_x = (self.in_w - nw) // 2
+        self.pad_y = (self.in_h - nh) // 2
+        self.scale = r
+        self.canvas.fill(self.pad_value)
+        self._roi = self.canvas[self.pad_y:self.pad_y + nh, self.pad_x:self.pad_x + nw]
+        self._src_shape = (h0, w0)
+
+    def __call__(self, frame: np.ndarray) -> np.ndarray:
+        """返回复用的 ``(1, 3, H, W)`` float32 输入张量（RGB，0~1）。"""
+        h0, w0 = frame.shape[:2]
+        if (h0, w0) != self._src_shape:
+            self._layout(h0, w0)
+        roi_h, roi_w = self._roi.shape[:2]
+        if (roi_h, roi_w) == (h0, w0):
+            np.copyto(self._roi, frame)
+        else:
+            cv2.resize(frame, (roi_w, roi_h), dst=self._roi, interpolation=cv2.INTER_LINEAR)
+        # BGR→RGB + HWC→CHW + 归一化，一次写入预分配张量
+        np.multiply(self.canvas[:, :, ::-1].transpose(2, 0, 1), np.float32(1.0 / 255.0),
+                    out=self.blob[0], casting="unsafe")
+        return self.blob
+
+    def unmap_boxes(self, xyxy: np.ndarray) -> np.ndarray:
+        """输入坐标系 (N,4) xyxy → 原图坐标（原地修改并返回），并裁剪到图像范围。"""
+        h0, w0 = self._src_shape
+        xyxy[:, [0, 2]] -= self.pad_x
+        xyxy[:, [1, 3]] -= self.pad_y
+        xyxy /= self.scale
+        xyxy[:, [0, 2]] = np.clip(xyxy[:, [0, 2]], 0, w0)
+        xyxy[:, [1, 3]] = np.clip(xyxy[:, [1, 3]], 0, h0)
+        return xyxy
+
+
+__all__ = ["Letterbox", "parse_imgsz"]
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+尺寸/居中预筛：位于 ``Detector.detect`` 与 ``judge_center_band`` 之间的快速过滤阶段。
+
+读取 ``config.yaml`` 中的 ``vision.size_filter``：
+
+- ``enable``：是否启用。
+- ``target_classes``：参与过滤的类别（其余类别原样保留）。
+- ``min_ratio``：框宽占图像宽度的最小比例，小于该值视为远处/误检小框。
+- ``center_focus``：是否要求框的水平中心落在图像中央区域。
+- ``center_band_ratio``：中央区域宽度占图像宽度的比例。
+
+所有判定基于 NumPy 向量化完成，并统计每帧移除的框数，便于评估误检对投票的影响。
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+class SizeFilter:
+    """按尺寸与居中程度剔除目标类别中的可疑检测框。"""
+
+    def __init__(self, target_classes: Iterable[int] = (1,), min_ratio: float = 0.25,
+                 center_focus: bool = True, center_band_ratio: float = 0.4,
+                 enable: bool = True) -> None:
+        self.enable = bool(enable)
+        self.target_classes = np.array(sorted({int(c) for c in target_classes}), dtype=np.int64)
+        self.min_ratio = float(min_ratio)
+        self.center_focus = bool(center_focus)
+        self.center_band_ratio = float(center_band_ratio)
+
+        # 计数器
+        self.frames = 0
+        self.total_in = 0
+        self.total_removed = 0
+        self.removed_small = 0
+        self.removed_offcenter = 0
+        self.last_removed = 0
+        self.max_removed = 0
+
+    @classmethod
+    def from_config(cls, cfg: Optional[Dict[str, Any]]) -> "SizeFilter":
+        """由 ``vision.size_filter`` 配置段构造；缺省时返回禁用的过滤器。"""
+        cfg = cfg or {}
+        return cls(
+            target_classes=cfg.get("target_classes", [1]),
+            min_ratio=float(cfg.get("min_ratio", 0.25)),
+            center_focus=bool(cfg.get("center_focus", True)),
+            center_band_ratio=float(cfg.get("center_band_ratio", 0.4)),
+            enable=bool(cfg.get("enable", False)),
+        )
+
+    def apply(self, detections: List[List[float]], img_w: int, img_h: int) -> List[List[float]]:
+        """过滤单帧检测结果，返回保留的检测框（保持原顺序与原元素）。"""
+        self.frames += 1
+        self.last_removed = 0
+        n = len(detections)
+        self.total_in += n
+        if not self.enable or n == 0 or self.target_classes.size == 0:
+            return detections
+
+        arr = np.asarray(detections, dtype=np.float64).reshape(n, -1)
+        x1, x2, cls = arr[:, 0], arr[:, 2], arr[:, 4].astype(np.int64)
+        target = np.isin(cls, self.target_classes)
+
+        # 1) 尺寸：框宽占图像宽度比例
+        small = target & ((x2 - x1) < self.min_ratio * float(img_w))
+        # 2) 居中：框水平中心需落入中央区域
+        if self.center_focus:
+            half_band = 0.5 * self.center_band_ratio * float(img_w)
+            offcenter = target & ~small & (np.abs(0.5 * (x1 + x2) - 0.5 * float(img_w)) > half_band)
+        else:
+            offcenter = np.zeros(n, dtype=bool)
+
+        drop = small | offcenter
+        n_drop = int(np.count_nonzero(drop))
+        if n_drop == 0:
+            return detections
+
+        self.last_removed = n_drop
+        self.total_removed += n_drop
+        self.removed_small += int(np.count_nonzero(small))
+        self.removed_offcenter += int(np.count_nonzero(offcenter))
+        self.max_removed = max(self.max_removed, n_drop)
+        return [detections[i] for i in np.flatnonzero(~drop)]
+
+    def stats(self) -> Dict[str, float]:
+        """返回累计计数，``avg_removed`` 为平均每帧移除框数。"""
+        return {
+            "frames": self.frames,
+            "total_in": self.total_in,
+            "total_removed": self.total_removed,
+            "removed_small": self.removed_small,
+            "removed_offcenter": self.removed_offcenter,
+            "max_removed": self.max_removed,
+            "avg_removed": self.total_removed / self.frames if self.frames else 0.0,
+        }
+
+    def log_stats(self) -> None:
+        s = self.stats()
+        logging.info("尺寸预筛：帧数=%d 输入框=%d 移除=%d（过小=%d 偏心=%d） 平均每帧移除=%.2f 单帧最多=%d",
+                     s["frames"], s["total_in"], s["total_removed"], s["removed_small"],
+                     s["removed_offcenter"], s["avg_removed"], s["max_removed"])
+
+
+__all__ = ["SizeFilter"]
@@ -6,7 +6,14 @@ from core.config import Config
 from vision.detector import Detector
 from overlay import overlay_frame
 
-def run(cfg_path: str, video_path: str, save_path: str | None):
+def _per_frame(cap, det):
+    """逐帧模式：cv2 解码 + 单帧 predict。"""
+    while True:
+        ok, frame = cap.read()
+        if not ok: break
+        yield frame, Detector.detect(det, frame)  # [x1,y1,x2,y2,cls,conf]
+
+def run(cfg_path: str, video_path: str, save_path: str | None, stream: bool = False):
     cfg = Config.load(cfg_path)
     vcfg = cfg.section("vision")
     weight = vcfg.get("weight_path")
@@ -27,14 +34,18 @@ def run(cfg_path: str, video_path: str, save_path: str | None):
         fps = cap.get(cv2.CAP_PROP_FPS) or 25
         writer = cv2.VideoWriter(save_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
 
+    if stream:
+        # 流式模式：视频源交由检测器流式预测器持有，cap 仅用于读取尺寸/帧率
+        cap.release()
+        frames = ((frame, dets) for _, _, frame, dets in det.stream(video_path))
+    else:
+        frames = _per_frame(cap, det)
+
     t_last = time.time()
     count=0
-    while True:
+    for frame, dets in frames:
         count+=1
-        ok, frame = cap.read()
-        if not ok: break
         print("当前帧数:",count)
-        dets = Detector.detect(det, frame)  # [x1,y1,x2,y2,cls,conf]
         overlay_frame(frame, dets, center_band_px=center_band_px, conf_thr=conf_thr, show_score=True, show_legend=True)
 
         now = time.time()
@@ -55,5 +66,6 @@ if __name__ == "__main__":
     ap.add_argument("--config", default=r"D:\workspace\绝缘子清洗机器人\项目代码\草稿版本0908-3\insulator_bot\config.yaml")
     ap.add_argument("--video", default=r"D:\workspace\绝缘子清洗机器人\项目代码\草稿版本0908-3\insulator_bot\videos\demo1-0.mp4")
     ap.add_argument("--save", default="viz", help="可选：保存输出视频路径")
+    ap.add_argument("--stream", action="store_true", help="使用检测器流式模式（ultralytics stream=True）")
     a = ap.parse_args()
-    run(a.config, a.video, a.save)
+    run(a.config, a.video, a.save, stream=a.stream)